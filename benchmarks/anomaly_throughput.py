@@ -0,0 +1,131 @@
+"""
+Measure throughput and memory of the streaming anomaly detector.
+
+Toll reads come from create_data.py's generator, one time slice at a time so
+the stream is in time order as it would be at ingest. Optionally convoys and
+cloned plates are planted in the stream, and the report says how many of them
+were detected. Only the time spent in the detector counts towards events/s.
+
+    python benchmarks/anomaly_throughput.py --rows 1000000 --inject-convoys 50 --inject-clones 50
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Same window create_data.py writes into.
+DATA_START = datetime(2025, 10, 19, 8, 0, 0, tzinfo=timezone.utc)
+DATA_END = datetime(2025, 10, 19, 20, 0, 0, tzinfo=timezone.utc)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming anomaly detector.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Toll reads to stream.")
+    parser.add_argument("--slices", type=int, default=200, help="Time slices the stream is generated in.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the data and planted anomalies.")
+    parser.add_argument("--inject-convoys", type=int, default=0, help="Convoys of two vehicles to plant.")
+    parser.add_argument("--inject-clones", type=int, default=0, help="Cloned plates to plant.")
+    parser.add_argument("--max-tracked-plates", type=int, default=1_000_000, help="Plates the detector remembers.")
+    parser.add_argument("--output", help="Write the JSON results to this file as well as stdout.")
+    return parser.parse_args()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def planted_reads(rng: random.Random, positions_km: dict, convoys: int, clones: int):
+    """Reads for `convoys` vehicle pairs travelling together and `clones` plates seen at two distant points."""
+    toll_points = sorted(positions_km, key=positions_km.get)
+    window_seconds = (DATA_END - DATA_START).total_seconds() - 3600
+    reads, planted = [], {"convoy": set(), "plate_clone": set()}
+    for i in range(convoys):
+        leader, follower = f"CNV-{2 * i:04d}", f"CNV-{2 * i + 1:04d}"
+        first = rng.randrange(len(toll_points) - 3)
+        at = DATA_START + timedelta(seconds=rng.uniform(0, window_seconds))
+        for toll_point in toll_points[first:first + 4]:
+            reads.append({"plate_number": leader, "toll_point_id": toll_point, "timestamp": at})
+            reads.append({"plate_number": follower, "toll_point_id": toll_point,
+                          "timestamp": at + timedelta(seconds=rng.uniform(0.5, 2.0))})
+            # 4.5 km between toll points at about 90 km/h.
+            at += timedelta(seconds=rng.uniform(170, 190))
+        planted["convoy"].add((leader, follower))
+    for i in range(clones):
+        plate = f"CLN-{i:04d}"
+        at = DATA_START + timedelta(seconds=rng.uniform(0, window_seconds))
+        reads.append({"plate_number": plate, "toll_point_id": toll_points[0], "timestamp": at})
+        reads.append({"plate_number": plate, "toll_point_id": toll_points[-1],
+                      "timestamp": at + timedelta(seconds=rng.uniform(10, 60))})
+        planted["plate_clone"].add((plate,))
+    return reads, planted
+
+
+def main():
+    args = parse_args()
+    from create_data import iter_toll_records
+    from traffic_agents.anomalies import AnomalyEngine
+    from traffic_agents.config import config
+
+    engine = AnomalyEngine(
+        config.toll_point_positions_km,
+        max_speed_kmh=config.anomaly_max_speed_kmh,
+        clone_speed_kmh=config.anomaly_clone_speed_kmh,
+        convoy_headway_seconds=config.anomaly_convoy_headway_seconds,
+        convoy_min_points=config.anomaly_convoy_min_points,
+        max_tracked_plates=args.max_tracked_plates,
+        max_alerts=config.anomaly_max_alerts,
+    )
+    rng = random.Random(args.seed)
+    extra, planted = planted_reads(rng, config.toll_point_positions_km, args.inject_convoys, args.inject_clones)
+    extra.sort(key=lambda read: read["timestamp"])
+
+    slice_length = (DATA_END - DATA_START) / args.slices
+    engine_seconds = 0.0
+    events = 0
+    for i in range(args.slices):
+        start = DATA_START + i * slice_length
+        end = start + slice_length
+        rows = args.rows // args.slices + (1 if i < args.rows % args.slices else 0)
+        reads = list(iter_toll_records(rows, start_datetime=start, end_datetime=end, seed=args.seed * args.slices + i))
+        while extra and extra[0]["timestamp"] < end:
+            reads.append(extra.pop(0))
+        reads.sort(key=lambda read: read["timestamp"])
+        started = time.perf_counter()
+        engine.consume(reads)
+        engine_seconds += time.perf_counter() - started
+        events += len(reads)
+
+    found = {kind: {tuple(alert["plate_numbers"]) for alert in engine.alerts(kind, limit=config.anomaly_max_alerts)}
+             for kind in planted}
+    stats = engine.stats()
+    results = {
+        "events": events,
+        "engine_seconds": round(engine_seconds, 3),
+        "events_per_second": round(events / engine_seconds) if engine_seconds else None,
+        "microseconds_per_event": round(engine_seconds / events * 1e6, 2) if events else None,
+        "alerts": stats["alerts"],
+        "tracked_plates": stats["tracked_plates"],
+        "tracked_pairs": stats["tracked_pairs"],
+        "planted_detected": {
+            kind: f"{len(planted[kind] & found[kind])}/{len(planted[kind])}" for kind in planted
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Measure cold start of the traffic_agents package.
+
+Each run starts a fresh interpreter and times, in order: importing the
+package, importing the tools, the first tool call (which creates the backend
+client) and a second call on the warm backend. With --agent, each run also
+times importing the agent, which loads the ADK stack. Each run also lists
+which heavy modules ended up loaded. Medians and maxima over --runs are
+printed as JSON, so cold start can be tracked as a number between commits.
+
+    python benchmarks/cold_start.py --data-path benchmarks/data/rows-1000000-seed-0
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints one JSON object of millisecond timings.
+_PROBE = """
+import json, sys, time
+timings = {}
+started = time.perf_counter()
+import traffic_agents
+timings["import_package_ms"] = (time.perf_counter() - started) * 1000
+mark = time.perf_counter()
+from traffic_agents import tools
+timings["import_tools_ms"] = (time.perf_counter() - mark) * 1000
+mark = time.perf_counter()
+tools.get_vehicle_count_by_type("2025-10-19 08:00:00 UTC", "2025-10-19 09:00:00 UTC")
+timings["first_call_ms"] = (time.perf_counter() - mark) * 1000
+mark = time.perf_counter()
+tools.get_vehicle_count_by_type("2025-10-19 09:00:00 UTC", "2025-10-19 10:00:00 UTC")
+timings["second_call_ms"] = (time.perf_counter() - mark) * 1000
+if "--agent" in sys.argv:
+    mark = time.perf_counter()
+    from traffic_agents import agent
+    timings["import_agent_ms"] = (time.perf_counter() - mark) * 1000
+timings["total_ms"] = (time.perf_counter() - started) * 1000
+timings["heavy_modules_loaded"] = sorted(
+    m for m in ("google.adk", "google.cloud.bigquery", "duckdb", "pyarrow") if m in sys.modules
+)
+print(json.dumps(timings))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure import and first-call latency of traffic_agents.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start.")
+    parser.add_argument("--backend", default="duckdb", choices=["duckdb", "bigquery"], help="Query backend to use.")
+    parser.add_argument("--data-path", help="Local data directory for the duckdb backend.")
+    parser.add_argument("--agent", action="store_true", help="Also time importing the agent.")
+    parser.add_argument("--output", help="Write the JSON results to this file as well as stdout.")
+    return parser.parse_args()
+
+
+def run_once(args) -> dict:
+    env = dict(os.environ, TRAFFIC_QUERY_BACKEND=args.backend, TRAFFIC_QUERY_CACHE="false")
+    if args.data_path:
+        env["TRAFFIC_LOCAL_DATA_PATH"] = os.path.abspath(args.data_path)
+    command = [sys.executable, "-c", _PROBE] + (["--agent"] if args.agent else [])
+    process = subprocess.run(command, cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise SystemExit(f"Cold start probe failed:\n{process.stderr}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main():
+    args = parse_args()
+    runs = [run_once(args) for _ in range(args.runs)]
+    metrics = [key for key, value in runs[0].items() if isinstance(value, float)]
+    results = {
+        "runs": args.runs,
+        "backend": args.backend,
+        "median": {key: round(statistics.median(run[key] for run in runs), 1) for key in metrics},
+        "max": {key: round(max(run[key] for run in runs), 1) for key in metrics},
+        "heavy_modules_loaded": runs[0]["heavy_modules_loaded"],
+    }
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Measure keyframe selection on synthetic CCTV footage.
+
+A static road scene with sensor noise is rendered frame by frame, with vehicles
+(bright blocks) crossing it at seeded times and an incident at --incident-seconds.
+The frames go through `footage.select_keyframes` exactly as decoded video would,
+and the report gives the reduction in frames, selection throughput and whether
+every vehicle pass and the incident are covered by a kept frame. No video
+libraries are needed.
+
+    python benchmarks/footage_keyframes.py --minutes 10 --vehicles 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark keyframe selection on synthetic footage.")
+    parser.add_argument("--minutes", type=float, default=10.0, help="Length of the footage.")
+    parser.add_argument("--fps", type=float, default=4.0, help="Frames per second, as sampled from the video.")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=360)
+    parser.add_argument("--vehicles", type=int, default=20, help="Vehicles crossing the scene.")
+    parser.add_argument("--noise", type=float, default=2.0, help="Standard deviation of the sensor noise.")
+    parser.add_argument("--incident-seconds", type=float, help="Incident time. Defaults to the middle.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON results to this file as well as stdout.")
+    return parser.parse_args()
+
+
+def synthetic_footage(args, rng: random.Random):
+    """(seconds, frame) pairs for the scene, and the (start, end) time of each vehicle pass."""
+    np_rng = np.random.default_rng(args.seed)
+    background = np.full((args.height, args.width, 3), 90, dtype=np.uint8)
+    # Lane markings, so the scene is not uniform.
+    background[args.height // 2 - 2:args.height // 2 + 2, ::40] = 230
+    duration = args.minutes * 60
+    crossing_seconds = 3.0
+    passes = sorted((start, start + crossing_seconds)
+                    for start in (rng.uniform(0, duration - crossing_seconds) for _ in range(args.vehicles)))
+    lanes = [rng.randrange(args.height - 60) for _ in passes]
+
+    def frames():
+        for i in range(int(duration * args.fps)):
+            seconds = i / args.fps
+            frame = background.astype(np.int16)
+            for (start, end), lane in zip(passes, lanes):
+                if start <= seconds <= end:
+                    x = int((seconds - start) / (end - start) * (args.width - 80))
+                    frame[lane:lane + 50, x:x + 80] = 220
+            if args.noise:
+                frame += np_rng.normal(0, args.noise, frame.shape[:2]).astype(np.int16)[:, :, None]
+            yield seconds, np.clip(frame, 0, 255).astype(np.uint8)
+
+    return frames, passes
+
+
+def main():
+    args = parse_args()
+    from traffic_agents.config import config
+    from traffic_agents.footage import INCIDENT, select_keyframes
+
+    rng = random.Random(args.seed)
+    frames, passes = synthetic_footage(args, rng)
+    incident = args.incident_seconds if args.incident_seconds is not None else args.minutes * 30
+
+    rendered = list(frames())
+    started = time.perf_counter()
+    keyframes = select_keyframes(
+        iter(rendered), incident,
+        clip_seconds=config.footage_clip_seconds, clip_fps=config.footage_clip_fps,
+        motion_threshold=config.footage_motion_threshold, duplicate_threshold=config.footage_duplicate_threshold,
+        max_keyframes=config.footage_max_keyframes,
+    )
+    elapsed = time.perf_counter() - started
+
+    times = [keyframe.timestamp_seconds for keyframe in keyframes]
+    covered = sum(any(start <= t <= end for t in times) for start, end in passes)
+    reasons = {}
+    for keyframe in keyframes:
+        reasons[keyframe.reason] = reasons.get(keyframe.reason, 0) + 1
+    results = {
+        "frames": len(rendered),
+        "keyframes": len(keyframes),
+        "kept_fraction": round(len(keyframes) / len(rendered), 4),
+        "by_reason": reasons,
+        "vehicle_passes_covered": f"{covered}/{len(passes)}",
+        "incident_frames": reasons.get(INCIDENT, 0),
+        "selection_seconds": round(elapsed, 3),
+        "frames_per_second": round(len(rendered) / elapsed) if elapsed else None,
+    }
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Load test the full agent with many concurrent investigations and a scripted stub model.
+
+Each session plays one investigation against `create_root_agent`: the user
+reports an incident, the planner calls the plan generator, the user approves
+and the research runs through to the final report. Every LLM call is answered
+by `testing.ScriptedLlm`, which waits a fixed time and then plays that agent's
+part (calling the plan generator, transferring, calling toll tools with the
+session's plate and window, writing findings), so runs are deterministic and
+need no model endpoint. Tools run for real against a local DuckDB dataset.
+
+Sessions run through `AdkApp` (as deployed) when the Vertex AI SDK is
+installed, otherwise through an ADK `InMemoryRunner`. The report gives
+sessions/s, time to first event and latency percentiles per turn and per
+session; a per-agent breakdown of session wall time (the time until each of
+an agent's events, as ADK does not report when an agent that transferred
+finishes); tool span timings; and the stub's model calls and time per agent,
+so orchestration overhead can be read off (run with --llm-seconds 0 to see it
+alone).
+
+    python benchmarks/load_test.py --sessions 200 --concurrency 50 --llm-seconds 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+from typing import AsyncGenerator, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from run_benchmarks import DATA_START, ensure_dataset, peak_rss_mb, percentile, sample_plates  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the agent with concurrent sessions and a stub model.")
+    parser.add_argument("--sessions", type=int, default=100, help="Investigations to run.")
+    parser.add_argument("--concurrency", type=int, default=20, help="Investigations in flight at once.")
+    parser.add_argument("--llm-seconds", type=float, default=0.2, help="Simulated latency of each LLM call.")
+    parser.add_argument("--mode", choices=["transfer", "pipeline"], help="Research mode. Defaults to config.")
+    parser.add_argument("--driver", choices=["auto", "adkapp", "runner"], default="auto",
+                        help="Run sessions through AdkApp or an ADK Runner. 'auto' uses AdkApp when installed.")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed sessions run first.")
+    parser.add_argument("--data-path", help="Local dataset to query. Defaults to a generated one.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Toll records in the generated dataset.")
+    parser.add_argument("--data-dir", default=os.path.join(REPO_ROOT, "benchmarks", "data"),
+                        help="Where generated datasets are kept; each size/seed is generated once.")
+    parser.add_argument("--shards", type=int, help="Number of Parquet files. Defaults to the CPU count.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the dataset and the incidents.")
+    parser.add_argument("--cache", action="store_true", help="Leave the query cache on (off by default).")
+    parser.add_argument("--output", help="Write the JSON results to this file as well as stdout.")
+    return parser.parse_args()
+
+
+class RunnerDriver:
+    """Runs sessions on an ADK InMemoryRunner."""
+
+    name = "runner"
+
+    def __init__(self, agent):
+        from google.adk.runners import InMemoryRunner
+        from google.genai import types
+
+        self.runner = InMemoryRunner(agent=agent, app_name="load_test")
+        self.types = types
+
+    async def create_session(self, user_id: str) -> str:
+        session = await self.runner.session_service.create_session(app_name=self.runner.app_name, user_id=user_id)
+        return session.id
+
+    async def stream(self, user_id: str, session_id: str, message: str) -> AsyncGenerator[str, None]:
+        content = self.types.Content(role="user", parts=[self.types.Part(text=message)])
+        async for event in self.runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
+            yield event.author
+
+
+class AdkAppDriver:
+    """Runs sessions through AdkApp, the wrapper deploy.py ships to Agent Engine, locally."""
+
+    name = "adkapp"
+
+    def __init__(self, agent):
+        from vertexai.preview.reasoning_engines import AdkApp
+
+        self.app = AdkApp(agent=agent, enable_tracing=False)
+
+    async def create_session(self, user_id: str) -> str:
+        session = await self.app.async_create_session(user_id=user_id)
+        return session["id"] if isinstance(session, dict) else session.id
+
+    async def stream(self, user_id: str, session_id: str, message: str) -> AsyncGenerator[str, None]:
+        async for event in self.app.async_stream_query(user_id=user_id, session_id=session_id, message=message):
+            yield event.get("author") if isinstance(event, dict) else event.author
+
+
+def create_driver(name: str, agent):
+    if name == "auto":
+        try:
+            return AdkAppDriver(agent)
+        except ImportError:
+            print("Vertex AI SDK not installed; running sessions on an ADK Runner.", file=sys.stderr)
+            return RunnerDriver(agent)
+    return AdkAppDriver(agent) if name == "adkapp" else RunnerDriver(agent)
+
+
+def incident_messages(plates: List[str], rng: random.Random) -> List[List[str]]:
+    """The user's two turns for each session: the incident report, then approval of the plan."""
+    from traffic_agents.testing import APPROVAL, incident_report
+
+    sessions = []
+    for plate in plates:
+        # An hour-long window inside the generated data.
+        start = DATA_START + timedelta(seconds=rng.randrange(11 * 3600))
+        end = start + timedelta(hours=1)
+        report = incident_report(plate, f"{start:%Y-%m-%d %H:%M:%S} UTC", f"{end:%Y-%m-%d %H:%M:%S} UTC")
+        sessions.append([report, APPROVAL])
+    return sessions
+
+
+async def run_session(driver, index: int, turns: List[str]) -> dict:
+    user_id = f"load-{index}"
+    started = time.perf_counter()
+    session_id = await driver.create_session(user_id)
+    # Wall time from the previous event to each event, by the agent that produced it.
+    result = {"turns": [], "agent_seconds": {}, "error": None}
+    try:
+        for message in turns:
+            turn_started = previous = time.perf_counter()
+            first_event = None
+            events = 0
+            async for author in driver.stream(user_id, session_id, message):
+                now = time.perf_counter()
+                if first_event is None:
+                    first_event = now - turn_started
+                events += 1
+                result["agent_seconds"][author] = result["agent_seconds"].get(author, 0.0) + now - previous
+                previous = now
+            result["turns"].append({
+                "first_event_seconds": first_event,
+                "seconds": time.perf_counter() - turn_started,
+                "events": events,
+            })
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def latency_summary(values: List[float]) -> dict:
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return {}
+    return {
+        "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1),
+        "mean_ms": round(sum(values) / len(values) * 1000, 1),
+    }
+
+
+def span_summary(spans: List[dict], kind: str) -> dict:
+    durations: Dict[str, List[float]] = {}
+    for span in spans:
+        if span["kind"] == kind and span["duration_ms"] is not None:
+            durations.setdefault(span["name"], []).append(span["duration_ms"] / 1000)
+    return {name: dict(latency_summary(values), count=len(values)) for name, values in sorted(durations.items())}
+
+
+def agent_summary(results: List[dict]) -> dict:
+    """Per agent: how many sessions it ran in and the wall time until its events, per session and as a share."""
+    total = sum(result["seconds"] for result in results)
+    seconds: Dict[str, List[float]] = {}
+    for result in results:
+        for author, value in result["agent_seconds"].items():
+            seconds.setdefault(author, []).append(value)
+    return {
+        author: {
+            "sessions": len(values),
+            "seconds_per_session": latency_summary(values),
+            "share_of_session_time": round(sum(values) / total, 3) if total else None,
+        }
+        for author, values in sorted(seconds.items())
+    }
+
+
+async def run_load(args, driver, sessions: List[List[str]]) -> tuple:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(index, turns):
+        async with semaphore:
+            return await run_session(driver, index, turns)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(bounded(i, turns) for i, turns in enumerate(sessions)))
+    return results, time.perf_counter() - started
+
+
+async def main():
+    args = parse_args()
+    data_path = args.data_path or ensure_dataset(args)
+    # Configure the tools for the local dataset before they are imported.
+    os.environ["TRAFFIC_QUERY_BACKEND"] = "duckdb"
+    os.environ["TRAFFIC_LOCAL_DATA_PATH"] = os.path.abspath(data_path)
+    os.environ.setdefault("TRAFFIC_QUERY_CACHE", "true" if args.cache else "false")
+    from traffic_agents import agent
+    from traffic_agents.instrumentation import InMemoryExporter, instrumentation
+    from traffic_agents.testing import ScriptedLlm
+
+    model = ScriptedLlm(model="stub", delay=args.llm_seconds)
+    driver = create_driver(args.driver, agent.create_root_agent(args.mode, model=model))
+    rng = random.Random(args.seed)
+    plates = sample_plates(data_path, args.warmup + args.sessions, rng)
+    sessions = incident_messages(plates, rng)
+
+    # Warm the backend, query views and ADK code paths outside the measurement.
+    await run_load(args, driver, sessions[:args.warmup])
+    model.usage.clear()
+    spans = InMemoryExporter(max_spans=100 * args.sessions)
+    instrumentation.exporters.append(spans)
+
+    results, elapsed = await run_load(args, driver, sessions[args.warmup:])
+    completed = [result for result in results if result["error"] is None]
+    errors = sorted({result["error"] for result in results if result["error"]})
+    turn_count = max((len(result["turns"]) for result in completed), default=0)
+    report = {
+        "driver": driver.name,
+        "mode": args.mode or agent.config.research_mode,
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "llm_seconds": args.llm_seconds,
+        "completed": len(completed),
+        "errors": errors[:10],
+        "elapsed_seconds": round(elapsed, 3),
+        "sessions_per_second": round(len(completed) / elapsed, 2) if elapsed else None,
+        "session_latency": latency_summary([result["seconds"] for result in completed]),
+        "turns": [
+            {
+                "time_to_first_event": latency_summary([result["turns"][i]["first_event_seconds"] for result in completed]),
+                "latency": latency_summary([result["turns"][i]["seconds"] for result in completed]),
+                "events_per_session": round(sum(result["turns"][i]["events"] for result in completed) / len(completed), 1),
+            }
+            for i in range(turn_count)
+        ],
+        "agents": agent_summary(completed),
+        "tools": span_summary(spans.spans(), "tool"),
+        "model": {
+            name: {
+                "calls_per_session": round(usage["calls"] / len(results), 2),
+                "seconds_per_session": round(usage["seconds"] / len(results), 3),
+            }
+            for name, usage in sorted(model.usage.items())
+        },
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""
+Measure the wall-clock saving of the pipeline research mode with a stub model.
+
+Every LLM call is replaced by a stub that waits a fixed time and returns canned
+text, so the timings show how the agents are scheduled rather than model speed.
+Two layouts run over the same stages and the same stub:
+
+- "sequential": CCTV analysis, then database research, then the report. This is
+  what transfer mode does at best, before its extra coordinator LLM calls.
+- "pipeline": `create_research_coordinator("pipeline")`. CCTV analysis and database
+  research run concurrently, then the report runs on their merged findings.
+
+Each layout first runs --warmup untimed times, so neither absorbs the cold
+start of ADK and the agents, and the timed runs alternate which layout goes
+first.
+
+    python benchmarks/research_pipeline.py --llm-seconds 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import AsyncGenerator
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+# The stub never queries toll records; keep the tools off BigQuery.
+os.environ.setdefault("TRAFFIC_QUERY_BACKEND", "duckdb")
+
+from google.adk.agents import SequentialAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from traffic_agents import agent
+from traffic_agents.findings import RESEARCH_FINDINGS_KEY
+
+
+class StubLlm(BaseLlm):
+    """Answers every request with canned text after `delay` seconds."""
+
+    delay: float = 0.5
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.delay)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=f"Stub output from {self.model}.")]))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare sequential and pipeline research with a stub model.")
+    parser.add_argument("--llm-seconds", type=float, default=0.5, help="Simulated latency of each LLM call.")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per layout; the median is reported.")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per layout before the timed ones.")
+    return parser.parse_args()
+
+
+def build(layout: str, model: BaseLlm):
+    if layout == "pipeline":
+        return agent.create_research_coordinator("pipeline", model=model)
+    return SequentialAgent(
+        name="research_coordinator_agent",
+        sub_agents=[
+            agent.create_cctv_analysis_agent(model, pipeline=True),
+            agent.create_internal_research_executor(model, pipeline=True),
+            agent.create_report_composer(model),
+        ],
+    )
+
+
+async def run_once(layout: str, model: BaseLlm) -> dict:
+    runner = InMemoryRunner(agent=build(layout, model))
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name, user_id="benchmark", state={"research_plan": "Stub plan."}
+    )
+    message = types.Content(role="user", parts=[types.Part(text="Run the approved plan.")])
+    started = time.perf_counter()
+    async for _ in runner.run_async(user_id="benchmark", session_id=session.id, new_message=message):
+        pass
+    elapsed = time.perf_counter() - started
+    session = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id="benchmark", session_id=session.id
+    )
+    return {"seconds": elapsed, "state": session.state}
+
+
+async def main():
+    args = parse_args()
+    model = StubLlm(model="stub", delay=args.llm_seconds)
+    results = {"llm_seconds": args.llm_seconds, "runs": args.runs}
+    layouts = ("sequential", "pipeline")
+    for _ in range(args.warmup):
+        for layout in layouts:
+            await run_once(layout, model)
+    runs = {layout: [] for layout in layouts}
+    for i in range(args.runs):
+        # Alternate the order so that neither layout always runs first.
+        for layout in layouts[::-1] if i % 2 else layouts:
+            runs[layout].append(await run_once(layout, model))
+    for layout in layouts:
+        seconds = sorted(run["seconds"] for run in runs[layout])
+        state = runs[layout][-1]["state"]
+        results[layout] = {
+            "median_seconds": round(seconds[len(seconds) // 2], 3),
+            "merged_findings": bool(state.get(RESEARCH_FINDINGS_KEY)),
+            "final_report": bool(state.get("final_report")),
+        }
+    results["speedup"] = round(results["sequential"]["median_seconds"] / results["pipeline"]["median_seconds"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Compare Arrow-backed result sets with the old list-of-dict rows.
+
+Runs a full-window scan of toll records through the DuckDB backend twice: once
+as one dict per row (the old `execute_query` result) and once as a `ResultSet`.
+The report gives fetch time and memory of both, then the time to count reads
+per toll point from each, and to turn the result set into dicts at the end.
+
+    python benchmarks/result_sets.py --rows 2000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from run_benchmarks import ensure_dataset  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure ResultSet against list-of-dict query results.")
+    parser.add_argument("--data-path", help="Local dataset to query. Defaults to a generated one.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Toll records in the generated dataset.")
+    parser.add_argument("--data-dir", default=os.path.join(REPO_ROOT, "benchmarks", "data"),
+                        help="Where generated datasets are kept; each size/seed is generated once.")
+    parser.add_argument("--shards", type=int, help="Number of Parquet files. Defaults to the CPU count.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON results to this file as well as stdout.")
+    return parser.parse_args()
+
+
+def timed(call):
+    started = time.perf_counter()
+    result = call()
+    return result, round(time.perf_counter() - started, 3)
+
+
+def traced_mb(call) -> float:
+    """Peak traced memory in MB of `call()`, run apart from timing since tracing slows allocation."""
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round(peak / 2**20, 1)
+
+
+def main():
+    args = parse_args()
+    data_path = args.data_path or ensure_dataset(args)
+    os.environ["TRAFFIC_QUERY_BACKEND"] = "duckdb"
+    os.environ["TRAFFIC_LOCAL_DATA_PATH"] = data_path
+    from traffic_agents import tools
+    from traffic_agents.resultset import ResultSet
+
+    backend = tools.get_backend()
+    query = f"""
+    select record_id, plate_number, toll_point_id, timestamp, vehicle_type, image_url
+    from `{tools.TOLL_RECORDS_TABLE}`;
+    """
+    dict_rows, dict_seconds = timed(lambda: [dict(row) for row in backend.execute(query, {})])
+    results, arrow_seconds = timed(lambda: ResultSet(backend.execute_arrow(query, {})))
+    _, dict_count_seconds = timed(lambda: Counter(row["toll_point_id"] for row in dict_rows))
+    _, arrow_count_seconds = timed(lambda: results.column("toll_point_id").value_counts())
+    _, to_pylist_seconds = timed(lambda: results.slice(0, 1000).to_pylist())
+    del dict_rows
+
+    dict_mb = traced_mb(lambda: [dict(row) for row in backend.execute(query, {})])
+    # Arrow buffers are allocated outside the Python heap, so tracemalloc does not see them.
+    arrow_mb = round(traced_mb(lambda: ResultSet(backend.execute_arrow(query, {}))) + results.nbytes / 2**20, 1)
+
+    output = json.dumps({
+        "data_path": data_path,
+        "rows": len(results),
+        "list_of_dicts": {"fetch_seconds": dict_seconds, "memory_mb": dict_mb,
+                          "count_by_toll_point_seconds": dict_count_seconds},
+        "result_set": {"fetch_seconds": arrow_seconds, "memory_mb": arrow_mb,
+                       "count_by_toll_point_seconds": arrow_count_seconds,
+                       "first_1000_to_dicts_seconds": to_pylist_seconds},
+    }, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
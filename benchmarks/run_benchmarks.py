@@ -0,0 +1,281 @@
+"""
+Benchmark the toll query tools against a local DuckDB backend.
+
+Generates (or reuses) a synthetic toll_records dataset of the requested size
+with create_data.py, runs each tool repeatedly and reports latency
+percentiles, throughput, peak RSS and rows scanned as JSON. Pass a previous
+result file with --baseline to flag regressions between commits.
+
+    python benchmarks/run_benchmarks.py --rows 1000000 --output bench-1m.json
+    python benchmarks/run_benchmarks.py --rows 1000000 --baseline bench-1m.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Same window create_data.py writes into.
+DATA_START = datetime(2025, 10, 19, 8, 0, 0, tzinfo=timezone.utc)
+DATA_END = datetime(2025, 10, 19, 20, 0, 0, tzinfo=timezone.utc)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the toll query tools on a local dataset.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Number of toll records in the dataset.")
+    parser.add_argument("--data-dir", default=os.path.join(REPO_ROOT, "benchmarks", "data"),
+                        help="Where generated datasets are kept; each size/seed is generated once.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the dataset and the sampled arguments.")
+    parser.add_argument("--shards", type=int, help="Number of Parquet files. Defaults to the CPU count.")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed calls per benchmark.")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed calls per benchmark.")
+    parser.add_argument("--benchmarks", nargs="+", help="Only run these benchmarks.")
+    parser.add_argument("--cache", action="store_true", help="Leave the query cache on (off by default).")
+    parser.add_argument("--output", help="Write the JSON results to this file as well as stdout.")
+    parser.add_argument("--baseline", help="Compare against a previous JSON result file.")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Fail when a p95 latency is this fraction slower than the baseline.")
+    return parser.parse_args()
+
+
+def ensure_dataset(args) -> str:
+    """Return the data path for the requested dataset, generating it if needed."""
+    data_path = os.path.join(args.data_dir, f"rows-{args.rows}-seed-{args.seed}")
+    table_path = os.path.join(data_path, "toll_records")
+    if os.path.isdir(table_path) and os.listdir(table_path):
+        return data_path
+
+    import create_data
+
+    print(f"Generating {args.rows} toll records into '{table_path}'...", file=sys.stderr)
+    started = time.perf_counter()
+    create_data.write_toll_records_shards(
+        table_path, args.rows, num_shards=args.shards, start_datetime=DATA_START, end_datetime=DATA_END,
+        seed=args.seed,
+    )
+    print(f"Generated in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return data_path
+
+
+def sample_plates(data_path: str, count: int, rng: random.Random) -> list:
+    """Pick plate numbers that exist in the dataset."""
+    import pyarrow.parquet as pq
+
+    table_path = os.path.join(data_path, "toll_records")
+    first_shard = sorted(os.listdir(table_path))[0]
+    plates = pq.read_table(os.path.join(table_path, first_shard), columns=["plate_number"]).column(0)
+    return [plates[rng.randrange(len(plates))].as_py() for _ in range(count)]
+
+
+def random_window(rng: random.Random, length: timedelta) -> tuple:
+    offset = rng.random() * ((DATA_END - DATA_START) - length).total_seconds()
+    start = DATA_START + timedelta(seconds=offset)
+    return start.strftime("%Y-%m-%d %H:%M:%S UTC"), (start + length).strftime("%Y-%m-%d %H:%M:%S UTC")
+
+
+def build_benchmarks(tools, plates: list, rng: random.Random) -> dict:
+    """Map benchmark names to functions producing one tool call's arguments."""
+    def plate_lookup():
+        return tools.get_toll_records_by_plate_number, {"plate_number": rng.choice(plates)}
+
+    def plate_lookup_window():
+        start, end = random_window(rng, timedelta(hours=2))
+        return tools.get_toll_records_by_plate_number, {
+            "plate_number": rng.choice(plates), "start_timestamp": start, "end_timestamp": end,
+        }
+
+    def multi_plate_lookup():
+        return tools.get_toll_records_by_plate_numbers, {"plate_numbers": rng.sample(plates, 20)}
+
+    def count_by_type_hour():
+        start, end = random_window(rng, timedelta(hours=1))
+        return tools.get_vehicle_count_by_type, {"start_timestamp": start, "end_timestamp": end}
+
+    def count_by_type_day():
+        start, end = random_window(rng, DATA_END - DATA_START)
+        return tools.get_vehicle_count_by_type, {"start_timestamp": start, "end_timestamp": end}
+
+    def count_by_toll_point_hour():
+        start, end = random_window(rng, timedelta(hours=1))
+        return tools.get_vehicle_count_by_toll_point, {"start_timestamp": start, "end_timestamp": end}
+
+    return {
+        "plate_lookup": plate_lookup,
+        "plate_lookup_window": plate_lookup_window,
+        "multi_plate_lookup": multi_plate_lookup,
+        "count_by_type_hour": count_by_type_hour,
+        "count_by_type_day": count_by_type_day,
+        "count_by_toll_point_hour": count_by_toll_point_hour,
+    }
+
+
+class RecordingBackend:
+    """Passes queries through to a backend, remembering what was run."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append((query, params))
+        return self.backend.execute(query, params)
+
+    def execute_arrow(self, query, params=None):
+        self.queries.append((query, params))
+        return self.backend.execute_arrow(query, params)
+
+    def execute_iter(self, query, params=None):
+        self.queries.append((query, params))
+        return self.backend.execute_iter(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_benchmark(make_call, recorder: RecordingBackend, iterations: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        tool, kwargs = make_call()
+        tool(**kwargs)
+
+    latencies = []
+    results = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        tool, kwargs = make_call()
+        call_started = time.perf_counter()
+        result = tool(**kwargs)
+        latencies.append(time.perf_counter() - call_started)
+        results += len(result["records"]) if isinstance(result, dict) else len(result)
+    elapsed = time.perf_counter() - started
+
+    # Measure the data read by one more call outside the timed loop, as profiling re-runs its queries.
+    recorder.queries.clear()
+    tool, kwargs = make_call()
+    tool(**kwargs)
+    rows_scanned = bytes_scanned = None
+    for query, params in recorder.queries:
+        stats = recorder.backend.scan_stats(query, params)
+        if stats["rows_scanned"] is not None:
+            rows_scanned = (rows_scanned or 0) + stats["rows_scanned"]
+        if stats["bytes_scanned"] is not None:
+            bytes_scanned = (bytes_scanned or 0) + stats["bytes_scanned"]
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "calls_per_second": round(iterations / elapsed, 2) if elapsed else None,
+        "results_per_call": round(results / iterations, 1),
+        "queries_per_call": len(recorder.queries),
+        "rows_scanned_per_call": rows_scanned,
+        "bytes_scanned_per_call": bytes_scanned,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_to_baseline(results: dict, baseline: dict, max_regression: float) -> list:
+    """Return a description of each benchmark whose p95 regressed by more than `max_regression`."""
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if not previous:
+            continue
+        change = current["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0.0
+        current["p95_change_vs_baseline"] = round(change, 3)
+        if change > max_regression:
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms ({change:+.0%})")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    data_path = ensure_dataset(args)
+
+    # Configure the tools for the local dataset before they are imported.
+    os.environ["TRAFFIC_QUERY_BACKEND"] = "duckdb"
+    os.environ["TRAFFIC_LOCAL_DATA_PATH"] = data_path
+    os.environ.setdefault("TRAFFIC_QUERY_CACHE", "true" if args.cache else "false")
+    from traffic_agents import tools
+
+    recorder = RecordingBackend(tools.get_backend())
+    tools.set_backend(recorder)
+
+    # Build the optional in-process structures up front so their cost is reported, not timed.
+    build_seconds = {}
+    for name, build in [("plate_index", tools.get_plate_index), ("rollups", tools.get_rollup_store)]:
+        started = time.perf_counter()
+        if build() is not None:
+            build_seconds[name] = round(time.perf_counter() - started, 3)
+
+    rng = random.Random(args.seed)
+    benchmarks = build_benchmarks(tools, sample_plates(data_path, 1000, rng), rng)
+    selected = args.benchmarks or list(benchmarks)
+    unknown = [name for name in selected if name not in benchmarks]
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks {unknown}; choose from {list(benchmarks)}")
+
+    results = {
+        "commit": git_commit(),
+        "rows": args.rows,
+        "seed": args.seed,
+        "backend": recorder.name,
+        "query_cache": tools.config.query_cache_enabled,
+        "plate_index": tools.config.plate_index_enabled,
+        "rollups": tools.config.rollups_enabled,
+        "build_seconds": build_seconds,
+        "benchmarks": {},
+    }
+    for name in selected:
+        print(f"Running {name}...", file=sys.stderr)
+        results["benchmarks"][name] = run_benchmark(benchmarks[name], recorder, args.iterations, args.warmup)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.max_regression)
+        results["regressions"] = regressions
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    if regressions:
+        print("Regressions against baseline:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
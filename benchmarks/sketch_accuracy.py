@@ -0,0 +1,173 @@
+"""
+Compare the sketch-backed distinct vehicle and frequent plate tools with exact SQL.
+
+Builds the sketches over a local dataset, then asks `get_distinct_vehicle_count`
+and `get_frequent_plate_numbers` the same questions with sketches on and off.
+The report gives the build time and size of the sketches, latency of both
+paths, the relative error of distinct counts and, for frequent plates, how many
+returned plates really are among the most frequent (ties with the last exact
+plate count as hits), their true reads as a share of the exact top plates'
+reads and how far the estimates were above the true counts.
+
+Uniform generated data has no frequent plates to find; use simulated data:
+
+    python simulate_traffic.py --output-dir /tmp/sim --days 4
+    python benchmarks/sketch_accuracy.py --data-path /tmp/sim
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from run_benchmarks import ensure_dataset, peak_rss_mb, percentile  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure sketch tool error and latency against exact SQL.")
+    parser.add_argument("--data-path", help="Local dataset to query. Defaults to a generated one.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Toll records in the generated dataset.")
+    parser.add_argument("--data-dir", default=os.path.join(REPO_ROOT, "benchmarks", "data"),
+                        help="Where generated datasets are kept; each size/seed is generated once.")
+    parser.add_argument("--shards", type=int, help="Number of Parquet files. Defaults to the CPU count.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--windows", type=int, default=20, help="Random windows asked per question.")
+    parser.add_argument("--limit", type=int, default=10, help="Plates asked for by frequent plate questions.")
+    parser.add_argument("--output", help="Write the JSON results to this file as well as stdout.")
+    return parser.parse_args()
+
+
+def summarize(values: list) -> dict:
+    values = sorted(values)
+    return {
+        "mean": round(sum(values) / len(values), 4) if values else None,
+        "p50": round(percentile(values, 0.5), 4) if values else None,
+        "max": round(values[-1], 4) if values else None,
+    }
+
+
+def exact_reads(tools, plate_numbers: list, start: str, end: str, toll_point_ids) -> dict:
+    """True read counts of `plate_numbers` in the window."""
+    query = f"""
+    select plate_number, count(record_id) as reads from `{tools.TOLL_RECORDS_TABLE}`
+    where timestamp between @start_timestamp and @end_timestamp and plate_number in unnest(@plate_numbers)
+    """
+    params = {"start_timestamp": tools.parse_timestamp(start), "end_timestamp": tools.parse_timestamp(end),
+              "plate_numbers": plate_numbers}
+    if toll_point_ids:
+        query += "    and toll_point_id in unnest(@toll_point_ids)\n"
+        params["toll_point_ids"] = toll_point_ids
+    counts = {plate: 0 for plate in plate_numbers}
+    rows = tools.execute_query(query + "    group by plate_number;\n", params)
+    counts.update((row["plate_number"], row["reads"]) for row in rows)
+    return counts
+
+
+def timed(call):
+    started = time.perf_counter()
+    result = call()
+    return result, time.perf_counter() - started
+
+
+def main():
+    args = parse_args()
+    data_path = args.data_path or ensure_dataset(args)
+    os.environ["TRAFFIC_QUERY_BACKEND"] = "duckdb"
+    os.environ["TRAFFIC_LOCAL_DATA_PATH"] = data_path
+    os.environ["TRAFFIC_QUERY_CACHE"] = "false"
+    from traffic_agents import tools
+    from traffic_agents.columnar import from_micros
+    from traffic_agents.config import config
+
+    bounds = tools.execute_query(f"""
+    select unix_micros(min(timestamp)) as first, unix_micros(max(timestamp)) as last
+    from `{tools.TOLL_RECORDS_TABLE}`;
+    """)[0]
+    first, last = from_micros(bounds["first"]), from_micros(bounds["last"])
+    toll_points = [row["toll_point_id"] for row in tools.execute_query(
+        f"select distinct toll_point_id from `{tools.TOLL_RECORDS_TABLE}` order by toll_point_id;"
+    )]
+
+    config.sketches_enabled = True
+    rss_before = peak_rss_mb()
+    store, build_seconds = timed(tools.get_sketch_store)
+
+    rng = random.Random(args.seed)
+    bucket = timedelta(seconds=config.sketch_bucket_seconds)
+
+    def aligned_window(length: timedelta) -> tuple:
+        # Bucket-aligned, so the sketches and SQL answer over exactly the same rows.
+        buckets = max(1, int((last - first - length) / bucket))
+        start = from_micros(bounds["first"] // store.bucket_micros * store.bucket_micros) \
+            + bucket * rng.randrange(buckets)
+        end = start + length - timedelta(microseconds=1)
+        return start.strftime("%Y-%m-%d %H:%M:%S.%f UTC"), end.strftime("%Y-%m-%d %H:%M:%S.%f UTC")
+
+    def both(tool, *call_args):
+        config.sketches_enabled = False
+        exact, exact_seconds = timed(lambda: tool(*call_args))
+        config.sketches_enabled = True
+        estimate, sketch_seconds = timed(lambda: tool(*call_args))
+        latency["exact"].append(exact_seconds)
+        latency["sketch"].append(sketch_seconds)
+        return exact, estimate
+
+    latency = {"exact": [], "sketch": []}
+    distinct_errors = []
+    for _ in range(args.windows):
+        start, end = aligned_window(bucket)
+        exact, estimate = both(tools.get_distinct_vehicle_count, start, end, [rng.choice(toll_points)])
+        if exact["distinct_vehicles"]:
+            distinct_errors.append(abs(estimate["distinct_vehicles"] - exact["distinct_vehicles"])
+                                   / exact["distinct_vehicles"])
+    distinct_latency, latency = latency, {"exact": [], "sketch": []}
+
+    hits, read_ratios, overcounts = [], [], []
+    day = min(timedelta(days=1), last - first)
+    for _ in range(args.windows):
+        start, end = aligned_window(day)
+        toll_point_ids = [rng.choice(toll_points)] if rng.random() < 0.5 else None
+        exact, estimate = both(tools.get_frequent_plate_numbers, start, end, toll_point_ids, args.limit)
+        if not exact["plates"]:
+            continue
+        cutoff = exact["plates"][-1]["reads"]
+        true_reads = exact_reads(tools, [plate["plate_number"] for plate in estimate["plates"]],
+                                 start, end, toll_point_ids)
+        hits.append(sum(true_reads[plate["plate_number"]] >= cutoff for plate in estimate["plates"])
+                    / len(exact["plates"]))
+        read_ratios.append(sum(true_reads.values()) / sum(plate["reads"] for plate in exact["plates"]))
+        overcounts += [plate["reads"] - true_reads[plate["plate_number"]] for plate in estimate["plates"]]
+    frequent_latency = latency
+
+    results = {
+        "data_path": data_path,
+        "sketch_build_seconds": round(build_seconds, 2),
+        "sketch_cells": store.cell_count,
+        "sketch_rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+        "distinct_vehicles": {
+            "relative_error": summarize(distinct_errors),
+            "exact_seconds": summarize(distinct_latency["exact"]),
+            "sketch_seconds": summarize(distinct_latency["sketch"]),
+        },
+        "frequent_plates": {
+            "precision": summarize(hits),
+            "true_reads_vs_exact_top": summarize(read_ratios),
+            "overcount": summarize(overcounts),
+            "exact_seconds": summarize(frequent_latency["exact"]),
+            "sketch_seconds": summarize(frequent_latency["sketch"]),
+        },
+    }
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
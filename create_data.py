@@ -1,10 +1,16 @@
+import argparse
+import json
 import os
-import random
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
+import numpy as np
 from google.cloud import bigquery
-from faker import Faker
 from google.api_core.exceptions import NotFound, Conflict
-import uuid
+from traffic_agents.synthetic import (
+    TOLL_RECORD_COLUMNS, fixed_width_strings, generate_plate_bytes, generate_uuid4_bytes, make_toll_records_batch,
+    toll_points, toll_records_batch_to_arrow, toll_records_batch_to_ndjson, vehicle_types,
+)
 
 # --- Configuration ---
 project_id = "ajmalaziz-814-20250326021733"
@@ -16,8 +22,6 @@ TABLES = {
     'toll_records': 'toll_records',
 }
 
-client = bigquery.Client(project=project_id)
-
 # --- Table Schema ---
 
 # Toll records table schema - Core data for license plate reads
@@ -30,35 +34,14 @@ toll_records_schema = [
     bigquery.SchemaField("image_url", "STRING", mode="NULLABLE"),
 ]
 
-# --- Data Generation Setup ---
-fake = Faker()
-
-# Define realistic toll points
-toll_points = [
-    "TP-001", "TP-002", "TP-003", "TP-004", "TP-005",
-    "TP-006", "TP-007", "TP-008", "TP-009", "TP-010"
-]
-
-# Vehicle types
-vehicle_types = ["Car", "Truck", "Bus", "Motorcycle", "Van"]
+# Day partitions on timestamp for the tools' time windows; clustering for plate and toll point lookups.
+TOLL_RECORDS_LAYOUT = {
+    "partition_field": "timestamp",
+    "clustering_fields": ["plate_number", "toll_point_id"],
+}
 
 # --- Helper Functions ---
 
-def generate_plate_number():
-    """Generate a random license plate number."""
-    return f"{''.join(random.choices('ABCDEFGHIJKLMNOPQRSTUVWXYZ', k=3))}-{''.join(random.choices('0123456789', k=3))}"
-
-def generate_uuid():
-    """Generate a UUID for unique identifiers."""
-    return str(uuid.uuid4())
-
-def generate_timestamp(start_date, end_date):
-    """Generate a random UTC timestamp within a given date range."""
-    time_between_dates = end_date - start_date
-    seconds_between_dates = time_between_dates.total_seconds()
-    random_seconds = random.uniform(0, seconds_between_dates)
-    return (start_date + timedelta(seconds=random_seconds)).replace(tzinfo=timezone.utc)
-
 def generate_date_range(start_datetime=None, end_datetime=None, days_back=30):
     """Generate start and end dates for data generation."""
     if start_datetime and end_datetime:
@@ -67,31 +50,124 @@ def generate_date_range(start_datetime=None, end_datetime=None, days_back=30):
     start_date = end_date - timedelta(days=days_back)
     return start_date, end_date
 
-# --- Data Generation Functions ---
+# --- Vectorized Data Generation ---
+
+# Batches are assembled from the column generators in traffic_agents/synthetic.py,
+# shared with simulate_traffic.py. These replace the per-row Faker helpers:
+# generate_toll_records_data() is now iter_toll_records() for row dicts, or
+# generate_toll_records_batches() for columnar batches, and
+# generate_plate_number(), generate_uuid() and generate_timestamp() are drawn
+# a batch at a time inside the latter.
+
+def _to_epoch_micros(value):
+    """Convert a datetime to microseconds since the epoch, treating naive values as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1_000_000)
+
+
+def generate_toll_records_batches(num_records, batch_size=1_000_000, start_datetime=None, end_datetime=None, seed=None):
+    """
+    Generate synthetic toll records as a stream of fixed-size columnar batches.
+
+    Each batch is a dict of NumPy arrays keyed by TOLL_RECORD_COLUMNS, in the
+    format described in traffic_agents/synthetic.py. Only one batch is held in
+    memory at a time.
 
-def generate_toll_records_data(num_records, start_datetime=None, end_datetime=None):
-    """Generate synthetic toll record data."""
-    data = []
+    Args:
+        num_records (int): Total number of records to generate.
+        batch_size (int): Maximum number of records per batch.
+        start_datetime (datetime): Start of the timestamp range. Defaults to 30 days ago.
+        end_datetime (datetime): End of the timestamp range. Defaults to now.
+        seed (int | np.random.SeedSequence): Seed for reproducible output.
+    """
+    rng = np.random.default_rng(seed)
     start_date, end_date = generate_date_range(start_datetime=start_datetime, end_datetime=end_datetime)
-    
-    for _ in range(num_records):
-        record_id = generate_uuid()
-        plate_number = generate_plate_number()
-        toll_point_id = random.choice(toll_points)
-        timestamp = generate_timestamp(start_date, end_date)
-        vehicle_type = random.choice(vehicle_types)
-        image_url = f"http://example.com/images/{record_id}.jpg"
-        
-        data.append({
-            "record_id": record_id,
-            "plate_number": plate_number,
-            "toll_point_id": toll_point_id,
-            "timestamp": timestamp,
-            "vehicle_type": vehicle_type,
-            "image_url": image_url,
-        })
-    
-    return data
+    start_us = _to_epoch_micros(start_date)
+    span_us = max(_to_epoch_micros(end_date) - start_us, 1)
+
+    remaining = num_records
+    while remaining > 0:
+        n = min(batch_size, remaining)
+        remaining -= n
+
+        uuids = generate_uuid4_bytes(rng, n)
+        toll_point_codes = rng.integers(0, len(toll_points), size=n, dtype=np.int8)
+        vehicle_type_codes = rng.integers(0, len(vehicle_types), size=n, dtype=np.int8)
+        timestamps = (start_us + rng.integers(0, span_us, size=n, dtype=np.int64)).astype("datetime64[us]")
+        plate_numbers = fixed_width_strings(generate_plate_bytes(rng, n))
+        yield make_toll_records_batch(uuids, plate_numbers, toll_point_codes, timestamps, vehicle_type_codes)
+
+
+def write_toll_records_shard(path, num_records, fmt="parquet", batch_size=1_000_000,
+                             start_datetime=None, end_datetime=None, seed=None):
+    """
+    Generate toll records straight into a single Parquet or NDJSON file.
+
+    Batches are written as they are generated (one Parquet row group per batch),
+    so memory stays bounded by `batch_size` regardless of `num_records`.
+
+    Returns:
+        int: The number of records written.
+    """
+    batches = generate_toll_records_batches(
+        num_records, batch_size=batch_size, start_datetime=start_datetime,
+        end_datetime=end_datetime, seed=seed,
+    )
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for batch in batches:
+                table = toll_records_batch_to_arrow(batch)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    elif fmt == "ndjson":
+        with open(path, "wb") as f:
+            for batch in batches:
+                f.write(toll_records_batch_to_ndjson(batch))
+    else:
+        raise ValueError(f"Unsupported output format: {fmt!r}")
+    return num_records
+
+
+def write_toll_records_shards(output_dir, num_records, num_shards=None, fmt="parquet", batch_size=1_000_000,
+                              start_datetime=None, end_datetime=None, seed=None, workers=None):
+    """
+    Generate toll records into `num_shards` files under `output_dir` using a process pool.
+
+    Each shard gets its own child seed spawned from `seed`, so the output depends
+    only on (`seed`, `num_records`, `num_shards`) and not on the number of workers.
+    Without a seed every call writes different records.
+
+    Returns:
+        list[str]: Paths of the shard files written.
+    """
+    workers = workers or os.cpu_count() or 1
+    num_shards = num_shards or workers
+    os.makedirs(output_dir, exist_ok=True)
+
+    shard_seeds = np.random.SeedSequence(seed).spawn(num_shards)
+    base, extra = divmod(num_records, num_shards)
+    extension = "parquet" if fmt == "parquet" else "ndjson"
+    paths = [os.path.join(output_dir, f"part-{i:05d}.{extension}") for i in range(num_shards)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                write_toll_records_shard, path, base + (1 if i < extra else 0), fmt, batch_size,
+                start_datetime, end_datetime, shard_seeds[i],
+            )
+            for i, path in enumerate(paths)
+        ]
+        for future in futures:
+            future.result()
+    return paths
 
 # --- Table Management Functions ---
 
@@ -114,13 +190,32 @@ def create_dataset_if_not_exists(client, dataset_id, project_id, region):
             print(f"Error creating dataset '{dataset_id}': {create_e}")
             raise
 
-def create_table_if_not_exists(client, dataset_id, table_id, schema):
-    """Create a BigQuery table if it does not already exist."""
+def create_table_if_not_exists(client, dataset_id, table_id, schema, partition_field=None, clustering_fields=None):
+    """
+    Create a BigQuery table if it does not already exist.
+
+    Args:
+        partition_field (str): TIMESTAMP column to partition the table on by day, so queries
+            filtering on it only scan (and bill) the days they cover.
+        clustering_fields (list[str]): Columns to cluster each partition by, so filters on
+            them skip blocks within a partition.
+    """
     table_ref = bigquery.TableReference(bigquery.DatasetReference(project_id, dataset_id), table_id)
     table = bigquery.Table(table_ref, schema=schema)
+    if partition_field:
+        table.time_partitioning = bigquery.TimePartitioning(type_=bigquery.TimePartitioningType.DAY,
+                                                            field=partition_field)
+    if clustering_fields:
+        table.clustering_fields = clustering_fields
     try:
-        client.get_table(table)
+        existing = client.get_table(table)
         print(f"Table '{table_id}' already exists.")
+        existing_partition = existing.time_partitioning.field if existing.time_partitioning else None
+        if existing_partition != partition_field or (existing.clustering_fields or None) != (clustering_fields or None):
+            # Partitioning cannot be changed in place; the table has to be recreated to pick it up.
+            print(f"Warning: '{table_id}' is partitioned on {existing_partition!r} and clustered on "
+                  f"{existing.clustering_fields!r}, not {partition_field!r} and {clustering_fields!r}. "
+                  f"Recreate it to prune partitions.")
     except NotFound:
         print(f"Table '{table_id}' not found. Attempting to create it...")
         try:
@@ -132,25 +227,168 @@ def create_table_if_not_exists(client, dataset_id, table_id, schema):
             print(f"Error creating table '{table_id}': {create_e}")
             raise
 
-def insert_data_into_table(client, dataset_id, table_id, data):
-    """Insert rows into a BigQuery table."""
-    table_ref = client.dataset(dataset_id).table(table_id)
-    
+def insert_data_into_table(client, dataset_id, table_id, rows, num_rows, checkpoint_path=None, workers=8,
+                           source_fingerprint=None):
+    """
+    Insert rows into a BigQuery table through the chunked ingest pipeline.
+
+    `rows` may be any iterable, e.g. the `iter_toll_records` stream, and is
+    consumed chunk by chunk; `num_rows` is its length. Small batches use
+    concurrent streaming inserts; batches of LOAD_JOB_THRESHOLD rows or more
+    switch to file-based load jobs. Failed chunks are retried with backoff,
+    and `checkpoint_path` lets an interrupted load resume. A checkpoint needs
+    a `source_fingerprint` identifying the rows, such as the generator's seed
+    and size, which also keeps load job ids stable across the runs resuming
+    it. Without one, each run loads under new job ids.
+    """
+    from traffic_agents.ingest import (
+        BigQueryLoadJobSink, BigQueryStreamingSink, DEFAULT_CHUNK_BYTES, IngestError, LOAD_JOB_CHUNK_BYTES,
+        LOAD_JOB_CHUNK_ROWS, LOAD_JOB_THRESHOLD, ingest_rows
+    )
+
+    if checkpoint_path and source_fingerprint is None:
+        raise ValueError("Resuming from a checkpoint needs a source_fingerprint for the rows")
+    table_ref = bigquery.DatasetReference(project_id, dataset_id).table(table_id)
+
     try:
-        table = client.get_table(table_ref)
+        if num_rows >= LOAD_JOB_THRESHOLD:
+            sink = BigQueryLoadJobSink(client, table_ref, toll_records_schema, source_fingerprint=source_fingerprint,
+                                       location=region)
+            chunk_size, chunk_bytes = LOAD_JOB_CHUNK_ROWS, LOAD_JOB_CHUNK_BYTES
+            # Each in-flight chunk holds LOAD_JOB_CHUNK_ROWS rows in memory.
+            workers = min(workers, 2)
+        else:
+            sink = BigQueryStreamingSink(client, table_ref)
+            chunk_size, chunk_bytes = 500, DEFAULT_CHUNK_BYTES
     except NotFound:
         print(f"Error: Table '{table_id}' not found during data insertion.")
         return
 
-    errors = client.insert_rows(table, data)
-    if errors:
-        print(f"Encountered errors while inserting rows into '{table_id}': {errors}")
-    else:
-        print(f"Successfully inserted {len(data)} rows into '{table_id}'.")
+    try:
+        result = ingest_rows(
+            rows, sink, chunk_size=chunk_size, chunk_bytes=chunk_bytes, workers=workers,
+            checkpoint_path=checkpoint_path, source_fingerprint=source_fingerprint,
+        )
+    except IngestError as e:
+        print(f"Encountered errors while inserting rows into '{table_id}': {e}")
+        raise
+    print(f"Successfully inserted {result.rows} rows into '{table_id}' "
+          f"({result.skipped_chunks} chunks already loaded, {result.rows_per_second:.0f} rows/s).")
+
+
+def iter_toll_records(num_records, start_datetime=None, end_datetime=None, seed=None, batch_size=100_000):
+    """Yield toll records one dict at a time from the vectorized generator."""
+    for batch in generate_toll_records_batches(
+        num_records, batch_size=batch_size, start_datetime=start_datetime, end_datetime=end_datetime, seed=seed
+    ):
+        timestamps = batch["timestamp"].astype(datetime)
+        columns = [batch[column] for column in ("record_id", "plate_number", "toll_point_id")]
+        for record_id, plate_number, toll_point_id, timestamp, vehicle_type, image_url in zip(
+            *(column.tolist() for column in columns), timestamps.tolist(),
+            batch["vehicle_type"].tolist(), batch["image_url"].tolist(),
+        ):
+            yield {
+                "record_id": record_id.decode(),
+                "plate_number": plate_number.decode(),
+                "toll_point_id": toll_point_id.decode(),
+                "timestamp": timestamp.replace(tzinfo=timezone.utc),
+                "vehicle_type": vehicle_type.decode(),
+                "image_url": image_url.decode(),
+            }
 
 # --- Main Execution ---
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic number plate reader data.")
+    parser.add_argument("--local-dir", help="Write Parquet/NDJSON shards to this directory instead of BigQuery.")
+    parser.add_argument("--num-records", type=int, default=100, help="Number of toll records to generate.")
+    parser.add_argument("--format", choices=["parquet", "ndjson"], default="parquet", help="Local shard format.")
+    parser.add_argument("--shards", type=int, help="Number of shard files. Defaults to the number of workers.")
+    parser.add_argument("--workers", type=int, help="Worker processes. Defaults to the CPU count.")
+    parser.add_argument("--batch-size", type=int, default=1_000_000, help="Rows generated per batch.")
+    parser.add_argument("--seed", type=int,
+                        help="Seed for reproducible data. Defaults to a fresh one, so every run has new record ids.")
+    parser.add_argument("--ingest-dir", help="Run the rows through the ingest pipeline into a local Parquet sink.")
+    parser.add_argument("--checkpoint", help="Checkpoint file used to resume an interrupted ingest.")
+    args = parser.parse_args()
+    if args.checkpoint and args.seed is None:
+        parser.error("--checkpoint needs --seed, so that a resumed run generates the same records")
+    return args
+
+
+def generate_local_shards(args, start_datetime, end_datetime):
+    """Write toll records to local shards and report the generation throughput."""
+    output_dir = os.path.join(args.local_dir, TABLES['toll_records'])
+    if start_datetime.date() == end_datetime.date():
+        # Lay the day out as a date partition, like the day-partitioned BigQuery table.
+        output_dir = os.path.join(output_dir, f"date={start_datetime.date().isoformat()}")
+    print(f"Writing {args.num_records} toll records to '{output_dir}' as {args.format}...")
+    started = time.perf_counter()
+    paths = write_toll_records_shards(
+        output_dir, args.num_records, num_shards=args.shards, fmt=args.format, batch_size=args.batch_size,
+        start_datetime=start_datetime, end_datetime=end_datetime, seed=args.seed, workers=args.workers,
+    )
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "records": args.num_records,
+        "shards": len(paths),
+        "seconds": round(elapsed, 3),
+        "records_per_second": round(args.num_records / elapsed) if elapsed else None,
+    }))
+
+
+def toll_records_fingerprint(args, start_datetime, end_datetime):
+    """
+    Identify the rows iter_toll_records generates, which are determined by their count, seed and time range.
+
+    Only a run with a `--checkpoint` gets one: it lets the checkpoint be resumed and keeps load job ids
+    stable across the resumed runs. Other runs return None, so their sinks use fresh ids and re-running
+    the script loads its new rows instead of matching the previous run's jobs.
+    """
+    if not args.checkpoint:
+        return None
+    return f"toll_records:{args.num_records}:{args.seed}:{start_datetime.isoformat()}:{end_datetime.isoformat()}"
+
+
+def ingest_local(args, start_datetime, end_datetime):
+    """Benchmark the ingest pipeline offline against the local Parquet sink."""
+    from traffic_agents.ingest import ParquetSink, ingest_rows
+
+    output_dir = os.path.join(args.ingest_dir, TABLES['toll_records'])
+    rows = iter_toll_records(args.num_records, start_datetime=start_datetime, end_datetime=end_datetime, seed=args.seed)
+    result = ingest_rows(
+        rows, ParquetSink(output_dir), chunk_size=50_000, workers=args.workers or 8, checkpoint_path=args.checkpoint,
+        source_fingerprint=toll_records_fingerprint(args, start_datetime, end_datetime),
+    )
+    print(json.dumps({
+        "records": result.rows,
+        "chunks": result.chunks,
+        "skipped_chunks": result.skipped_chunks,
+        "seconds": round(result.seconds, 3),
+        "records_per_second": round(result.rows_per_second),
+    }))
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.seed is None:
+        # Draw the seed here rather than inside numpy, so it can be reported and the run reproduced.
+        args.seed = int(np.random.SeedSequence().entropy)
+    print(f"Generating with --seed {args.seed}")
+    target_date = datetime(2025, 10, 19)
+    start_of_day = datetime(target_date.year, target_date.month, target_date.day, 8, 0, 0, tzinfo=timezone.utc)
+    end_of_day = datetime(target_date.year, target_date.month, target_date.day, 20, 0, 0, tzinfo=timezone.utc)
+
+    if args.local_dir:
+        generate_local_shards(args, start_of_day, end_of_day)
+        raise SystemExit(0)
+    if args.ingest_dir:
+        ingest_local(args, start_of_day, end_of_day)
+        raise SystemExit(0)
+
     try:
+        client = bigquery.Client(project=project_id)
+
         # Create dataset if it doesn't exist
         create_dataset_if_not_exists(client, dataset_id, project_id, region)
 
@@ -160,19 +398,22 @@ if __name__ == "__main__":
         }
 
         # Create all tables
+        table_layouts = {
+            TABLES['toll_records']: TOLL_RECORDS_LAYOUT,
+        }
         for table_name, schema in table_schemas.items():
-            create_table_if_not_exists(client, dataset_id, table_name, schema)
+            create_table_if_not_exists(client, dataset_id, table_name, schema, **table_layouts.get(table_name, {}))
 
         # Generate and insert data
         print("\n=== Generating number plate reader data ===")
         
-        # 1. Generate toll records
+        # 1. Generate toll records, streamed into the ingest pipeline a chunk at a time
         print("Generating toll records data...")
-        target_date = datetime(2025, 10, 19)
-        start_of_day = datetime(target_date.year, target_date.month, target_date.day, 8, 0, 0, tzinfo=timezone.utc)
-        end_of_day = datetime(target_date.year, target_date.month, target_date.day, 20, 0, 0, tzinfo=timezone.utc)
-        toll_records_data = generate_toll_records_data(100, start_datetime=start_of_day, end_datetime=end_of_day)
-        insert_data_into_table(client, dataset_id, TABLES['toll_records'], toll_records_data)
+        toll_records = iter_toll_records(args.num_records, start_datetime=start_of_day, end_datetime=end_of_day,
+                                         seed=args.seed)
+        insert_data_into_table(client, dataset_id, TABLES['toll_records'], toll_records, args.num_records,
+                               checkpoint_path=args.checkpoint, workers=args.workers or 8,
+                               source_fingerprint=toll_records_fingerprint(args, start_of_day, end_of_day))
 
         print("\n=== Number plate reader data generation completed successfully! ===")
         print(f"Table created in dataset '{dataset_id}':")
@@ -180,7 +421,7 @@ if __name__ == "__main__":
             print(f"  - {table_name}")
 
         print(f"\nGenerated data summary:")
-        print(f"  - Toll Records: {len(toll_records_data)} records")
+        print(f"  - Toll Records: {args.num_records} records")
 
     except Exception as e:
         print(f"An unhandled error occurred during script execution: {e}")
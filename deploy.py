@@ -60,7 +60,10 @@ remote_app = agent_engines.create(
         "db-dtypes>=1.4.3",
         "python-dotenv>=1.1.1",
         "google-cloud-secret-manager",
-        "pandas>=2.3.1"
+        "pandas>=2.3.1",
+        "numpy>=2.0",
+        "pyarrow>=17.0",
+        "pyyaml>=6.0",
     ],
     extra_packages=[
         "./traffic_agents",
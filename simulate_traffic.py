@@ -0,0 +1,339 @@
+"""
+Simulate toll reads from a fleet of recurring vehicles driving a road network.
+
+Unlike create_data.py, which draws an independent random plate, toll point and
+time for every read, this produces the access patterns the agent's caches and
+indexes see in practice:
+
+- A road graph of toll points: every trip reads the toll points along the
+  shortest path between its origin and destination, in order, at a plausible
+  speed, so journeys, convoys and co-location have real structure.
+- A fixed fleet whose plates recur every day. Commuters drive home to work
+  around the morning peak and back around the evening peak on weekdays;
+  commercial vehicles make several trips over the working day, with a heavy
+  tailed number of trips per vehicle, so a few plates are very hot; buses
+  shuttle the whole corridor all day; everyone else drives occasionally.
+- Departure times follow rush-hour demand curves (times are in UTC).
+- A small fraction of reads is missed, as real plate readers do.
+
+The fleet is split into shards simulated in a process pool. Each shard writes
+one time-sorted Parquet file per day into hive-style `date=YYYY-MM-DD`
+partitions, loadable by the local DuckDB backend:
+
+    python simulate_traffic.py --output-dir data --fleet-size 200000 --days 7
+    TRAFFIC_QUERY_BACKEND=duckdb TRAFFIC_LOCAL_DATA_PATH=data adk web
+
+Output depends only on the seed, fleet size, days and number of shards, not on
+the number of workers.
+"""
+import argparse
+import heapq
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
+
+from traffic_agents.synthetic import (
+    fixed_width_strings, generate_uuid4_bytes, make_toll_records_batch, toll_points, toll_records_batch_to_arrow,
+    vehicle_types,
+)
+
+# Road segments between toll points and their length in km: by default one
+# corridor with the toll points 4.5 km apart, matching the agent's
+# `toll_point_positions_km`. Add segments to model junctions and loops.
+ROAD_SEGMENTS = [(toll_points[i], toll_points[i + 1], 4.5) for i in range(len(toll_points) - 1)]
+
+# Relative demand for each hour of the day (UTC) for trips without a fixed schedule.
+HOURLY_DEMAND = np.array([
+    0.2, 0.1, 0.1, 0.1, 0.2, 0.5, 1.2, 2.6, 3.0, 2.0, 1.4, 1.3,
+    1.4, 1.3, 1.4, 1.8, 2.6, 3.0, 2.4, 1.6, 1.1, 0.8, 0.5, 0.3,
+])
+HOURLY_DEMAND = HOURLY_DEMAND / HOURLY_DEMAND.sum()
+
+COMMUTER, COMMERCIAL, BUS, OCCASIONAL = range(4)
+# Share of the fleet in each class, and each class's vehicle type mix.
+CLASS_SHARES = [0.55, 0.15, 0.01, 0.29]
+CLASS_VEHICLE_TYPES = {
+    COMMUTER: {"Car": 0.88, "Motorcycle": 0.08, "Van": 0.04},
+    COMMERCIAL: {"Truck": 0.5, "Van": 0.5},
+    BUS: {"Bus": 1.0},
+    OCCASIONAL: {"Car": 0.9, "Motorcycle": 0.1},
+}
+
+# Plates are AAA-999: 26^3 letter combinations times 1000 numbers. Vehicle i gets
+# plate (i * _PLATE_MULTIPLIER) mod _PLATE_SPACE, a permutation of the plate
+# space (the multiplier shares no factor with it), so plates are unique across
+# shards and spread over the alphabet.
+_PLATE_SPACE = 26 ** 3 * 1000
+_PLATE_MULTIPLIER = 1_000_003
+
+MISSED_READ_PROBABILITY = 0.02
+
+
+def road_paths(segments):
+    """
+    Shortest paths between every pair of toll points of the road graph.
+
+    Returns:
+        tuple: (nodes, km), arrays of shape (points, points, max_path_length)
+        holding the toll point codes along each path, padded with -1, and the
+        distance travelled when each is reached; and lengths, of shape
+        (points, points), the number of toll points on each path.
+    """
+    code = {toll_point: i for i, toll_point in enumerate(toll_points)}
+    neighbours = [[] for _ in toll_points]
+    for a, b, km in segments:
+        neighbours[code[a]].append((code[b], km))
+        neighbours[code[b]].append((code[a], km))
+
+    count = len(toll_points)
+    paths = []
+    for source in range(count):
+        distance = [float("inf")] * count
+        previous = [-1] * count
+        distance[source] = 0.0
+        queue = [(0.0, source)]
+        while queue:
+            d, node = heapq.heappop(queue)
+            if d > distance[node]:
+                continue
+            for neighbour, km in neighbours[node]:
+                if d + km < distance[neighbour]:
+                    distance[neighbour] = d + km
+                    previous[neighbour] = node
+                    heapq.heappush(queue, (d + km, neighbour))
+        row = []
+        for target in range(count):
+            path = [target]
+            while path[-1] != source and previous[path[-1]] != -1:
+                path.append(previous[path[-1]])
+            row.append((path[::-1], [distance[node] for node in path[::-1]]) if path[-1] == source else ([], []))
+        paths.append(row)
+
+    longest = max(len(path) for row in paths for path, _ in row)
+    nodes = np.full((count, count, longest), -1, dtype=np.int8)
+    km = np.zeros((count, count, longest))
+    lengths = np.zeros((count, count), dtype=np.int64)
+    for source, row in enumerate(paths):
+        for target, (path, distances) in enumerate(row):
+            nodes[source, target, :len(path)] = path
+            km[source, target, :len(path)] = distances
+            lengths[source, target] = len(path)
+    return nodes, km, lengths
+
+
+def plate_numbers(vehicle_ids):
+    """The plate of each global vehicle id, as fixed-width byte strings."""
+    plate = (vehicle_ids.astype(np.int64) * _PLATE_MULTIPLIER) % _PLATE_SPACE
+    letters, digits = np.divmod(plate, 1000)
+    codes = np.empty((len(plate), 7), dtype=np.uint8)
+    codes[:, 0] = ord("A") + letters // (26 * 26)
+    codes[:, 1] = ord("A") + letters // 26 % 26
+    codes[:, 2] = ord("A") + letters % 26
+    codes[:, 3] = ord("-")
+    codes[:, 4] = ord("0") + digits // 100
+    codes[:, 5] = ord("0") + digits // 10 % 10
+    codes[:, 6] = ord("0") + digits % 10
+    return fixed_width_strings(codes)
+
+
+def make_fleet(rng, count):
+    """Draw the fixed attributes of `count` vehicles."""
+    classes = rng.choice(len(CLASS_SHARES), size=count, p=CLASS_SHARES)
+    type_codes = np.empty(count, dtype=np.int8)
+    for vehicle_class, mix in CLASS_VEHICLE_TYPES.items():
+        members = np.flatnonzero(classes == vehicle_class)
+        names = list(mix)
+        codes = np.array([vehicle_types.index(name) for name in names], dtype=np.int8)
+        type_codes[members] = codes[rng.choice(len(names), size=members.size, p=list(mix.values()))]
+    home = rng.integers(0, len(toll_points), size=count)
+    work = (home + rng.integers(1, len(toll_points), size=count)) % len(toll_points)
+    return {
+        "classes": classes,
+        "type_codes": type_codes,
+        "home": home,
+        "work": work,
+        # Commuters keep their habits: each has a usual departure time.
+        "morning_hour": rng.normal(7.9, 0.6, size=count),
+        "evening_hour": rng.normal(17.4, 0.8, size=count),
+        # Heavy tailed: most commercial vehicles make a few trips a day, some make dozens.
+        "trips_per_day": np.minimum(rng.lognormal(1.0, 0.8, size=count), 40),
+        # Some drivers are consistently faster than others.
+        "speed_kmh": np.clip(rng.normal(95, 12, size=count), 50, 150),
+    }
+
+
+def _demand_hours(rng, count):
+    return rng.choice(24, size=count, p=HOURLY_DEMAND) + rng.random(count)
+
+
+def day_trips(rng, fleet, weekend):
+    """Trips driven on one day, as (vehicle, origin, destination, departure hour) arrays."""
+    classes = fleet["classes"]
+    vehicles, origins, destinations, hours = [], [], [], []
+
+    def add(who, origin, destination, hour):
+        vehicles.append(who)
+        origins.append(origin)
+        destinations.append(destination)
+        hours.append(hour)
+
+    commuters = np.flatnonzero(classes == COMMUTER)
+    if not weekend:
+        going = commuters[rng.random(commuters.size) < 0.9]
+        add(going, fleet["home"][going], fleet["work"][going],
+            fleet["morning_hour"][going] + rng.normal(0, 0.15, going.size))
+        add(going, fleet["work"][going], fleet["home"][going],
+            fleet["evening_hour"][going] + rng.normal(0, 0.3, going.size))
+
+    commercial = np.flatnonzero(classes == COMMERCIAL)
+    counts = rng.poisson(fleet["trips_per_day"][commercial] * (0.3 if weekend else 1.0))
+    who = np.repeat(commercial, counts)
+    add(who, rng.integers(0, len(toll_points), who.size), rng.integers(0, len(toll_points), who.size),
+        rng.uniform(6, 19, who.size))
+
+    buses = np.flatnonzero(classes == BUS)
+    runs = np.arange(6.0, 22.0, 1.0 if not weekend else 2.0)
+    who = np.repeat(buses, runs.size)
+    outbound = np.tile(np.arange(runs.size) % 2 == 0, buses.size)
+    last = len(toll_points) - 1
+    add(who, np.where(outbound, 0, last), np.where(outbound, last, 0),
+        np.tile(runs, buses.size) + np.repeat(rng.uniform(0, 1, buses.size), runs.size))
+
+    occasional = np.concatenate([np.flatnonzero(classes == OCCASIONAL), commuters if weekend else commuters[:0]])
+    who = occasional[rng.random(occasional.size) < (0.35 if weekend else 0.15)]
+    add(who, rng.integers(0, len(toll_points), who.size), rng.integers(0, len(toll_points), who.size),
+        _demand_hours(rng, who.size))
+
+    return (np.concatenate(vehicles), np.concatenate(origins), np.concatenate(destinations),
+            np.clip(np.concatenate(hours), 0, 24 - 1e-6))
+
+
+def simulate_day(rng, fleet, first_vehicle, day, paths):
+    """
+    Simulate one day of the fleet's trips.
+
+    Returns:
+        tuple: Vehicle ids (global), toll point codes and timestamps (epoch
+        microseconds) of every read, in time order. Trips running past midnight
+        produce reads on the next day.
+    """
+    nodes, km, lengths = paths
+    weekend = day.weekday() >= 5
+    vehicles, origins, destinations, hours = day_trips(rng, fleet, weekend)
+    day_start = int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()) * 1_000_000
+    departures = day_start + (hours * 3600e6).astype(np.int64)
+    speeds = fleet["speed_kmh"][vehicles] * rng.uniform(0.85, 1.15, vehicles.size)
+
+    # A trip from a toll point to itself is read there once.
+    reads_per_trip = lengths[origins, destinations]
+    trip = np.repeat(np.arange(vehicles.size), reads_per_trip)
+    step = np.arange(trip.size) - np.repeat(np.cumsum(reads_per_trip) - reads_per_trip, reads_per_trip)
+    toll_point_codes = nodes[origins[trip], destinations[trip], step]
+    travelled_km = km[origins[trip], destinations[trip], step]
+    timestamps = departures[trip] + (travelled_km / speeds[trip] * 3600e6).astype(np.int64)
+
+    seen = rng.random(trip.size) >= MISSED_READ_PROBABILITY
+    order = np.argsort(timestamps[seen], kind="stable")
+    return (first_vehicle + vehicles[trip][seen][order], toll_point_codes[seen][order], timestamps[seen][order])
+
+
+def simulate_shard(output_dir, shard, first_vehicle, fleet_size, start_date, days, seed):
+    """Simulate `fleet_size` vehicles from `first_vehicle` for `days` days; returns reads written per day."""
+    import pyarrow.parquet as pq
+
+    fleet = make_fleet(np.random.default_rng([seed, shard]), fleet_size)
+    paths = road_paths(ROAD_SEGMENTS)
+    written = {}
+    carried = None
+    for offset in range(days + 1):
+        day = start_date + timedelta(days=offset)
+        day_end = int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp() + 86400) * 1_000_000
+        if offset < days:
+            reads = simulate_day(np.random.default_rng([seed, shard, offset]), fleet, first_vehicle, day, paths)
+        else:
+            # Only the reads of the last day's trips that ran past midnight.
+            reads = tuple(np.empty(0, dtype=np.int64) for _ in range(3))
+        if carried is not None:
+            reads = tuple(np.concatenate([c, r]) for c, r in zip(carried, reads))
+            order = np.argsort(reads[2], kind="stable")
+            reads = tuple(column[order] for column in reads)
+        split = int(np.searchsorted(reads[2], day_end))
+        carried = tuple(column[split:] for column in reads)
+        vehicles, toll_point_codes, timestamps = (column[:split] for column in reads)
+        if offset == days and not vehicles.size:
+            break
+
+        partition = os.path.join(output_dir, f"date={day.isoformat()}")
+        os.makedirs(partition, exist_ok=True)
+        rng = np.random.default_rng([seed, shard, offset, 1])
+        batch = make_toll_records_batch(
+            generate_uuid4_bytes(rng, vehicles.size),
+            plate_numbers(vehicles),
+            toll_point_codes,
+            timestamps.astype("datetime64[us]"),
+            fleet["type_codes"][vehicles - first_vehicle],
+        )
+        pq.write_table(toll_records_batch_to_arrow(batch), os.path.join(partition, f"part-{shard:05d}.parquet"))
+        written[day.isoformat()] = int(vehicles.size)
+    return written
+
+
+def simulate(output_dir, fleet_size, start_date, days, shards=None, workers=None, seed=0):
+    """
+    Simulate the fleet into `output_dir/toll_records/date=.../part-NNNNN.parquet` using a process pool.
+
+    Returns:
+        dict: Reads written per day.
+    """
+    if fleet_size > _PLATE_SPACE:
+        raise ValueError(f"The plate space only has room for {_PLATE_SPACE} vehicles")
+    workers = workers or os.cpu_count() or 1
+    shards = shards or max(workers, -(-fleet_size // 50_000))
+    table_dir = os.path.join(output_dir, "toll_records")
+    os.makedirs(table_dir, exist_ok=True)
+
+    base, extra = divmod(fleet_size, shards)
+    sizes = [base + (1 if i < extra else 0) for i in range(shards)]
+    firsts = np.concatenate([[0], np.cumsum(sizes)[:-1]]).tolist()
+    totals = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(simulate_shard, table_dir, i, firsts[i], sizes[i], start_date, days, seed)
+            for i in range(shards) if sizes[i]
+        ]
+        for future in futures:
+            for day, count in future.result().items():
+                totals[day] = totals.get(day, 0) + count
+    return dict(sorted(totals.items()))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Simulate toll reads from a recurring fleet on a road network.")
+    parser.add_argument("--output-dir", required=True, help="Local data directory to write the toll_records table to.")
+    parser.add_argument("--fleet-size", type=int, default=100_000, help="Number of distinct vehicles.")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=date(2025, 10, 19), help="First day (UTC).")
+    parser.add_argument("--days", type=int, default=1, help="Number of days to simulate.")
+    parser.add_argument("--shards", type=int, help="Fleet shards. Defaults to one per 50,000 vehicles, at least one per worker.")
+    parser.add_argument("--workers", type=int, help="Worker processes. Defaults to the CPU count.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for reproducible data.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    started = time.perf_counter()
+    per_day = simulate(args.output_dir, args.fleet_size, args.start_date, args.days,
+                       shards=args.shards, workers=args.workers, seed=args.seed)
+    elapsed = time.perf_counter() - started
+    reads = sum(per_day.values())
+    print(json.dumps({
+        "vehicles": args.fleet_size,
+        "days": args.days,
+        "reads": reads,
+        "reads_per_day": per_day,
+        "seconds": round(elapsed, 3),
+        "reads_per_second": round(reads / elapsed) if elapsed else None,
+    }, indent=2))
@@ -0,0 +1,78 @@
+"""
+Test setup: the tools query a small generated dataset through the local DuckDB backend.
+
+`traffic_agents.config` reads the environment when it is first imported, so
+the backend is configured here, before any test module imports the package.
+"""
+import itertools
+import os
+import random
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# The day create_data.py writes into.
+DATA_START = datetime(2025, 10, 19, 8, 0, 0, tzinfo=timezone.utc)
+DATA_END = datetime(2025, 10, 19, 20, 0, 0, tzinfo=timezone.utc)
+DATA_ROWS = 20_000
+
+_data_dir = tempfile.mkdtemp(prefix="traffic-tests-")
+os.environ["TRAFFIC_QUERY_BACKEND"] = "duckdb"
+os.environ["TRAFFIC_LOCAL_DATA_PATH"] = _data_dir
+os.environ["TRAFFIC_QUERY_CACHE"] = "false"
+
+
+def pytest_sessionstart(session):
+    import create_data
+
+    create_data.write_toll_records_shards(
+        os.path.join(_data_dir, "toll_records"), DATA_ROWS, num_shards=2, workers=1,
+        start_datetime=DATA_START, end_datetime=DATA_END, seed=0,
+    )
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_data_dir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def plate_number() -> str:
+    """A plate number that has toll records in the dataset."""
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(os.path.join(_data_dir, "toll_records"), columns=["plate_number"])
+    plates = table.column("plate_number")
+    return plates[random.Random(0).randrange(len(plates))].as_py()
+
+
+@pytest.fixture
+def live_toll_records(monkeypatch, tmp_path):
+    """
+    Point the tools at a small toll_records table of their own that the test can add reads to.
+
+    Returns a function writing a list of toll_records row dicts to the table as a new file.
+    """
+    import create_data
+    from traffic_agents import tools
+    from traffic_agents.backends import create_backend
+    from traffic_agents.config import config
+    from traffic_agents.ingest import ParquetSink
+
+    table_path = tmp_path / "toll_records"
+    table_path.mkdir()
+    create_data.write_toll_records_shard(
+        str(table_path / "initial.parquet"), 2_000, start_datetime=DATA_START, end_datetime=DATA_END, seed=1,
+    )
+    monkeypatch.setattr(config, "local_data_path", str(tmp_path))
+    monkeypatch.setattr(config, "index_refresh_seconds", 0)
+    monkeypatch.setattr(tools, "_backend", create_backend(config))
+    monkeypatch.setattr(tools, "_tails", {})
+    sink = ParquetSink(str(table_path), partition_by_date=False)
+    chunk_ids = itertools.count()
+    return lambda rows: sink.write(next(chunk_ids), rows)
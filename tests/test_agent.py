@@ -0,0 +1,105 @@
+"""End-to-end investigations with `testing.ScriptedLlm` standing in for the model."""
+import asyncio
+import time
+
+import pytest
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from traffic_agents import agent
+from traffic_agents.findings import CCTV_FINDINGS_KEY, DATABASE_FINDINGS_KEY, RESEARCH_FINDINGS_KEY
+from traffic_agents.testing import (
+    APPROVAL, CCTV_FINDINGS, DATABASE_FINDINGS, FINAL_REPORT, ScriptedLlm, agent_name, incident_report
+)
+
+START = "2025-10-19 08:00:00 UTC"
+END = "2025-10-19 20:00:00 UTC"
+
+
+class TimedLlm(ScriptedLlm):
+    """A `ScriptedLlm` that records when each agent's model calls start and end."""
+
+    calls: list = []
+
+    async def generate_content_async(self, llm_request, stream=False):
+        started = time.perf_counter()
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+        self.calls.append((agent_name(llm_request), started, time.perf_counter()))
+
+
+async def investigate(mode: str, plate_number: str, model=None):
+    """Play a whole investigation: report the incident, approve the plan. Returns the events and final state."""
+    model = model or ScriptedLlm(model="stub", delay=0.0)
+    runner = InMemoryRunner(agent=agent.create_root_agent(mode, model=model), app_name="tests")
+    session = await runner.session_service.create_session(app_name="tests", user_id="tester")
+    events = []
+    for message in (incident_report(plate_number, START, END), APPROVAL):
+        content = types.Content(role="user", parts=[types.Part(text=message)])
+        async for event in runner.run_async(user_id="tester", session_id=session.id, new_message=content):
+            events.append(event)
+    session = await runner.session_service.get_session(app_name="tests", user_id="tester", session_id=session.id)
+    return events, session.state
+
+
+def tool_calls(events, author: str) -> list:
+    """The tools `author` called, in order, leaving out transfers to other agents."""
+    return [(call.name, call.args) for event in events if event.author == author
+            for call in event.get_function_calls() if call.name != "transfer_to_agent"]
+
+
+def tool_responses(events) -> dict:
+    return {response.name: response.response for event in events for response in event.get_function_responses()}
+
+
+@pytest.mark.parametrize("mode", ["transfer", "pipeline"])
+def test_research_executor_calls_toll_tools_for_the_incident(mode, plate_number):
+    events, _ = asyncio.run(investigate(mode, plate_number))
+
+    assert tool_calls(events, "internal_research_executor") == [
+        ("get_toll_records_by_plate_number",
+         {"plate_number": plate_number, "start_timestamp": START, "end_timestamp": END}),
+        ("get_vehicle_journeys", {"plate_numbers": [plate_number]}),
+        ("get_vehicle_count_by_toll_point", {"start_timestamp": START, "end_timestamp": END}),
+    ]
+    responses = tool_responses(events)
+    records = responses["get_toll_records_by_plate_number"]["records"]
+    assert records and {record["plate_number"] for record in records} == {plate_number}
+    assert "error" not in responses["get_vehicle_journeys"]
+    assert responses["get_vehicle_count_by_toll_point"]["result"]
+
+
+@pytest.mark.parametrize("mode", ["transfer", "pipeline"])
+def test_findings_are_merged_for_the_report(mode, plate_number):
+    events, state = asyncio.run(investigate(mode, plate_number))
+
+    assert state[CCTV_FINDINGS_KEY] == CCTV_FINDINGS
+    assert state[DATABASE_FINDINGS_KEY] == DATABASE_FINDINGS
+    merged = state[RESEARCH_FINDINGS_KEY]
+    assert merged.index("## CCTV Analysis") < merged.index(CCTV_FINDINGS) \
+        < merged.index("## Toll and Traffic Database Research") < merged.index(DATABASE_FINDINGS)
+    assert state["final_report"] == FINAL_REPORT
+    assert events[-1].author == "report_composer_with_citations"
+
+
+def test_pipeline_mode_makes_no_coordinator_model_calls(plate_number):
+    events, _ = asyncio.run(investigate("pipeline", plate_number))
+
+    authors = {event.author for event in events}
+    assert "research_coordinator_agent" not in authors
+    assert {"cctv_analysis_agent", "internal_research_executor"} <= authors
+
+
+def test_pipeline_mode_runs_cctv_and_database_research_concurrently(plate_number):
+    model = TimedLlm(model="stub", delay=0.2, calls=[])
+    asyncio.run(investigate("pipeline", plate_number, model=model))
+
+    first = {}
+    for name, started, ended in model.calls:
+        first.setdefault(name, (started, ended))
+    cctv, database = first["cctv_analysis_agent"], first["internal_research_executor"]
+    # Each stage's first model call starts before the other stage's ends.
+    assert cctv[0] < database[1] and database[0] < cctv[1]
+    report_started = first["report_composer_with_citations"][0]
+    assert all(ended <= report_started for name, _, ended in model.calls
+               if name in ("cctv_analysis_agent", "internal_research_executor"))
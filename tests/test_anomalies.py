@@ -0,0 +1,45 @@
+"""`anomalies.AnomalyEngine` on hand-built toll reads."""
+from traffic_agents.anomalies import CONVOY, AnomalyEngine
+
+POSITIONS_KM = {f"TP-{i:03d}": (i - 1) * 4.5 for i in range(1, 11)}
+MINUTE = 60 * 1_000_000
+
+
+def pair_passes(toll_points, headway_micros=1_000_000):
+    """Reads of two vehicles passing `toll_points` in turn, a few minutes apart, one just behind the other."""
+    reads = []
+    for i, toll_point in enumerate(toll_points):
+        micros = i * 3 * MINUTE
+        reads.append({"plate_number": "AAA-111", "toll_point_id": toll_point, "timestamp_micros": micros})
+        reads.append({"plate_number": "BBB-222", "toll_point_id": toll_point,
+                      "timestamp_micros": micros + headway_micros})
+    return reads
+
+
+def convoys(engine):
+    return engine.alerts(kind=CONVOY)
+
+
+def test_pair_at_three_toll_points_is_a_convoy():
+    engine = AnomalyEngine(POSITIONS_KM, convoy_min_points=3)
+    engine.consume(pair_passes(["TP-001", "TP-002", "TP-003"]))
+
+    alerts = convoys(engine)
+    assert len(alerts) == 1
+    assert alerts[0]["plate_numbers"] == ["AAA-111", "BBB-222"]
+    assert alerts[0]["toll_point_ids"] == ["TP-001", "TP-002", "TP-003"]
+    assert alerts[0]["toll_points_together"] == 3
+
+
+def test_pair_going_back_and_forth_between_two_toll_points_is_not_a_convoy():
+    engine = AnomalyEngine(POSITIONS_KM, convoy_min_points=3)
+    engine.consume(pair_passes(["TP-001", "TP-002", "TP-001", "TP-002"]))
+
+    assert convoys(engine) == []
+
+
+def test_pair_further_apart_than_the_headway_is_not_a_convoy():
+    engine = AnomalyEngine(POSITIONS_KM, convoy_headway_seconds=3.0, convoy_min_points=3)
+    engine.consume(pair_passes(["TP-001", "TP-002", "TP-003"], headway_micros=10_000_000))
+
+    assert convoys(engine) == []
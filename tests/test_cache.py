@@ -0,0 +1,104 @@
+"""`cache.QueryCache` expiry, eviction and invalidation, on a fake clock."""
+from types import SimpleNamespace
+
+import pytest
+
+from traffic_agents import cache as cache_module
+from traffic_agents.cache import QueryCache, query_key
+
+TABLE = "project.dataset.toll_records"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A clock the cache reads instead of `time.monotonic`; advance it by adding to `now`."""
+    fake = SimpleNamespace(now=1000.0)
+    fake.monotonic = lambda: fake.now
+    monkeypatch.setattr(cache_module, "time", fake)
+    return fake
+
+
+def key(name: str):
+    return query_key(f"select * from `{TABLE}` where plate_number = @plate", {"plate": name})
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = QueryCache()
+    cache.put(key("a"), [{"n": 1}], ttl=10, tables=[TABLE])
+
+    clock.now += 9
+    assert cache.get(key("a")) == [{"n": 1}]
+    clock.now += 1
+    assert cache.get(key("a")) is None
+    assert cache.stats().expirations == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = QueryCache(max_entries=2)
+    cache.put(key("a"), [{"n": 1}], ttl=60, tables=[TABLE])
+    cache.put(key("b"), [{"n": 2}], ttl=60, tables=[TABLE])
+    cache.get(key("a"))
+
+    cache.put(key("c"), [{"n": 3}], ttl=60, tables=[TABLE])
+
+    assert cache.get(key("b")) is None
+    assert cache.get(key("a")) == [{"n": 1}] and cache.get(key("c")) == [{"n": 3}]
+    assert cache.stats().evictions == 1
+
+
+def test_a_new_table_version_drops_entries_once_rechecked(clock):
+    versions = {TABLE: 1}
+    cache = QueryCache(version_check_interval=30, table_version=versions.get)
+    cache.put(key("a"), [{"n": 1}], ttl=300, tables=[TABLE])
+    cache.put(key("b"), [{"n": 2}], ttl=300, tables=[TABLE])
+
+    versions[TABLE] = 2
+    clock.now += 10
+    assert cache.get(key("a")) == [{"n": 1}]
+    clock.now += 30
+    assert cache.get(key("a")) is None
+    assert cache.get(key("b")) is None
+    assert cache.stats().invalidations == 2
+
+
+def test_invalidate_table_drops_entries_immediately(clock):
+    cache = QueryCache(table_version=lambda table: 1)
+    cache.put(key("a"), [{"n": 1}], ttl=300, tables=[TABLE])
+
+    cache.invalidate_table(TABLE)
+
+    assert cache.get(key("a")) is None
+
+
+def test_versions_are_read_without_holding_the_lock(clock):
+    held = []
+
+    def table_version(table):
+        held.append(cache._lock.locked())
+        return 1
+
+    cache = QueryCache(version_check_interval=0, table_version=table_version)
+    cache.put(key("a"), [{"n": 1}], ttl=300, tables=[TABLE])
+    cache.get(key("a"))
+
+    assert held and not any(held)
+
+
+def test_results_are_not_cached_or_served_while_versions_cannot_be_read(clock):
+    failing = False
+
+    def table_version(table):
+        if failing:
+            raise RuntimeError("backend unavailable")
+        return 1
+
+    cache = QueryCache(version_check_interval=0, table_version=table_version)
+    cache.put(key("a"), [{"n": 1}], ttl=300, tables=[TABLE])
+    failing = True
+
+    cache.put(key("b"), [{"n": 2}], ttl=300, tables=[TABLE])
+    assert cache.get(key("a")) is None
+    assert cache.stats().size == 1
+
+    failing = False
+    assert cache.get(key("a")) == [{"n": 1}]
@@ -0,0 +1,38 @@
+"""`colocation.summarize_witnesses` on hand-built reads."""
+from traffic_agents.colocation import summarize_witnesses
+
+SECOND = 1_000_000
+TARGET = 1_000 * SECOND
+
+
+def read(plate_number: str, seconds: float, toll_point_id: str = "TP-1") -> dict:
+    return {"plate_number": plate_number, "toll_point_id": toll_point_id,
+            "timestamp_micros": TARGET + int(seconds * SECOND), "vehicle_type": "car"}
+
+
+def test_limit_keeps_the_reads_closest_to_the_target():
+    reads = [read("EARLY-1", -50), read("EARLY-2", -40), read("CLOSE-1", -2), read("CLOSE-2", 3), read("LATE", 30)]
+
+    result = summarize_witnesses(reads, {"TP-1": [TARGET]}, limit=2)
+
+    assert [r["plate_number"] for r in result["witness_reads"]] == ["CLOSE-1", "CLOSE-2"]
+    assert [r["seconds_from_target"] for r in result["witness_reads"]] == [-2.0, 3.0]
+    assert result["total_witness_reads"] == 5
+
+
+def test_plates_rank_by_shared_toll_points_then_closeness():
+    reads = [read("ONE-POINT", 1), read("TWO-POINTS", -20), read("TWO-POINTS", 25, "TP-2"), read("FAR", 50)]
+
+    result = summarize_witnesses(reads, {"TP-1": [TARGET], "TP-2": [TARGET]}, limit=10)
+
+    assert [p["plate_number"] for p in result["witness_plates"]] == ["TWO-POINTS", "ONE-POINT", "FAR"]
+    assert result["witness_plates"][0]["closest_seconds"] == 20.0
+
+
+def test_without_targets_reads_stay_in_time_order():
+    reads = [read("B", 10), read("A", -10), read("C", 0)]
+
+    result = summarize_witnesses(reads, None, limit=2)
+
+    assert [r["plate_number"] for r in result["witness_reads"]] == ["A", "C"]
+    assert result["witness_reads"][0]["seconds_from_target"] is None
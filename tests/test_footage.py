@@ -0,0 +1,111 @@
+"""`footage.select_keyframes` and `footage.FootageCache` on synthetic frames; no video libraries needed."""
+import numpy as np
+
+from traffic_agents.config import config
+from traffic_agents.footage import (
+    FIRST, INCIDENT, MOTION, FootageCache, PreparedFootage, footage_cache_key, select_keyframes
+)
+
+FPS = 4
+HEIGHT, WIDTH = 90, 160
+
+
+def footage(seconds: float, passes=(), noise: float = 2.0, seed: int = 0):
+    """(seconds, frame) pairs of a noisy road scene, with a vehicle crossing it during each (start, end) pass."""
+    rng = np.random.default_rng(seed)
+    background = np.full((HEIGHT, WIDTH, 3), 90, dtype=np.int16)
+    background[HEIGHT // 2, ::20] = 230
+    for i in range(int(seconds * FPS)):
+        t = i / FPS
+        frame = background.copy()
+        for start, end in passes:
+            if start <= t <= end:
+                x = int((t - start) / (end - start) * (WIDTH - 30))
+                frame[20:45, x:x + 30] = 220
+        frame += rng.normal(0, noise, (HEIGHT, WIDTH)).astype(np.int16)[:, :, None]
+        yield t, np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def test_static_scene_keeps_only_the_first_frame():
+    keyframes = select_keyframes(footage(30))
+
+    assert [(k.timestamp_seconds, k.reason) for k in keyframes] == [(0.0, FIRST)]
+
+
+def test_each_vehicle_pass_gets_one_keyframe_during_the_pass():
+    passes = [(5.0, 8.0), (20.0, 23.0), (40.0, 43.0)]
+    keyframes = select_keyframes(footage(60, passes))
+
+    motion = [k for k in keyframes if k.reason == MOTION]
+    assert len(motion) == len(passes)
+    for keyframe, (start, end) in zip(motion, passes):
+        assert start <= keyframe.timestamp_seconds <= end + 1 / FPS
+
+
+def test_incident_clip_is_kept_at_clip_fps():
+    passes = [(28.0, 34.0)]
+    keyframes = select_keyframes(footage(60, passes), incident_seconds=30.0, clip_seconds=2.0, clip_fps=2.0)
+
+    clip = [k.timestamp_seconds for k in keyframes if k.reason == INCIDENT]
+    assert clip[0] == 28.0
+    assert all(28.0 <= t <= 32.0 for t in clip)
+    assert all(b - a >= 0.5 for a, b in zip(clip, clip[1:]))
+    assert len(clip) == 9
+
+
+def test_incident_clip_drops_frames_that_duplicate_the_last_kept_one():
+    keyframes = select_keyframes(footage(60), incident_seconds=30.0, clip_seconds=2.0, clip_fps=2.0)
+
+    assert [(k.timestamp_seconds, k.reason) for k in keyframes] == [(0.0, FIRST), (28.0, INCIDENT)]
+
+
+def test_max_keyframes_caps_the_motion_keyframes():
+    passes = [(5.0 + 10 * i, 8.0 + 10 * i) for i in range(6)]
+    keyframes = select_keyframes(footage(70, passes), max_keyframes=2)
+
+    assert [k.reason for k in keyframes].count(MOTION) == 2
+    assert keyframes[0].reason == FIRST
+
+
+def prepared(content_hash: str, images=(b"one", b"two")) -> PreparedFootage:
+    return PreparedFootage(
+        content_hash=content_hash, frames_decoded=10, duration_seconds=2.5,
+        keyframes=[{"timestamp_seconds": float(i), "motion": 0.1, "reason": MOTION} for i in range(len(images))],
+        images=list(images),
+    )
+
+
+def test_cache_evicts_the_least_recently_used_entry():
+    cache = FootageCache(max_entries=2)
+    cache.put("a", prepared("a"))
+    cache.put("b", prepared("b"))
+    assert cache.get("a") is not None
+    cache.put("c", prepared("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").content_hash == "a"
+    assert cache.get("c").content_hash == "c"
+
+
+def test_cache_entries_on_disk_are_read_by_a_new_cache(tmp_path):
+    FootageCache(directory=str(tmp_path)).put("key", prepared("abc"))
+
+    assert FootageCache(directory=str(tmp_path)).get("key") == prepared("abc")
+
+
+def test_cache_ignores_entries_without_a_manifest(tmp_path):
+    cache = FootageCache(directory=str(tmp_path))
+    cache.put("key", prepared("abc"))
+    (tmp_path / "key" / "manifest.json").unlink()
+
+    assert FootageCache(directory=str(tmp_path)).get("key") is None
+    (tmp_path / "broken").mkdir()
+    (tmp_path / "broken" / "manifest.json").write_text("{")
+    assert FootageCache(directory=str(tmp_path)).get("broken") is None
+
+
+def test_cache_key_changes_with_the_keyframe_size(monkeypatch):
+    key = footage_cache_key("abc", incident_seconds=3.0)
+    monkeypatch.setattr(config, "footage_keyframe_max_size", config.footage_keyframe_max_size // 2)
+
+    assert footage_cache_key("abc", incident_seconds=3.0) != key
@@ -0,0 +1,102 @@
+"""`fuzzy_plates.FuzzyPlateIndex` on hand-built plates, and the similar plate tool with and without it."""
+import random
+import string
+
+import pytest
+
+from traffic_agents import tools
+from traffic_agents.config import config
+from traffic_agents.fuzzy_plates import FuzzyPlateIndex, normalize_plate
+
+
+def random_plates(count: int, seed: int = 0):
+    """Plate number -> reads for `count` random plates like 'ABC-123'."""
+    rng = random.Random(seed)
+    plates = {}
+    for _ in range(count):
+        plate = "".join(rng.choices(string.ascii_uppercase, k=3)) + "-" + "".join(rng.choices(string.digits, k=3))
+        plates[plate] = rng.randint(1, 9)
+    return plates
+
+
+def build(plate_counts, **kwargs) -> FuzzyPlateIndex:
+    index = FuzzyPlateIndex(**kwargs)
+    index._rebuild(plate_counts)
+    return index
+
+
+def misread(plate: str, edits: int, rng: random.Random) -> str:
+    """`plate` with `edits` random substitutions, insertions or deletions."""
+    chars = list(normalize_plate(plate))
+    for _ in range(edits):
+        position = rng.randrange(len(chars))
+        edit = rng.choice("sid")
+        if edit == "s":
+            chars[position] = rng.choice(string.ascii_uppercase + string.digits)
+        elif edit == "i":
+            chars.insert(position, rng.choice(string.ascii_uppercase + string.digits))
+        elif len(chars) > 1:
+            del chars[position]
+    return "".join(chars)
+
+
+def test_confusable_characters_cost_less_than_other_substitutions():
+    index = build({"ABC-123": 1, "ABC-X23": 1}, confusion_cost=0.25)
+
+    assert index.search("ABC-I23", max_edits=1) == [
+        {"plate_number": "ABC-123", "distance": 0.25, "reads": 1},
+        {"plate_number": "ABC-X23", "distance": 1.0, "reads": 1},
+    ]
+    assert index.search("ABC-1Z3", max_edits=0.25) == [{"plate_number": "ABC-123", "distance": 0.25, "reads": 1}]
+    # O, 0, D and Q are all confusable with one another.
+    assert build({"OBD-123": 1}).search("0BQ-123", max_edits=0.5)[0]["distance"] == 0.5
+
+
+def test_separators_and_case_are_ignored():
+    index = build({"ABC-123": 4})
+
+    assert index.search("abc 123", max_edits=0) == [{"plate_number": "ABC-123", "distance": 0.0, "reads": 4}]
+
+
+def test_candidate_search_finds_every_plate_within_the_edit_distance():
+    plates = random_plates(2_000)
+    index = build(plates, max_edits=2)
+    rng = random.Random(1)
+
+    for plate in rng.sample(sorted(plates), 100):
+        for edits in (1, 2):
+            query = misread(plate, edits, rng)
+            found = index.search(query, max_edits=edits, limit=len(plates))
+            assert plate in [candidate["plate_number"] for candidate in found]
+            # Ties between equally close, equally read plates may come in either order.
+            scanned = index.scan(plates, query, max_edits=edits, limit=len(plates))
+            assert sorted(found, key=str) == sorted(scanned, key=str)
+
+
+def test_candidates_share_enough_blocks_with_the_query():
+    index = build({"ABC-123": 1, "ABC-999": 1, "XYZ-123": 1}, max_edits=2)
+    group = index._groups[6]
+
+    shared_one_block = group.plates[index._candidates(group, "ABC124", 2)].tolist()
+    shared_two_blocks = group.plates[index._candidates(group, "ABC124", 1)].tolist()
+
+    assert sorted(shared_one_block) == ["ABC-123", "ABC-999"]
+    assert shared_two_blocks == ["ABC-123"]
+
+
+def test_searches_beyond_the_indexed_edit_distance_are_refused():
+    with pytest.raises(ValueError):
+        build({"ABC-123": 1}, max_edits=1).search("ABC-123", max_edits=2)
+
+
+def test_similar_plates_tool_answers_the_same_with_and_without_the_index(monkeypatch, plate_number):
+    monkeypatch.setattr(tools, "_fuzzy_plate_index", None)
+    query = plate_number[:-1] + ("0" if plate_number[-1] != "0" else "1")
+
+    monkeypatch.setattr(config, "fuzzy_plate_index_enabled", False)
+    scanned = tools.find_similar_plate_numbers(query, max_edits=1)
+    monkeypatch.setattr(config, "fuzzy_plate_index_enabled", True)
+    indexed = tools.find_similar_plate_numbers(query, max_edits=1)
+
+    assert plate_number in [candidate["plate_number"] for candidate in indexed["candidates"]]
+    assert indexed == scanned
@@ -0,0 +1,87 @@
+"""`ingest.ingest_rows` checkpointing into a local Parquet sink, and the ids create_data.py loads under."""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+import pyarrow.parquet as pq
+import pytest
+
+import create_data
+from traffic_agents.ingest import IngestError, ParquetSink, fingerprint_rows, ingest_rows
+
+START = datetime(2025, 10, 19, 8, 0, 0, tzinfo=timezone.utc)
+
+
+def make_rows(count: int):
+    return [
+        {"record_id": f"r{i:04d}", "plate_number": f"ABC-{i % 50:03d}", "toll_point_id": "TP-001",
+         "timestamp": START + timedelta(seconds=i), "vehicle_type": "Car", "image_url": None}
+        for i in range(count)
+    ]
+
+
+class FailingSink(ParquetSink):
+    """A Parquet sink whose writes of `failing_chunk` fail while `failing` is set."""
+
+    def __init__(self, directory: str, failing_chunk: int):
+        super().__init__(directory)
+        self.failing_chunk = failing_chunk
+        self.failing = True
+
+    def write(self, chunk_id, rows):
+        if self.failing and chunk_id == self.failing_chunk:
+            raise RuntimeError("connection reset")
+        super().write(chunk_id, rows)
+
+
+def ingest(rows, sink, checkpoint_path, fingerprint):
+    return ingest_rows(rows, sink, chunk_size=10, workers=1, max_retries=0, backoff_seconds=0,
+                       checkpoint_path=checkpoint_path, source_fingerprint=fingerprint)
+
+
+def test_interrupted_ingest_resumes_from_its_checkpoint(tmp_path):
+    rows = make_rows(100)
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    sink = FailingSink(str(tmp_path / "toll_records"), failing_chunk=4)
+
+    with pytest.raises(IngestError):
+        ingest(rows, sink, checkpoint_path, fingerprint_rows(rows))
+    sink.failing = False
+    result = ingest(rows, sink, checkpoint_path, fingerprint_rows(rows))
+
+    # Chunks still in flight when chunk 4 failed may or may not have been written.
+    assert result.skipped_chunks >= 3
+    assert result.skipped_chunks + result.chunks == 10
+    record_ids = pq.read_table(str(tmp_path / "toll_records")).column("record_id").to_pylist()
+    assert sorted(record_ids) == [row["record_id"] for row in rows]
+
+
+def test_checkpoint_is_not_resumed_for_different_rows(tmp_path):
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    sink = FailingSink(str(tmp_path / "toll_records"), failing_chunk=2)
+    rows = make_rows(50)
+    with pytest.raises(IngestError):
+        ingest(rows, sink, checkpoint_path, fingerprint_rows(rows))
+
+    other_rows = make_rows(60)
+    with pytest.raises(IngestError, match="different input"):
+        ingest(other_rows, sink, checkpoint_path, fingerprint_rows(other_rows))
+
+
+def generator_args(**kwargs):
+    return argparse.Namespace(**{"num_records": 1000, "seed": 7, "checkpoint": None, **kwargs})
+
+
+def load_job_prefix(args):
+    from google.cloud import bigquery
+    from traffic_agents.ingest import BigQueryLoadJobSink
+
+    table_ref = bigquery.DatasetReference("project", "dataset").table("toll_records")
+    fingerprint = create_data.toll_records_fingerprint(args, START, START + timedelta(hours=12))
+    return BigQueryLoadJobSink(None, table_ref, create_data.toll_records_schema, fingerprint).job_prefix
+
+
+def test_load_jobs_are_only_shared_by_runs_resuming_a_checkpoint():
+    assert load_job_prefix(generator_args()) != load_job_prefix(generator_args())
+    resumed = generator_args(checkpoint="load.json")
+    assert load_job_prefix(resumed) == load_job_prefix(resumed)
+    assert load_job_prefix(resumed) != load_job_prefix(generator_args(checkpoint="load.json", seed=8))
@@ -0,0 +1,81 @@
+"""Spans opened and closed by agent callbacks, tool payload sampling, and span exporters."""
+import json
+
+from traffic_agents import instrumentation as instrumentation_module
+from traffic_agents.instrumentation import InMemoryExporter, Instrumentation, JsonLinesExporter, traced_tool
+
+
+def recording(**kwargs):
+    spans = InMemoryExporter()
+    return Instrumentation(exporters=[spans], **kwargs), spans
+
+
+def test_agent_reentered_before_its_turn_ends_gets_its_own_span():
+    instrumentation, spans = recording()
+    key = ("invocation", "planner")
+    instrumentation.begin(key, "planner", kind="agent")
+    instrumentation.begin(key, "planner", kind="agent")
+    instrumentation.finish(key)
+    instrumentation.finish(key)
+
+    outer, inner = sorted(spans.spans("agent"), key=lambda s: s["start_time"])
+    assert inner["parent_id"] == outer["span_id"]
+    assert instrumentation.open_spans() == 0
+
+
+def test_finishing_an_agent_ends_descendants_that_never_finished():
+    instrumentation, spans = recording()
+    instrumentation.begin(("invocation", "coordinator"), "coordinator", kind="agent")
+    instrumentation.begin(("invocation", "researcher"), "researcher", kind="agent")
+    instrumentation.begin(("invocation", "tool_agent"), "tool_agent", kind="agent")
+    instrumentation.finish(("invocation", "coordinator"))
+
+    errors = {s["name"]: s["attributes"].get("error") for s in spans.spans("agent")}
+    assert errors == {"researcher": "abandoned: never finished", "tool_agent": "abandoned: never finished",
+                      "coordinator": None}
+    assert instrumentation.counters()["agent.researcher.errors"] == 1
+    assert instrumentation.open_spans() == 0
+
+
+def test_spans_open_too_long_are_ended_when_the_next_one_begins():
+    instrumentation, spans = recording(max_open_seconds=0.0)
+    instrumentation.begin(("first", "agent"), "agent", kind="agent")
+    instrumentation.begin(("second", "agent"), "agent", kind="agent")
+
+    assert [s["attributes"]["error"] for s in spans.spans("agent")] == ["abandoned: never finished"]
+    assert instrumentation.open_spans() == 1
+
+
+def test_payload_size_is_only_measured_for_sampled_tool_calls(monkeypatch):
+    instrumentation, spans = recording(payload_sample_rate=0.0)
+    monkeypatch.setattr(instrumentation_module, "instrumentation", instrumentation)
+    monkeypatch.setattr(instrumentation_module, "span", instrumentation.span)
+
+    @traced_tool
+    def lookup():
+        return {"records": [{"plate_number": "ABC-123"}]}
+
+    lookup()
+    instrumentation.payload_sample_rate = 1.0
+    lookup()
+
+    first, second = (s["attributes"] for s in spans.spans("tool"))
+    assert first == {"results": 1}
+    assert second == {"results": 1, "payload_bytes": len('{"records":[{"plate_number":"ABC-123"}]}')}
+
+
+def test_json_lines_exporter_keeps_its_file_open(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    exporter = JsonLinesExporter(str(path))
+    instrumentation = Instrumentation(exporters=[exporter])
+    for name in ("a", "b"):
+        with instrumentation.span(name):
+            pass
+    opened = exporter._file
+    with instrumentation.span("c"):
+        pass
+
+    assert exporter._file is opened
+    assert [json.loads(line)["name"] for line in path.read_text().splitlines()] == ["a", "b", "c"]
+    exporter.close()
+    assert exporter._file is None
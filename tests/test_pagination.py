@@ -0,0 +1,56 @@
+"""Paging through toll records with `tools.result_pager`, and caching paged results."""
+import pytest
+
+from traffic_agents import tools
+from traffic_agents.config import config
+from traffic_agents.pagination import ResultPager
+
+from conftest import DATA_END, DATA_START
+
+START = DATA_START.strftime("%Y-%m-%d %H:%M:%S UTC")
+END = DATA_END.strftime("%Y-%m-%d %H:%M:%S UTC")
+
+
+@pytest.fixture
+def query_cache(monkeypatch):
+    monkeypatch.setattr(config, "query_cache_enabled", True)
+    tools.query_cache.clear()
+    yield tools.query_cache
+    tools.query_cache.clear()
+
+
+def read_pages(pager: ResultPager, rows, page_size: int) -> list:
+    page = pager.first_page(rows, page_size)
+    pages = [page["records"]]
+    while page["next_cursor"]:
+        page = pager.next_page(page["next_cursor"], page_size)
+        pages.append(page["records"])
+    return pages
+
+
+def test_pages_split_the_rows_and_close_the_cursor():
+    pager = ResultPager()
+
+    assert read_pages(pager, iter(range(7)), 3) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert read_pages(pager, iter(range(6)), 3) == [[0, 1, 2], [3, 4, 5]]
+    assert pager.open_cursors() == 0
+
+
+def test_unknown_cursor_is_an_error():
+    with pytest.raises(ValueError, match="Unknown or expired cursor"):
+        ResultPager().next_page("missing", 3)
+
+
+def test_result_read_past_one_page_only_is_cached(query_cache):
+    plates = [tools.execute_query(f"""
+    select plate_number from `{tools.TOLL_RECORDS_TABLE}` group by plate_number having count(*) > 1 limit 1;
+    """, cache_ttl=0).to_pylist()[0]["plate_number"]]
+    first = tools.get_toll_records_by_plate_numbers(plates, START, END, page_size=1, result_format="rows")
+    assert first["next_cursor"] is not None
+
+    assert query_cache.stats().size == 1
+    again = tools.get_toll_records_by_plate_numbers(plates, START, END, page_size=1, result_format="rows")
+    assert query_cache.stats().hits == 1
+    assert again["records"] == first["records"]
+    for page in (first, again):
+        tools.result_pager.next_page(page["next_cursor"], config.tool_page_size)
@@ -0,0 +1,112 @@
+"""The in-process structures behind the tools picking up reads added to the table after they were built."""
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from conftest import DATA_END
+from traffic_agents import tools
+from traffic_agents.config import config
+
+
+def new_read(plate_number: str, minutes: float, toll_point_id: str = "TP-001", vehicle_type: str = "car"):
+    """A read `minutes` after the end of the generated data."""
+    record_id = str(uuid.uuid4())
+    return {
+        "record_id": record_id,
+        "plate_number": plate_number,
+        "toll_point_id": toll_point_id,
+        "timestamp": DATA_END + timedelta(minutes=minutes),
+        "vehicle_type": vehicle_type,
+        "image_url": f"http://example.com/images/{record_id}.jpg",
+    }
+
+
+def test_plate_index_picks_up_new_reads(live_toll_records, monkeypatch):
+    monkeypatch.setattr(tools, "_plate_index", None)
+    monkeypatch.setattr(config, "plate_index_enabled", True)
+    assert "NEW-001" not in tools.get_plate_index()
+
+    live_toll_records([new_read("NEW-001", 5), new_read("NEW-001", 10, "TP-002")])
+
+    records = tools.get_toll_records_by_plate_number("NEW-001")["records"]
+    assert [record["toll_point_id"] for record in records] == ["TP-001", "TP-002"]
+
+
+def test_reads_delivered_by_ingest_are_not_applied_again_when_polled(live_toll_records, monkeypatch):
+    monkeypatch.setattr(tools, "_plate_index", None)
+    monkeypatch.setattr(config, "plate_index_enabled", True)
+    size = tools.get_plate_index().size
+    rows = [new_read("NEW-002", 5)]
+
+    live_toll_records(rows)
+    tools.on_new_toll_records(rows)
+
+    assert tools.get_plate_index().size == size + 1
+
+
+def test_rollups_pick_up_new_reads(live_toll_records, monkeypatch):
+    monkeypatch.setattr(tools, "_rollup_store", None)
+    monkeypatch.setattr(config, "rollups_enabled", True)
+    start = DATA_END.strftime("%Y-%m-%d %H:%M:%S UTC")
+    end = (DATA_END + timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S UTC")
+    tools.get_rollup_store()
+
+    live_toll_records([new_read("NEW-003", minutes, vehicle_type="truck") for minutes in (5, 20, 35)])
+
+    counts = tools.get_vehicle_count_by_type(start, end)
+    assert {row["vehicle_type"]: row["vehicle_count"] for row in counts}.get("truck") == 3
+    config.rollups_enabled = False
+    assert counts == tools.get_vehicle_count_by_type(start, end)
+
+
+def test_sketches_pick_up_new_reads(live_toll_records, monkeypatch):
+    monkeypatch.setattr(tools, "_sketch_store", None)
+    monkeypatch.setattr(config, "sketches_enabled", True)
+    # Whole hours after the generated data, with partial hours at either edge.
+    start = (DATA_END + timedelta(minutes=30)).strftime("%Y-%m-%d %H:%M:%S UTC")
+    end = (DATA_END + timedelta(hours=3, minutes=30)).strftime("%Y-%m-%d %H:%M:%S UTC")
+    tools.get_sketch_store()
+
+    live_toll_records([new_read("NEW-004", minutes) for minutes in range(40, 200, 10)])
+
+    frequent = tools.get_frequent_plate_numbers(start, end)
+    assert frequent["approximate"]
+    assert frequent["plates"][0]["plate_number"] == "NEW-004"
+    config.sketches_enabled = False
+    assert frequent["reads"] == tools.get_frequent_plate_numbers(start, end)["reads"] == 16
+
+
+def test_anomaly_detector_raises_alerts_for_new_reads(live_toll_records, monkeypatch):
+    monkeypatch.setattr(tools, "_anomaly_engine", None)
+    monkeypatch.setattr(config, "anomaly_detection_enabled", True)
+    assert tools.get_anomaly_alerts(plate_number="NEW-005")["alerts"] == []
+
+    # 40.5 km apart in 30 seconds.
+    live_toll_records([new_read("NEW-005", 5, "TP-001"), new_read("NEW-005", 5.5, "TP-010")])
+
+    alerts = tools.get_anomaly_alerts(plate_number="NEW-005")["alerts"]
+    assert [alert["kind"] for alert in alerts] == ["plate_clone"]
+    assert alerts[0]["toll_point_ids"] == ["TP-001", "TP-010"]
+
+
+def test_fuzzy_plate_index_picks_up_new_plates(live_toll_records, monkeypatch):
+    monkeypatch.setattr(tools, "_fuzzy_plate_index", None)
+    monkeypatch.setattr(config, "fuzzy_plate_index_enabled", True)
+    assert tools.find_similar_plate_numbers("NEW-0O6", max_edits=0)["candidates"] == []
+
+    live_toll_records([new_read("NEW-006", 5)])
+
+    candidates = tools.find_similar_plate_numbers("NEW-0O6", max_edits=0.5)["candidates"]
+    assert candidates == [{"plate_number": "NEW-006", "distance": 0.25, "reads": 1}]
+
+
+def test_toll_point_index_picks_up_new_reads(live_toll_records, monkeypatch):
+    monkeypatch.setattr(tools, "_toll_point_index", None)
+    monkeypatch.setattr(config, "colocation_index_enabled", True)
+    tools.get_toll_point_index()
+
+    live_toll_records([new_read("NEW-007", 5), new_read("NEW-008", 5.25)])
+
+    witnesses = tools.find_witness_vehicles("NEW-007", window_seconds=30)["witness_plates"]
+    assert [witness["plate_number"] for witness in witnesses] == ["NEW-008"]
@@ -0,0 +1,91 @@
+"""`sketches.SketchStore` on hand-built reads, and the sketch-backed tools against exact SQL."""
+import pytest
+
+from traffic_agents import tools
+from traffic_agents.config import config
+from traffic_agents.sketches import SketchStore
+
+HOURS = 24
+
+
+def hourly_reads(heavy_plate: str = "HVY-001"):
+    """A day of reads at one toll point: `heavy_plate` once an hour, among plates read once or twice within an hour."""
+    rows = []
+    for bucket in range(HOURS):
+        rows.append({"toll_point_id": "TP-001", "plate_number": heavy_plate, "bucket": bucket})
+        for i in range(200):
+            rows.append({"toll_point_id": "TP-001", "plate_number": f"ONE-{bucket:02d}{i:03d}", "bucket": bucket})
+        # More plates read twice in the hour than the per-bucket candidates can hold.
+        for i in range(40):
+            for _ in range(2):
+                rows.append({"toll_point_id": "TP-001", "plate_number": f"TWO-{bucket:02d}{i:03d}", "bucket": bucket})
+    return rows
+
+
+def test_plate_read_once_a_bucket_is_the_top_plate_of_the_day():
+    store = SketchStore(top_k=32)
+    store.add_records(hourly_reads())
+
+    result = store.top_plates(0, HOURS, limit=1)
+
+    assert result["plates"][0]["plate_number"] == "HVY-001"
+    assert HOURS <= result["plates"][0]["reads"] <= HOURS + result["max_overcount"]
+    assert result["reads"] == HOURS * (1 + 200 + 80)
+
+
+def test_unaligned_windows_are_split_into_aligned_ranges():
+    store = SketchStore(max_buckets=32)
+
+    assert list(store._pieces(3, 17)) == [(0, 3), (2, 1), (3, 1), (0, 16)]
+    assert list(store._pieces(0, 32)) == [(5, 0)]
+
+
+def test_ranges_reaching_dropped_buckets_are_dropped():
+    store = SketchStore(max_buckets=4)
+    store.add_records([
+        {"toll_point_id": "TP-001", "plate_number": "ABC-123", "bucket": bucket} for bucket in range(6)
+    ])
+
+    assert not store.retains(0) and store.retains(2)
+    assert all(index << level >= 2 for level, index in store._ranges)
+    assert store.top_plates(2, 6)["plates"] == [{"plate_number": "ABC-123", "reads": 4}]
+
+
+@pytest.fixture
+def sketch_tools(monkeypatch):
+    monkeypatch.setattr(tools, "_sketch_store", None)
+    monkeypatch.setattr(config, "sketches_enabled", True)
+    return tools
+
+
+def exact(tool, *args, **kwargs):
+    """`tool`'s answer from exact SQL."""
+    config.sketches_enabled = False
+    try:
+        return tool(*args, **kwargs)
+    finally:
+        config.sketches_enabled = True
+
+
+def test_sketch_tools_answer_the_interval_asked_for(sketch_tools):
+    # One whole hour, with the rest of the interval in partial hours at either edge.
+    start, end = "2025-10-19 08:10:00 UTC", "2025-10-19 10:20:00 UTC"
+
+    distinct = sketch_tools.get_distinct_vehicle_count(start, end)
+    expected = exact(sketch_tools.get_distinct_vehicle_count, start, end)
+    assert distinct["approximate"] and "window_start" not in distinct
+    assert distinct["reads"] == expected["reads"]
+    assert distinct["distinct_vehicles"] == pytest.approx(
+        expected["distinct_vehicles"], rel=3 * distinct["relative_error"]
+    )
+
+    frequent = sketch_tools.get_frequent_plate_numbers(start, end, toll_point_ids=["TP-001"])
+    assert frequent["approximate"]
+    assert frequent["reads"] == exact(sketch_tools.get_frequent_plate_numbers, start, end, ["TP-001"])["reads"]
+
+
+def test_sketch_tools_count_intervals_within_one_bucket_exactly(sketch_tools):
+    start, end = "2025-10-19 08:10:00 UTC", "2025-10-19 08:20:00 UTC"
+
+    assert not sketch_tools.get_distinct_vehicle_count(start, end)["approximate"]
+    assert not sketch_tools.get_frequent_plate_numbers(start, end)["approximate"]
@@ -0,0 +1,33 @@
+"""The Python tools' plain queries run the tools.yaml statements of the same name."""
+import pytest
+
+from traffic_agents import tools, toolset
+from traffic_agents.config import config
+
+START, END = "2025-10-19 09:00:00 UTC", "2025-10-19 11:00:00 UTC"
+
+
+def test_plate_lookups_return_the_statement_rows(plate_number):
+    statement = toolset.prepared_tool("get_toll_records_by_plate_number")
+
+    records = tools.get_toll_records_by_plate_number(plate_number, result_format="rows")["records"]
+
+    assert records == statement(plate_number=plate_number)[:len(records)]
+    assert [record["timestamp"] for record in records] == sorted(record["timestamp"] for record in records)
+
+
+def test_vehicle_counts_return_the_statement_rows():
+    statement = toolset.prepared_tool("get_vehicle_count_by_type")
+
+    counts = tools.get_vehicle_count_by_type(START, END)
+
+    assert sorted(counts, key=lambda row: row["vehicle_type"]) == \
+        sorted(statement(start_timestamp=START, end_timestamp=END), key=lambda row: row["vehicle_type"])
+
+
+def test_tools_missing_from_the_toolset_file_raise(monkeypatch):
+    monkeypatch.setattr(config, "toolset_path", "")
+    monkeypatch.setattr(toolset, "_statements", None)
+
+    with pytest.raises(ValueError, match="get_vehicle_count_by_type"):
+        tools.get_vehicle_count_by_type(START, END)
@@ -1 +1,10 @@
-from . import agent
+from typing import Any
+import importlib
+
+
+def __getattr__(name: str) -> Any:
+    # The agent pulls in the full ADK stack, so load it only when it is first
+    # accessed (`traffic_agents.agent`, as the ADK loader and deploy.py do).
+    if name == "agent":
+        return importlib.import_module(f"{__name__}.agent")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
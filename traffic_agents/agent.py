@@ -1,20 +1,38 @@
+from typing import Callable, List, Optional
 from google.adk.agents import (
-    LlmAgent
+    BaseAgent,
+    LlmAgent,
+    ParallelAgent,
+    SequentialAgent
 )
 from google.adk.tools import google_search
 from .config import config
+from .footage import prepare_cctv_footage
+from .findings import CCTV_FINDINGS_KEY, DATABASE_FINDINGS_KEY, merge_research_findings_callback
 from .prompts import (
     INTERACTIVE_PLANNER_PROMPT,
     CCTV_ANALYSIS_PROMPT,
-    RESEARCH_EXECUTOR_PROMPT,
-    PLAN_GENERATOR_PROMPT,
-    REPORT_COMPOSER_PROMPT
+    CCTV_ANALYSIS_PIPELINE_PROMPT,
+    REPORT_COMPOSER_PROMPT,
+    plan_generator_prompt,
+    research_executor_prompt
 )
-from .tools import (
+from .async_tools import (
     get_vehicle_count_by_type,
-    get_toll_records_by_plate_number
+    get_vehicle_count_by_toll_point,
+    get_distinct_vehicle_count,
+    get_frequent_plate_numbers,
+    get_toll_records_by_plate_number,
+    get_toll_records_by_plate_numbers,
+    find_similar_plate_numbers,
+    get_vehicle_journeys,
+    find_witness_vehicles,
+    get_anomaly_alerts,
+    toolset_tools
 )
 
+from .instrumentation import after_agent_callback, before_agent_callback
+
 from google.adk.tools.agent_tool import AgentTool
 from google.adk.tools import load_artifacts
 
@@ -23,69 +41,166 @@ from google.adk.tools import load_artifacts
 # toolbox = ToolboxSyncClient("http://127.0.0.1:5000")
 # mcp_tools = toolbox.load_toolset('plate_reader_toolset')
 
+DATABASE_TOOLS = [
+    get_toll_records_by_plate_number,
+    get_toll_records_by_plate_numbers,
+    get_vehicle_count_by_type,
+    get_vehicle_count_by_toll_point,
+    get_distinct_vehicle_count,
+    get_frequent_plate_numbers,
+    find_similar_plate_numbers,
+    get_vehicle_journeys,
+    find_witness_vehicles,
+]
 
-cctv_analysis_agent = LlmAgent(
-    model=config.planning_model,
-    name="cctv_analysis_agent",
-    description="Analyzes CCTV footage to identify safety violations, sequence of events, and contributing factors",
-    instruction=CCTV_ANALYSIS_PROMPT,
-    tools=[load_artifacts],
-    output_key="research_findings",
-)
 
+def database_tools() -> List[Callable]:
+    """
+    The researcher's tools: `DATABASE_TOOLS`, `get_anomaly_alerts` when anomaly
+    detection is enabled, and the tools.yaml tools they do not implement.
+    """
+    python_tools = [*DATABASE_TOOLS, *([get_anomaly_alerts] if config.anomaly_detection_enabled else [])]
+    return [*python_tools, *toolset_tools(exclude={tool.__name__ for tool in python_tools})]
 
-plan_generator = LlmAgent(
-    model=config.planning_model,
-    name="plan_generator",
-    description="Generates or refine the existing 5 line action-oriented safety investigation research plan using incident images and descriptions.",
-    instruction=PLAN_GENERATOR_PROMPT,
-)
 
+RESEARCH_COORDINATOR_DESCRIPTION = "Executes a pre-approved safety investigation research plan. It performs iterative research, evaluation, and composes a final, cited report."
 
-internal_research_executor = LlmAgent(
-    model=config.sub_agent_model,
-    name="internal_research_executor",
-    description="Executes comprehensive safety investigation research using database research.",
-    instruction=RESEARCH_EXECUTOR_PROMPT,
-    tools=[get_toll_records_by_plate_number, get_vehicle_count_by_type],
-    output_key="research_findings"
-)
 
-report_composer = LlmAgent(
-    model=config.base_model,
-    name="report_composer_with_citations",
-    include_contents="none",
-    description="Transforms safety investigation research data and a markdown outline into a final, cited report.",
-    instruction=REPORT_COMPOSER_PROMPT,
-    output_key="final_report"
-)
+def create_cctv_analysis_agent(model=None, pipeline: bool = False) -> LlmAgent:
+    return LlmAgent(
+        model=model or config.planning_model,
+        name="cctv_analysis_agent",
+        description="Analyzes CCTV footage to identify safety violations, sequence of events, and contributing factors",
+        instruction=CCTV_ANALYSIS_PIPELINE_PROMPT if pipeline else CCTV_ANALYSIS_PROMPT,
+        tools=[prepare_cctv_footage, load_artifacts],
+        output_key=CCTV_FINDINGS_KEY,
+        disallow_transfer_to_parent=pipeline,
+        disallow_transfer_to_peers=pipeline,
+        before_agent_callback=before_agent_callback,
+        after_agent_callback=after_agent_callback,
+    )
 
 
-research_coordinator_agent = LlmAgent(
-    name="research_coordinator_agent",
-    description="Executes a pre-approved safety investigation research plan. It performs iterative research, evaluation, and composes a final, cited report.",
-    instruction="""
-    You are a safety investigation researcher. You will follow a STRICT two step process to complete your task:
-    1. You are to start with the *cctv_analysis_agent*
-    2. Use the *data_research_executor* agent to research an incident.
-    IMPORTANT: IMMEDIATELY after these two agents, you are to use the *report_composer* agent to compose a final safety incident report.
-    """,
-    sub_agents=[
-        cctv_analysis_agent,
-        internal_research_executor,
-        report_composer,
-    ],
-)
+def create_plan_generator(model=None) -> LlmAgent:
+    return LlmAgent(
+        model=model or config.planning_model,
+        name="plan_generator",
+        description="Generates or refine the existing 5 line action-oriented safety investigation research plan using incident images and descriptions.",
+        # The plan names the tools the researcher will be given.
+        instruction=plan_generator_prompt(database_tools()),
+        before_agent_callback=before_agent_callback,
+        after_agent_callback=after_agent_callback,
+    )
 
 
-interactive_planner_agent = LlmAgent(
-    name="interactive_planner_agent",
-    model=config.sub_agent_model,
-    description="The primary safety investigation research assistant. It collaborates with the user to create a safety investigation research plan, and then executes it upon approval.",
-    instruction=INTERACTIVE_PLANNER_PROMPT,
-    sub_agents=[research_coordinator_agent],
-    tools=[AgentTool(plan_generator)],
-    output_key="research_plan",
-)
+def create_internal_research_executor(model=None, pipeline: bool = False) -> LlmAgent:
+    tools = database_tools()
+    return LlmAgent(
+        model=model or config.sub_agent_model,
+        name="internal_research_executor",
+        description="Executes comprehensive safety investigation research using database research.",
+        instruction=research_executor_prompt(tools, pipeline),
+        tools=tools,
+        output_key=DATABASE_FINDINGS_KEY,
+        disallow_transfer_to_parent=pipeline,
+        disallow_transfer_to_peers=pipeline,
+        before_agent_callback=before_agent_callback,
+        after_agent_callback=after_agent_callback,
+    )
+
+
+def create_report_composer(model=None) -> LlmAgent:
+    return LlmAgent(
+        model=model or config.base_model,
+        name="report_composer_with_citations",
+        include_contents="none",
+        description="Transforms safety investigation research data and a markdown outline into a final, cited report.",
+        instruction=REPORT_COMPOSER_PROMPT,
+        output_key="final_report",
+        # Each research stage writes its own key; merge them into research_findings for the prompt.
+        before_agent_callback=[merge_research_findings_callback, before_agent_callback],
+        after_agent_callback=after_agent_callback,
+    )
+
+
+def create_research_coordinator(mode: Optional[str] = None, model=None) -> BaseAgent:
+    """
+    Build research_coordinator_agent for `mode` (defaults to `config.research_mode`).
+
+    "transfer": an LLM coordinator hands off to the CCTV analyst, the database
+    researcher and then the report composer, one after the other.
+    "pipeline": the CCTV analysis and database research run concurrently, then
+    the report composer runs on their merged findings. No coordinator LLM call
+    is made. `model` overrides every stage's model, e.g. with a stub for benchmarks.
+    """
+    mode = mode or config.research_mode
+    if mode == "pipeline":
+        return SequentialAgent(
+            name="research_coordinator_agent",
+            description=RESEARCH_COORDINATOR_DESCRIPTION,
+            sub_agents=[
+                ParallelAgent(
+                    name="parallel_research",
+                    description="Runs the CCTV analysis and database research concurrently.",
+                    sub_agents=[
+                        create_cctv_analysis_agent(model, pipeline=True),
+                        create_internal_research_executor(model, pipeline=True),
+                    ],
+                ),
+                create_report_composer(model),
+            ],
+            before_agent_callback=before_agent_callback,
+            after_agent_callback=after_agent_callback,
+        )
+    if mode != "transfer":
+        raise ValueError(f"Unknown research mode: {mode!r}")
+
+    return LlmAgent(
+        name="research_coordinator_agent",
+        # Without an override the coordinator inherits the planner's model.
+        model=model or "",
+        description=RESEARCH_COORDINATOR_DESCRIPTION,
+        instruction="""
+        You are a safety investigation researcher. You will follow a STRICT two step process to complete your task:
+        1. You are to start with the *cctv_analysis_agent*
+        2. Use the *data_research_executor* agent to research an incident.
+        IMPORTANT: IMMEDIATELY after these two agents, you are to use the *report_composer* agent to compose a final safety incident report.
+        """,
+        sub_agents=[
+            create_cctv_analysis_agent(model),
+            create_internal_research_executor(model),
+            create_report_composer(model),
+        ],
+        before_agent_callback=before_agent_callback,
+        after_agent_callback=after_agent_callback,
+    )
+
+
+def create_root_agent(mode: Optional[str] = None, model=None) -> LlmAgent:
+    """
+    Build the interactive planner with its plan generator and research coordinator.
+
+    `mode` is passed to `create_research_coordinator`; `model` overrides every
+    agent's model, e.g. with a stub for load tests.
+    """
+    return LlmAgent(
+        name="interactive_planner_agent",
+        model=model or config.sub_agent_model,
+        description="The primary safety investigation research assistant. It collaborates with the user to create a safety investigation research plan, and then executes it upon approval.",
+        instruction=INTERACTIVE_PLANNER_PROMPT,
+        sub_agents=[create_research_coordinator(mode, model)],
+        tools=[AgentTool(create_plan_generator(model))],
+        output_key="research_plan",
+        before_agent_callback=before_agent_callback,
+        after_agent_callback=after_agent_callback,
+    )
+
+
+interactive_planner_agent = create_root_agent()
+plan_generator = interactive_planner_agent.tools[0].agent
+research_coordinator_agent = interactive_planner_agent.find_agent("research_coordinator_agent")
+cctv_analysis_agent = research_coordinator_agent.find_agent("cctv_analysis_agent")
+internal_research_executor = research_coordinator_agent.find_agent("internal_research_executor")
+report_composer = research_coordinator_agent.find_agent("report_composer_with_citations")
 
 root_agent = interactive_planner_agent
@@ -0,0 +1,211 @@
+"""
+Streaming detection of suspicious toll reads.
+
+`AnomalyEngine.process` takes one toll_records-shaped event at a time (in
+roughly time order, as they are ingested) and raises alerts for:
+
+- impossible_travel: a plate's consecutive reads at two toll points imply a
+  speed above `max_speed_kmh`.
+- plate_clone: the implied speed is above `clone_speed_kmh`, i.e. no single
+  vehicle could have made the trip, so two vehicles likely carry the plate.
+- convoy: two vehicles pass `convoy_min_points` different toll points in a row
+  within `convoy_headway_seconds` of each other, i.e. tailgating or travelling
+  together. Passing the same toll points back and forth does not add to the count.
+
+State is bounded: the last read of at most `max_tracked_plates` plates and of
+at most `max_tracked_pairs` vehicle pairs (least recently seen dropped first),
+a per-toll-point window of reads within the convoy headway (at most
+`max_window_reads` each) and the latest `max_alerts` alerts. Each event does a
+constant amount of work plus one step per vehicle in its toll point's headway
+window, which is capped.
+"""
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+import queue
+import threading
+from .columnar import from_micros, to_micros
+
+IMPOSSIBLE_TRAVEL = "impossible_travel"
+PLATE_CLONE = "plate_clone"
+CONVOY = "convoy"
+ALERT_KINDS = (IMPOSSIBLE_TRAVEL, PLATE_CLONE, CONVOY)
+
+
+@dataclass
+class Alert:
+    kind: str
+    plate_numbers: List[str]
+    toll_point_ids: List[str]
+    timestamp_micros: int
+    details: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "plate_numbers": self.plate_numbers,
+            "toll_point_ids": self.toll_point_ids,
+            "timestamp": from_micros(self.timestamp_micros).isoformat(),
+            **self.details,
+        }
+
+
+@dataclass
+class _PairState:
+    last_toll_point: str
+    last_micros: int
+    # The distinct toll points the pair passed together, in the order first passed.
+    route: List[str]
+    alerted: bool = False
+
+
+def _event_micros(event: Dict[str, Any]) -> int:
+    timestamp = event.get("timestamp_micros")
+    return to_micros(event["timestamp"]) if timestamp is None else timestamp
+
+
+class AnomalyEngine:
+    """Detects impossible travel, plate cloning and convoys over a stream of toll reads."""
+
+    def __init__(self, positions_km: Dict[str, float], max_speed_kmh: float = 200.0,
+                 clone_speed_kmh: float = 400.0, convoy_headway_seconds: float = 3.0,
+                 convoy_min_points: int = 3, convoy_max_gap_seconds: float = 1800.0,
+                 max_tracked_plates: int = 1_000_000, max_tracked_pairs: int = 100_000,
+                 max_window_reads: int = 64, max_alerts: int = 10_000):
+        self.positions_km = positions_km
+        self.max_speed_kmh = max_speed_kmh
+        self.clone_speed_kmh = clone_speed_kmh
+        self.convoy_headway_micros = int(convoy_headway_seconds * 1_000_000)
+        self.convoy_min_points = convoy_min_points
+        self.convoy_max_gap_micros = int(convoy_max_gap_seconds * 1_000_000)
+        self.max_tracked_plates = max_tracked_plates
+        self.max_tracked_pairs = max_tracked_pairs
+        self.max_window_reads = max_window_reads
+
+        # plate -> (toll_point_id, timestamp_micros) of its latest read.
+        self._last_reads: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        # toll_point_id -> recent (timestamp_micros, plate) within the convoy headway.
+        self._windows: Dict[str, deque] = {}
+        self._pairs: "OrderedDict[Tuple[str, str], _PairState]" = OrderedDict()
+        self._alerts: "deque[Alert]" = deque(maxlen=max_alerts)
+        self._counts = {kind: 0 for kind in ALERT_KINDS}
+        self.events = 0
+        self._lock = threading.Lock()
+
+    def process(self, event: Dict[str, Any]) -> List[Alert]:
+        """Fold one toll read into the detector state and return any alerts it raises."""
+        plate = event["plate_number"]
+        toll_point = event["toll_point_id"]
+        micros = _event_micros(event)
+        alerts: List[Alert] = []
+        with self._lock:
+            self.events += 1
+            self._check_travel(plate, toll_point, micros, alerts)
+            self._check_convoy(plate, toll_point, micros, alerts)
+            for alert in alerts:
+                self._alerts.append(alert)
+                self._counts[alert.kind] += 1
+        return alerts
+
+    def consume(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Process every event from an iterable (e.g. a generator); returns the number of alerts raised."""
+        return sum(len(self.process(event)) for event in events)
+
+    def consume_queue(self, events: "queue.Queue", stop: Any = None) -> int:
+        """Process events from a queue until `stop` is received; returns the number of alerts raised."""
+        raised = 0
+        while True:
+            event = events.get()
+            try:
+                if event is stop:
+                    return raised
+                raised += len(self.process(event))
+            finally:
+                events.task_done()
+
+    def _check_travel(self, plate: str, toll_point: str, micros: int, alerts: List[Alert]) -> None:
+        previous = self._last_reads.get(plate)
+        if previous is None or micros >= previous[1]:
+            self._last_reads[plate] = (toll_point, micros)
+            self._last_reads.move_to_end(plate)
+            if len(self._last_reads) > self.max_tracked_plates:
+                self._last_reads.popitem(last=False)
+        if previous is None or previous[0] == toll_point:
+            return
+
+        start, end = self.positions_km.get(previous[0]), self.positions_km.get(toll_point)
+        if start is None or end is None:
+            return
+        distance_km = abs(end - start)
+        seconds = abs(micros - previous[1]) / 1_000_000
+        speed_kmh = distance_km / (seconds / 3600) if seconds else float("inf")
+        if speed_kmh <= self.max_speed_kmh:
+            return
+        alerts.append(Alert(
+            PLATE_CLONE if speed_kmh > self.clone_speed_kmh else IMPOSSIBLE_TRAVEL,
+            [plate],
+            [previous[0], toll_point],
+            max(micros, previous[1]),
+            {
+                "distance_km": round(distance_km, 2),
+                "seconds_apart": round(seconds, 1),
+                "implied_speed_kmh": None if seconds == 0 else round(speed_kmh, 1),
+            },
+        ))
+
+    def _check_convoy(self, plate: str, toll_point: str, micros: int, alerts: List[Alert]) -> None:
+        window = self._windows.get(toll_point)
+        if window is None:
+            window = self._windows[toll_point] = deque(maxlen=self.max_window_reads)
+        while window and window[0][0] < micros - self.convoy_headway_micros:
+            window.popleft()
+
+        for other_micros, other in window:
+            if other == plate or abs(micros - other_micros) > self.convoy_headway_micros:
+                continue
+            key = (other, plate) if other < plate else (plate, other)
+            state = self._pairs.get(key)
+            if state is not None and state.last_toll_point == toll_point:
+                continue
+            if state is None or micros - state.last_micros > self.convoy_max_gap_micros:
+                state = _PairState(toll_point, micros, [])
+                self._pairs[key] = state
+            state.last_toll_point = toll_point
+            state.last_micros = micros
+            if toll_point not in state.route:
+                state.route.append(toll_point)
+            self._pairs.move_to_end(key)
+            if len(self._pairs) > self.max_tracked_pairs:
+                self._pairs.popitem(last=False)
+            if len(state.route) >= self.convoy_min_points and not state.alerted:
+                state.alerted = True
+                alerts.append(Alert(CONVOY, list(key), list(state.route), micros,
+                                    {"toll_points_together": len(state.route)}))
+        window.append((micros, plate))
+
+    def alerts(self, kind: Optional[str] = None, plate_number: Optional[str] = None,
+               since_micros: Optional[int] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent alerts first, optionally filtered by kind, plate and time."""
+        with self._lock:
+            matches = []
+            for alert in reversed(self._alerts):
+                if since_micros is not None and alert.timestamp_micros < since_micros:
+                    continue
+                if kind is not None and alert.kind != kind:
+                    continue
+                if plate_number is not None and plate_number not in alert.plate_numbers:
+                    continue
+                matches.append(alert.to_dict())
+                if len(matches) >= limit:
+                    break
+            return matches
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "events": self.events,
+                "alerts": dict(self._counts),
+                "tracked_plates": len(self._last_reads),
+                "tracked_pairs": len(self._pairs),
+                "retained_alerts": len(self._alerts),
+            }
@@ -0,0 +1,65 @@
+"""
+Async variants of the toll tools.
+
+Each function keeps the name, signature and docstring of its counterpart in
+`tools`, so the agent sees the same tool, but runs the blocking query in a
+worker thread instead of on the agent's event loop. Independent tool calls can
+therefore run concurrently, e.g. with `asyncio.gather`.
+"""
+from typing import List, Dict, Any, Callable, Optional
+import asyncio
+import functools
+import time
+from . import tools, toolset
+from .cache import query_key
+from .config import config
+from .instrumentation import increment
+from .resultset import ResultSet
+
+
+def _run_in_thread(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        submitted = time.perf_counter()
+
+        def run():
+            # Time spent waiting for a free worker thread.
+            increment(f"tool.{func.__name__}.queue_ms", round((time.perf_counter() - submitted) * 1000, 3))
+            return func(*args, **kwargs)
+
+        return await asyncio.to_thread(run)
+    return wrapper
+
+
+async def execute_query(query: str, params: Optional[Dict[str, Any]] = None,
+                        cache_ttl: Optional[float] = None) -> ResultSet:
+    """
+    Run `tools.execute_query` without blocking the event loop.
+
+    Callers that join an identical in-flight query await its result rather
+    than holding a worker thread while they wait, and share the same `ResultSet`.
+    """
+    if not config.single_flight_enabled:
+        return await asyncio.to_thread(tools.execute_query, query, params, cache_ttl)
+    records, _ = await tools.query_flights.do_async(
+        query_key(query, params),
+        lambda: asyncio.to_thread(tools.execute_query, query, params, cache_ttl, coalesce=False),
+    )
+    return records
+
+
+get_toll_records_by_plate_number = _run_in_thread(tools.get_toll_records_by_plate_number)
+get_toll_records_by_plate_numbers = _run_in_thread(tools.get_toll_records_by_plate_numbers)
+get_vehicle_count_by_type = _run_in_thread(tools.get_vehicle_count_by_type)
+get_vehicle_count_by_toll_point = _run_in_thread(tools.get_vehicle_count_by_toll_point)
+get_distinct_vehicle_count = _run_in_thread(tools.get_distinct_vehicle_count)
+get_frequent_plate_numbers = _run_in_thread(tools.get_frequent_plate_numbers)
+find_similar_plate_numbers = _run_in_thread(tools.find_similar_plate_numbers)
+get_vehicle_journeys = _run_in_thread(tools.get_vehicle_journeys)
+find_witness_vehicles = _run_in_thread(tools.find_witness_vehicles)
+get_anomaly_alerts = _run_in_thread(tools.get_anomaly_alerts)
+
+
+def toolset_tools(exclude: Optional[set] = None) -> List[Callable]:
+    """Async variants of the tools compiled from tools.yaml (see `toolset.toolset_functions`)."""
+    return [_run_in_thread(func) for func in toolset.toolset_functions(exclude)]
@@ -0,0 +1,423 @@
+from datetime import date, datetime, timezone
+from typing import List, Dict, Any, Iterator, Optional
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from .config import AgentConfiguration
+from .instrumentation import set_attributes
+
+logger = logging.getLogger(__name__)
+
+
+_PARTITION_RANGE = re.compile(r"/\*\s*partition_range\(\s*(@\w+|\*)\s*,\s*(@\w+|\*)\s*\)\s*\*/")
+_DATE_PARTITION = re.compile(r"^date=(\d{4}-\d{2}-\d{2})$")
+
+
+def partition_range(start_param: Optional[str] = None, end_param: Optional[str] = None) -> str:
+    """
+    SQL comment declaring the timestamp range a query reads, as `@parameter` names (None for open ended).
+
+    BigQuery ignores it and prunes day partitions from the query's own filter
+    on `timestamp`; the DuckDB backend uses it to read only the `date=`
+    partition directories in the range.
+    """
+    return f"/* partition_range({start_param or '*'}, {end_param or '*'}) */"
+
+
+class QueryBackend:
+    """
+    Base class for the engines that can run the toll record SQL.
+
+    Queries are written once in BigQuery Standard SQL with named `@parameters`.
+    Each backend is responsible for running that SQL (translating it if needed)
+    and returning rows as a list of dictionaries or, without building a Python
+    object per value, as an Arrow table.
+    """
+
+    name = "base"
+
+    def execute(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def execute_arrow(self, query: str, params: Optional[Dict[str, Any]] = None):
+        """Run a query and return its rows as a `pyarrow.Table`."""
+        import pyarrow as pa
+
+        return pa.Table.from_pylist(self.execute(query, params))
+
+    def execute_iter(self, query: str, params: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Run a query and yield its rows lazily, fetching from the engine as they are consumed."""
+        yield from self.execute(query, params)
+
+    def table_version(self, table: str) -> Any:
+        """
+        Return a value that changes whenever `table` (a `project.dataset.table` name) is modified.
+
+        Used to invalidate cached results. Returning None means the version is unknown.
+        """
+        return None
+
+    def scan_stats(self, query: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Report how much data the engine reads to answer `query`.
+
+        Returns a dict with 'rows_scanned' and 'bytes_scanned'; either is None
+        when the engine does not report it. Meant for benchmarking, as some
+        backends run the query again to measure it.
+        """
+        return {"rows_scanned": None, "bytes_scanned": None}
+
+
+def _utc_date(value: datetime) -> date:
+    """The UTC day of `value`, the day partitions are named by; naive datetimes are taken as UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _to_bigquery_parameter(name: str, value: Any):
+    """Map a Python value onto a typed BigQuery query parameter."""
+    from google.cloud import bigquery
+
+    if isinstance(value, (list, tuple)):
+        element_type = _bigquery_type(value[0]) if value else "STRING"
+        return bigquery.ArrayQueryParameter(name, element_type, list(value))
+    return bigquery.ScalarQueryParameter(name, _bigquery_type(value), value)
+
+
+def _bigquery_type(value: Any) -> str:
+    # bool must be checked before int, as bool is a subclass of int.
+    if isinstance(value, bool):
+        return "BOOL"
+    if isinstance(value, int):
+        return "INT64"
+    if isinstance(value, float):
+        return "FLOAT64"
+    if isinstance(value, datetime):
+        return "TIMESTAMP"
+    return "STRING"
+
+
+def _job_attributes(query_job) -> Dict[str, Any]:
+    """Timing and cost of a finished BigQuery job, for the current instrumentation span."""
+    attributes = {
+        "job_id": query_job.job_id,
+        "bytes_processed": query_job.total_bytes_processed,
+        "bytes_billed": query_job.total_bytes_billed,
+        "engine_cache_hit": query_job.cache_hit,
+    }
+    if query_job.created and query_job.started:
+        attributes["engine_queue_ms"] = round((query_job.started - query_job.created).total_seconds() * 1000, 3)
+    if query_job.started and query_job.ended:
+        attributes["engine_ms"] = round((query_job.ended - query_job.started).total_seconds() * 1000, 3)
+    return attributes
+
+
+_bigquery_clients: Dict[str, Any] = {}
+_bigquery_clients_lock = threading.Lock()
+
+
+def get_bigquery_client(project_id: str):
+    """
+    Return the process-wide BigQuery client for `project_id`, creating it on first use.
+
+    Clients are thread-safe and hold the authenticated HTTP session, so sharing
+    one reuses its connections instead of paying credential discovery and TLS
+    setup per caller. The client library is only imported here, keeping it off
+    the import path of code that never queries BigQuery.
+    """
+    client = _bigquery_clients.get(project_id)
+    if client is None:
+        with _bigquery_clients_lock:
+            client = _bigquery_clients.get(project_id)
+            if client is None:
+                from google.cloud import bigquery
+
+                client = _bigquery_clients[project_id] = bigquery.Client(project=project_id)
+    return client
+
+
+class BigQueryBackend(QueryBackend):
+    """Runs queries as BigQuery jobs."""
+
+    name = "bigquery"
+
+    def __init__(self, project_id: str):
+        self.client = get_bigquery_client(project_id)
+
+    def _run(self, query: str, params: Optional[Dict[str, Any]], dry_run: bool = False):
+        from google.cloud import bigquery
+
+        job_config = None
+        if params or dry_run:
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=[_to_bigquery_parameter(k, v) for k, v in (params or {}).items()],
+                dry_run=dry_run,
+            )
+        return self.client.query(query, job_config=job_config)
+
+    def execute(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        # 1. Execute the query
+        query_job = self._run(query, params)
+
+        # 2. Get the RowIterator from the results
+        results = query_job.result()
+        fetch_started = time.perf_counter()
+
+        # 3. Convert the RowIterator directly to a list of dicts
+        # The `bigquery.Row` object behaves like a dict, so
+        # we can just cast it. The client library handles
+        # BQ types (e.g., TIMESTAMP) to Python types (e.g., datetime.datetime).
+        records = [dict(row) for row in results]
+        set_attributes(fetch_ms=round((time.perf_counter() - fetch_started) * 1000, 3), **_job_attributes(query_job))
+        return records
+
+    def execute_arrow(self, query: str, params: Optional[Dict[str, Any]] = None):
+        query_job = self._run(query, params)
+        results = query_job.result()
+        fetch_started = time.perf_counter()
+        # Uses the BigQuery Storage API when it is installed; TIMESTAMPs stay int64 microseconds in Arrow.
+        table = results.to_arrow()
+        set_attributes(fetch_ms=round((time.perf_counter() - fetch_started) * 1000, 3), **_job_attributes(query_job))
+        return table
+
+    def execute_iter(self, query: str, params: Optional[Dict[str, Any]] = None,
+                     page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        # The RowIterator fetches one API page of results at a time as it is consumed.
+        for row in self._run(query, params).result(page_size=page_size):
+            yield dict(row)
+
+    def table_version(self, table: str) -> Any:
+        table = self.client.get_table(table)
+        # Streaming inserts land in the streaming buffer before `modified` moves.
+        buffered_rows = table.streaming_buffer.estimated_rows if table.streaming_buffer else 0
+        return table.modified, table.num_rows, buffered_rows
+
+    def scan_stats(self, query: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        # A dry run is free and reports the bytes the query would bill, but not rows.
+        return {"rows_scanned": None, "bytes_scanned": self._run(query, params, dry_run=True).total_bytes_processed}
+
+
+class DuckDBBackend(QueryBackend):
+    """
+    Runs queries in-process with DuckDB over local Parquet files.
+
+    Every sub-directory of `data_path` that contains Parquet files is exposed
+    as a view of the same name, so `<data_path>/toll_records/*.parquet` backs
+    the `toll_records` table. Fully qualified BigQuery table references
+    (`project.dataset.table`) are rewritten to those views and `@name`
+    parameters are rewritten to DuckDB's `$name` form, which lets the tools
+    run the exact same SQL against both engines.
+
+    A table's files may be split into `date=YYYY-MM-DD` partition directories;
+    queries carrying a `partition_range` hint then only read the partitions in
+    that range, as BigQuery prunes a day-partitioned table.
+    """
+
+    name = "duckdb"
+
+    def __init__(self, data_path: str, project_id: str, dataset_id: str):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError(
+                "The duckdb backend requires the optional local dependencies: "
+                "pip install 'traffic-workshop[local]'"
+            ) from e
+
+        self.data_path = data_path
+        self._registered_versions: Dict[str, int] = {}
+        self.connection = duckdb.connect()
+        # BigQuery evaluates timestamps in UTC; match it so date boundaries agree.
+        self.connection.execute("set timezone = 'UTC'")
+        # BigQuery functions used by the tools that DuckDB spells differently.
+        self.connection.execute("create macro unix_micros(ts) as epoch_us(ts)")
+        self.connection.execute("create macro div(x, y) as x // y")
+        self._table_reference = re.compile(
+            r"`?%s\.%s\.(\w+)`?" % (re.escape(project_id), re.escape(dataset_id))
+        )
+        self._parameter = re.compile(r"(?<![\w@])@(\w+)")
+        # DuckDB only accepts UNNEST in a select list, so `x in unnest(@list)` needs a subquery.
+        self._in_unnest = re.compile(r"\bin\s+unnest\s*\(\s*(@\w+)\s*\)", re.IGNORECASE)
+        self._register_parquet_views()
+
+    def _register_parquet_views(self) -> None:
+        if not os.path.isdir(self.data_path):
+            logger.warning(f"Local data path '{self.data_path}' does not exist; no tables registered.")
+            return
+        for entry in sorted(os.listdir(self.data_path)):
+            table_path = os.path.join(self.data_path, entry)
+            pattern = os.path.join(table_path, "**", "*.parquet")
+            if os.path.isdir(table_path) and glob.glob(pattern, recursive=True):
+                # Files may sit in `key=value` partition directories; keep the table's own columns.
+                self.connection.execute(
+                    f"create or replace view \"{entry}\" as "
+                    f"select * from read_parquet('{pattern}', hive_partitioning = false)"
+                )
+                logger.info(f"Registered local table '{entry}' from {pattern}")
+
+    def _table_files(self, table: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> List[str]:
+        """
+        Parquet files of a local table, skipping `date=YYYY-MM-DD` partitions outside [start, end].
+
+        Files outside a date partition are always included.
+        """
+        table_path = os.path.join(self.data_path, table)
+        files = []
+        for root, directories, names in os.walk(table_path):
+            directories.sort()
+            match = _DATE_PARTITION.match(os.path.basename(root))
+            if match:
+                day = match.group(1)
+                if (start is not None and day < _utc_date(start).isoformat()) or \
+                        (end is not None and day > _utc_date(end).isoformat()):
+                    directories.clear()
+                    continue
+            files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith(".parquet"))
+        return files
+
+    def register(self, table: str, data: Any) -> None:
+        """Expose an in-memory Arrow table or DataFrame as `table`."""
+        self.connection.register(table, data)
+        self._registered_versions[table] = self._registered_versions.get(table, 0) + 1
+
+    def table_version(self, table: str) -> Any:
+        name = table.rsplit(".", 1)[-1]
+        if name in self._registered_versions:
+            return self._registered_versions[name]
+        pattern = os.path.join(self.data_path, name, "**", "*.parquet")
+        files = []
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            stat = os.stat(path)
+            files.append((path, stat.st_mtime_ns, stat.st_size))
+        return hash(tuple(files))
+
+    def translate(self, query: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Rewrite BigQuery table references and parameters into DuckDB SQL."""
+        return self._prepare(query, params)[0]
+
+    def _prepare(self, query: str, params: Optional[Dict[str, Any]] = None):
+        """Translate `query`, returning the DuckDB SQL and the Parquet files it reads."""
+        params = params or {}
+        hint = _PARTITION_RANGE.search(query)
+        start = end = None
+        if hint:
+            start, end = (params.get(name[1:]) if name != "*" else None for name in hint.groups())
+            query = query[:hint.start()] + query[hint.end():]
+        scanned: List[str] = []
+
+        def table(match) -> str:
+            name = match.group(1)
+            if name in self._registered_versions or not os.path.isdir(os.path.join(self.data_path, name)):
+                return f'"{name}"'
+            files = self._table_files(name, start, end) if hint else self._table_files(name)
+            scanned.extend(files)
+            if not hint:
+                return f'"{name}"'
+            if not files:
+                return f'(select * from "{name}" where false)'
+            return f"read_parquet({[os.path.abspath(path) for path in files]!r}, hive_partitioning = false)"
+
+        query = self._table_reference.sub(table, query)
+        query = self._in_unnest.sub(r"in (select unnest(\1))", query)
+        return self._parameter.sub(r"$\1", query), scanned
+
+    def _scan_attributes(self, files: List[str]) -> Dict[str, Any]:
+        directories = {os.path.dirname(path) for path in files}
+        partitions = [path for path in directories if _DATE_PARTITION.match(os.path.basename(path))]
+        return {
+            "files_scanned": len(files),
+            "partitions_scanned": len(partitions),
+            # Upper bound: DuckDB reads only the columns and row groups it needs from each file.
+            "bytes_scanned": sum(os.path.getsize(path) for path in files),
+        }
+
+    def execute(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        # Each call gets its own cursor, which is safe to use from any thread.
+        cursor = self.connection.cursor()
+        try:
+            started = time.perf_counter()
+            sql, files = self._prepare(query, params)
+            cursor.execute(sql, params or {})
+            fetch_started = time.perf_counter()
+            columns = [column[0] for column in cursor.description]
+            records = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            set_attributes(
+                engine_ms=round((fetch_started - started) * 1000, 3),
+                fetch_ms=round((time.perf_counter() - fetch_started) * 1000, 3),
+                **self._scan_attributes(files),
+            )
+            return records
+        finally:
+            cursor.close()
+
+    def execute_arrow(self, query: str, params: Optional[Dict[str, Any]] = None):
+        cursor = self.connection.cursor()
+        try:
+            started = time.perf_counter()
+            sql, files = self._prepare(query, params)
+            cursor.execute(sql, params or {})
+            fetch_started = time.perf_counter()
+            table = _arrow_table(cursor)
+            set_attributes(
+                engine_ms=round((fetch_started - started) * 1000, 3),
+                fetch_ms=round((time.perf_counter() - fetch_started) * 1000, 3),
+                **self._scan_attributes(files),
+            )
+            return table
+        finally:
+            cursor.close()
+
+    def execute_iter(self, query: str, params: Optional[Dict[str, Any]] = None,
+                     page_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        cursor = self.connection.cursor()
+        try:
+            sql, files = self._prepare(query, params)
+            cursor.execute(sql, params or {})
+            set_attributes(**self._scan_attributes(files))
+            # Fetch Arrow batches and build each page's dicts in one call, rather than value by value.
+            for batch in _arrow_reader(cursor, page_size):
+                yield from batch.to_pylist()
+        finally:
+            cursor.close()
+
+    def scan_stats(self, query: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        cursor = self.connection.cursor()
+        try:
+            sql, files = self._prepare(query, params)
+            cursor.execute("pragma enable_profiling = 'no_output'")
+            cursor.execute(sql, params or {}).fetchall()
+            profile = json.loads(cursor.get_profiling_information(format="json"))
+        finally:
+            cursor.close()
+        # DuckDB's byte counters only cover its own database files, not Parquet reads,
+        # so report the size of the Parquet files the query had to open.
+        return {
+            "rows_scanned": profile.get("cumulative_rows_scanned"),
+            "bytes_scanned": self._scan_attributes(files)["bytes_scanned"] if files else None,
+        }
+
+
+def _arrow_table(cursor):
+    # DuckDB 1.4 renamed fetch_arrow_table and fetch_record_batch; older releases only have those.
+    to_arrow_table = getattr(cursor, "to_arrow_table", None) or cursor.fetch_arrow_table
+    return to_arrow_table()
+
+
+def _arrow_reader(cursor, batch_size: int):
+    to_arrow_reader = getattr(cursor, "to_arrow_reader", None) or cursor.fetch_record_batch
+    return to_arrow_reader(batch_size)
+
+
+def create_backend(config: AgentConfiguration) -> QueryBackend:
+    """Build the query backend selected by `config.query_backend`."""
+    if config.query_backend == "bigquery":
+        return BigQueryBackend(config.PROJECT_ID)
+    if config.query_backend == "duckdb":
+        return DuckDBBackend(config.local_data_path, config.PROJECT_ID, config.DATASET_ID)
+    raise ValueError(f"Unknown query backend: {config.query_backend!r}")
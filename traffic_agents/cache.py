@@ -0,0 +1,193 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Hashable, Iterable, Optional, Sequence, Tuple
+import logging
+import re
+import threading
+import time
+from .resultset import ResultSet
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_TABLE_REFERENCE = re.compile(r"\b(?:from|join)\s+`?([\w-]+\.\w+\.\w+)`?", re.IGNORECASE)
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace and drop a trailing semicolon so formatting does not split cache keys."""
+    return _WHITESPACE.sub(" ", query).strip().rstrip(";").strip()
+
+
+def referenced_tables(query: str) -> List[str]:
+    """Fully qualified `project.dataset.table` names read by a query."""
+    return sorted(set(_TABLE_REFERENCE.findall(query)))
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def query_key(query: str, params: Optional[Dict[str, Any]] = None) -> Tuple:
+    """Cache key for a query: its normalized SQL plus its bound parameters."""
+    return normalize_sql(query), tuple(sorted((k, _freeze(v)) for k, v in (params or {}).items()))
+
+
+def _snapshot(rows: Sequence) -> Sequence:
+    # Result sets are immutable and shared; row dicts are copied so callers cannot change the cached rows.
+    return rows if isinstance(rows, ResultSet) else [dict(row) for row in rows]
+
+
+@dataclass
+class _Entry:
+    rows: Sequence
+    expires_at: float
+    table_versions: Dict[str, Any]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    size: int = 0
+    max_entries: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class QueryCache:
+    """
+    Size-bounded LRU cache of query results with per-entry TTLs.
+
+    Each entry remembers the version of every table it read (as reported by
+    `table_version`). Versions are re-checked at most every
+    `version_check_interval` seconds per table; when one changes, every entry
+    that read that table is dropped. `invalidate_table` drops them immediately,
+    e.g. when this process ingests new rows.
+
+    Versions are read without holding the cache's lock, since that may take a
+    round trip to the backend. When a version cannot be read, the entries that
+    depend on it are not served and results are not cached until it can.
+    """
+
+    def __init__(self, max_entries: int = 256, version_check_interval: float = 30.0,
+                 table_version: Optional[Callable[[str], Any]] = None):
+        self.max_entries = max_entries
+        self.version_check_interval = version_check_interval
+        self._table_version = table_version
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._versions: Dict[str, Tuple[Any, float]] = {}
+        # Bumped by invalidate_table and clear, so versions read across one are discarded.
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._stats = CacheStats(max_entries=max_entries)
+
+    def _table_versions(self, tables: Iterable[str]) -> Optional[Dict[str, Any]]:
+        """
+        Current version of each table, re-reading those not checked within `version_check_interval`.
+
+        Must be called without holding the lock. Entries that read a table whose
+        version changed are dropped. Returns None if a version could not be read,
+        or if a table was invalidated while its version was being read.
+        """
+        versions: Dict[str, Any] = {}
+        due = []
+        with self._lock:
+            epoch = self._epoch
+            now = time.monotonic()
+            for table in tables:
+                version, checked_at = self._versions.get(table, (None, float("-inf")))
+                if self._table_version is not None and now - checked_at >= self.version_check_interval:
+                    due.append(table)
+                else:
+                    versions[table] = version
+        if not due:
+            return versions
+        fetched = {}
+        for table in due:
+            try:
+                fetched[table] = (self._table_version(table), time.monotonic())
+            except Exception as e:
+                logger.warning(f"Could not read the version of {table}; not caching its results: {e}")
+                return None
+        with self._lock:
+            if self._epoch != epoch:
+                return None
+            for table, (version, checked_at) in fetched.items():
+                previous = self._versions.get(table)
+                if previous is not None and previous[0] != version:
+                    self._drop_table(table)
+                if previous is None or previous[1] < checked_at:
+                    self._versions[table] = (version, checked_at)
+                versions[table] = version
+        return versions
+
+    def _drop_table(self, table: str) -> None:
+        stale = [key for key, entry in self._entries.items() if table in entry.table_versions]
+        for key in stale:
+            del self._entries[key]
+        self._stats.invalidations += len(stale)
+
+    def get(self, key: Tuple) -> Optional[Sequence]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                self._stats.expirations += 1
+                entry = None
+            if entry is None:
+                self._stats.misses += 1
+                return None
+        versions = self._table_versions(entry.table_versions)
+        with self._lock:
+            current = self._entries.get(key) is entry
+            if versions is None or versions != entry.table_versions or not current:
+                if current and versions is not None:
+                    del self._entries[key]
+                    self._stats.invalidations += 1
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return _snapshot(entry.rows)
+
+    def put(self, key: Tuple, rows: Sequence, ttl: float, tables: List[str]) -> None:
+        """Cache `rows`, a `ResultSet` (kept as is) or a list of row dicts (copied)."""
+        versions = self._table_versions(tables)
+        if versions is None:
+            return
+        snapshot = _snapshot(rows)
+        with self._lock:
+            self._entries[key] = _Entry(snapshot, time.monotonic() + ttl, versions)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def invalidate_table(self, table: str) -> None:
+        """Drop every entry that read `table` and force its version to be re-read."""
+        with self._lock:
+            self._drop_table(table)
+            self._versions.pop(table, None)
+            self._epoch += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._epoch += 1
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            self._stats.size = len(self._entries)
+            return CacheStats(**vars(self._stats))
@@ -0,0 +1,191 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Callable, Iterable, Optional, Sequence, Tuple
+import logging
+import threading
+import numpy as np
+from .columnar import ValueDictionary, from_micros
+from .resultset import ResultSet, Rows, as_rows, column_values, timestamp_micros
+
+logger = logging.getLogger(__name__)
+
+
+class _PointReads:
+    """Time-sorted reads at one toll point, stored column-wise."""
+
+    __slots__ = ("timestamps", "plates", "vehicle_types", "record_ids")
+
+    def __init__(self):
+        self.timestamps = array("q")
+        self.plates: List[str] = []
+        self.vehicle_types = array("H")
+        self.record_ids: List[str] = []
+
+    def insert(self, timestamp: int, plate_number: str, vehicle_type: int, record_id: str):
+        if not self.timestamps or timestamp >= self.timestamps[-1]:
+            # Reads almost always arrive in time order, making this an append.
+            self.timestamps.append(timestamp)
+            self.plates.append(plate_number)
+            self.vehicle_types.append(vehicle_type)
+            self.record_ids.append(record_id)
+            return
+        position = bisect_right(self.timestamps, timestamp)
+        self.timestamps.insert(position, timestamp)
+        self.plates.insert(position, plate_number)
+        self.vehicle_types.insert(position, vehicle_type)
+        self.record_ids.insert(position, record_id)
+
+
+class TollPointIndex:
+    """
+    In-process index from toll point to its time-sorted reads.
+
+    Finding every vehicle at a toll point in a time window is two binary
+    searches plus the size of the result, so co-location queries around an
+    incident cost in proportion to the matches rather than the table. Like
+    `PlateIndex`, it is authoritative once built and new reads are folded in
+    with `add_records`.
+    """
+
+    def __init__(self):
+        self._points: Dict[str, _PointReads] = {}
+        self._vehicle_types = ValueDictionary()
+        self._lock = threading.Lock()
+        self.size = 0
+
+    @classmethod
+    def build(cls, run_query: Callable[[str], ResultSet], table: str) -> "TollPointIndex":
+        """Build an index from every row of `table` using `run_query` (e.g. tools.execute_query)."""
+        index = cls()
+        # Fetch timestamps as integers and in index order, so every insert is an append.
+        rows = run_query(f"""
+        select record_id, plate_number, toll_point_id, unix_micros(timestamp) as timestamp_micros, vehicle_type
+        from `{table}`
+        order by toll_point_id, timestamp;
+        """)
+        index.add_records(rows)
+        logger.info(f"Built toll point index with {index.size} reads at {len(index._points)} toll points")
+        return index
+
+    def add_records(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Add toll_records rows, a `ResultSet` or row dicts, to the index.
+
+        Rows carry either a `timestamp` datetime or a precomputed `timestamp_micros`.
+        """
+        rows = as_rows(rows)
+        columns = zip(
+            timestamp_micros(rows),
+            column_values(rows, "toll_point_id"),
+            column_values(rows, "plate_number"),
+            column_values(rows, "vehicle_type", None),
+            column_values(rows, "record_id"),
+        )
+        points = self._points
+        encode_vehicle_type = self._vehicle_types.encode
+        with self._lock:
+            for timestamp, toll_point_id, plate_number, vehicle_type, record_id in columns:
+                reads = points.get(toll_point_id)
+                if reads is None:
+                    reads = points[toll_point_id] = _PointReads()
+                reads.insert(timestamp, plate_number, encode_vehicle_type(vehicle_type), record_id)
+                self.size += 1
+
+    @property
+    def toll_point_ids(self) -> List[str]:
+        return sorted(self._points)
+
+    def window(self, toll_point_id: str, start_micros: int, end_micros: int) -> List[Dict[str, Any]]:
+        """Reads at `toll_point_id` between `start_micros` and `end_micros` inclusive, oldest first."""
+        with self._lock:
+            reads = self._points.get(toll_point_id)
+            if reads is None:
+                return []
+            lo = bisect_left(reads.timestamps, start_micros)
+            hi = bisect_right(reads.timestamps, end_micros)
+            return [
+                {
+                    "record_id": reads.record_ids[i],
+                    "plate_number": reads.plates[i],
+                    "toll_point_id": toll_point_id,
+                    "timestamp_micros": reads.timestamps[i],
+                    "vehicle_type": self._vehicle_types.values[reads.vehicle_types[i]],
+                }
+                for i in range(lo, hi)
+            ]
+
+
+def merge_windows(times: Sequence[int], radius: int) -> List[Tuple[int, int]]:
+    """Merge the intervals of +/- `radius` around sorted `times` into disjoint (start, end) intervals."""
+    windows: List[Tuple[int, int]] = []
+    for time in times:
+        if windows and time - radius <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], time + radius)
+        else:
+            windows.append((time - radius, time + radius))
+    return windows
+
+
+def nearest_target(toll_point_id: str, timestamp: int, targets: Dict[str, List[int]]) -> Optional[int]:
+    """Signed microseconds from a read at `timestamp` to the closest target read at the same toll point."""
+    times = targets.get(toll_point_id)
+    if not times:
+        return None
+    position = bisect_left(times, timestamp)
+    closest = [times[i] for i in (position - 1, position) if 0 <= i < len(times)]
+    return min((timestamp - t for t in closest), key=abs)
+
+
+def summarize_witnesses(reads: Rows, targets: Optional[Dict[str, List[int]]], limit: int) -> Dict[str, Any]:
+    """
+    Turn co-located reads into the witness tool's result.
+
+    `reads` is a `ResultSet` or a list of read dicts (e.g. from the index).
+    `targets` maps toll point to the sorted target read times (microseconds),
+    or is None for an incident window with no target vehicle. Plates are
+    ranked by how many distinct toll points they shared with the target, then
+    by how close in time they came to it. Reads are listed in time order, or
+    closest to a target read first when `targets` is given.
+    """
+    plate_numbers = column_values(reads, "plate_number")
+    toll_point_ids = column_values(reads, "toll_point_id")
+    timestamps = column_values(reads, "timestamp_micros")
+    vehicle_types = column_values(reads, "vehicle_type")
+    # Order by time, then toll point, without building a row per read.
+    order = np.lexsort((np.asarray(toll_point_ids, dtype=str), np.asarray(timestamps, dtype=np.int64)))
+
+    plates: Dict[str, Dict[str, Any]] = {}
+    witness_reads = []
+    for i in order.tolist():
+        plate_number, toll_point_id, timestamp = plate_numbers[i], toll_point_ids[i], timestamps[i]
+        offset = nearest_target(toll_point_id, timestamp, targets) if targets is not None else None
+        seconds = None if offset is None else round(offset / 1_000_000, 1)
+        witness_reads.append({
+            "plate_number": plate_number,
+            "toll_point_id": toll_point_id,
+            "timestamp": from_micros(timestamp).isoformat(),
+            "vehicle_type": vehicle_types[i],
+            "seconds_from_target": seconds,
+        })
+        plate = plates.setdefault(plate_number, {
+            "plate_number": plate_number, "reads": 0, "toll_point_ids": set(), "closest_seconds": None,
+        })
+        plate["reads"] += 1
+        plate["toll_point_ids"].add(toll_point_id)
+        if seconds is not None and (plate["closest_seconds"] is None or abs(seconds) < plate["closest_seconds"]):
+            plate["closest_seconds"] = abs(seconds)
+
+    if targets is not None:
+        # Keep the reads closest to the target, not the earliest; ties stay in time order.
+        witness_reads.sort(key=lambda read: (read["seconds_from_target"] is None, abs(read["seconds_from_target"] or 0)))
+    ranked = sorted(
+        plates.values(),
+        key=lambda p: (-len(p["toll_point_ids"]), p["closest_seconds"] if p["closest_seconds"] is not None else 0,
+                       -p["reads"], p["plate_number"]),
+    )
+    return {
+        "witness_plates": [dict(p, toll_point_ids=sorted(p["toll_point_ids"])) for p in ranked[:limit]],
+        "witness_reads": witness_reads[:limit],
+        "total_witness_plates": len(plates),
+        "total_witness_reads": len(witness_reads),
+    }
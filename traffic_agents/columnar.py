@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_micros(value: datetime) -> int:
+    """Microseconds since the epoch for an aware (or UTC naive) datetime."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    # int() of the float seconds is exact at this magnitude; add microseconds separately.
+    return int(value.timestamp()) * 1_000_000 + value.microsecond
+
+
+def from_micros(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+class ValueDictionary:
+    """Interns low-cardinality strings (toll points, vehicle types) as small integer codes."""
+
+    def __init__(self):
+        self.values: List[Optional[str]] = []
+        self.codes: Dict[Optional[str], int] = {}
+
+    def encode(self, value: Optional[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class StringHeap:
+    """
+    Stores high-cardinality strings (record ids, image URLs) back to back in one UTF-8 buffer.
+
+    `add` returns a reference packing the string's offset and length into one
+    integer, to keep in an `array("Q")` column; `get` turns it back into the
+    string. None is stored as a reserved length, and strings of that length or
+    longer are rejected.
+    """
+
+    _NONE = 0xFFFF
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return self._NONE
+        encoded = value.encode()
+        if len(encoded) >= self._NONE:
+            raise ValueError(f"String of {len(encoded)} bytes is too long for a StringHeap")
+        reference = len(self.data) << 16 | len(encoded)
+        self.data += encoded
+        return reference
+
+    def get(self, reference: int) -> Optional[str]:
+        length = reference & 0xFFFF
+        if length == self._NONE:
+            return None
+        start = reference >> 16
+        return self.data[start:start + length].decode()
@@ -1,4 +1,6 @@
-from dataclasses import dataclass
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 
 @dataclass
 class AgentConfiguration:
@@ -7,6 +9,131 @@ class AgentConfiguration:
     planning_model: str = "gemini-2.5-pro"
     max_search_iterations: int = 5
     PROJECT_ID: str = "ajmalaziz-814-20250326021733"
+    DATASET_ID: str = "tolls"
     COMPANY_NAME: str = "Transurban"
+    # How research_coordinator_agent runs its stages: "transfer" lets the model hand off between
+    # sub-agents; "pipeline" runs CCTV analysis and database research concurrently, then the report.
+    research_mode: str = os.environ.get("TRAFFIC_RESEARCH_MODE", "transfer")
+    # Engine used by the toll tools: "bigquery" or "duckdb" (local Parquet files).
+    query_backend: str = os.environ.get("TRAFFIC_QUERY_BACKEND", "bigquery")
+    # Directory holding one sub-directory of Parquet files per table for the duckdb backend.
+    local_data_path: str = os.environ.get("TRAFFIC_LOCAL_DATA_PATH", "data")
+    # Serve plate lookups from an in-process index built from the toll_records table on first use.
+    plate_index_enabled: bool = os.environ.get("TRAFFIC_PLATE_INDEX", "false").lower() == "true"
+    # Answer witness searches from an in-process index of each toll point's time-sorted reads.
+    colocation_index_enabled: bool = os.environ.get("TRAFFIC_COLOCATION_INDEX", "false").lower() == "true"
+    # Answer vehicle count tools from pre-aggregated time-bucket rollups built on first use.
+    rollups_enabled: bool = os.environ.get("TRAFFIC_ROLLUPS", "false").lower() == "true"
+    rollup_bucket_seconds: int = 60
+    # Answer distinct vehicle and frequent plate tools from per-toll-point, per-bucket sketches built on first use.
+    sketches_enabled: bool = os.environ.get("TRAFFIC_SKETCHES", "false").lower() == "true"
+    sketch_bucket_seconds: int = 3600
+    # 2 ** precision HyperLogLog registers per cell; distinct counts are within 1.04 / sqrt(2 ** precision).
+    sketch_hll_precision: int = 12
+    # Count-min estimates overcount by at most e / width * reads with probability 1 - exp(-depth).
+    sketch_cm_width: int = 2048
+    sketch_cm_depth: int = 4
+    # Frequent plate candidates kept per cell.
+    sketch_top_k: int = 32
+    # Oldest buckets are dropped beyond this many, which bounds the sketches' memory.
+    sketch_max_buckets: int = 24 * 7
+    # Built structures fold in reads added to the table since (see tail.py), checking at most this often.
+    index_refresh_seconds: float = float(os.environ.get("TRAFFIC_INDEX_REFRESH_SECONDS", "5"))
+    # Reads landing up to this long after later reads are still picked up.
+    index_refresh_lateness_seconds: float = 300.0
+    # Cache query results in-process, keyed on normalized SQL and parameters.
+    query_cache_enabled: bool = os.environ.get("TRAFFIC_QUERY_CACHE", "true").lower() == "true"
+    query_cache_max_entries: int = 256
+    # How often to re-read a table's last-modified version to invalidate stale results.
+    query_cache_version_check_seconds: float = 30.0
+    query_cache_default_ttl: float = 300.0
+    # Per-tool result TTLs in seconds; 0 disables caching for that tool.
+    query_cache_ttls: Dict[str, float] = field(default_factory=lambda: {
+        "get_toll_records_by_plate_number": 300.0,
+        "get_toll_records_by_plate_numbers": 300.0,
+        "get_vehicle_count_by_type": 60.0,
+        "get_vehicle_count_by_toll_point": 60.0,
+        "get_distinct_vehicle_count": 60.0,
+        "get_frequent_plate_numbers": 60.0,
+        "get_vehicle_journeys": 300.0,
+        "find_witness_vehicles": 300.0,
+        "find_similar_plate_numbers": 300.0,
+    })
+    # Results with more rows than this are streamed to the caller without being cached.
+    query_cache_max_rows: int = 10_000
+    # Let identical concurrent queries share one backend job (see singleflight.py).
+    single_flight_enabled: bool = os.environ.get("TRAFFIC_SINGLE_FLIGHT", "true").lower() == "true"
+    # A streamed result being paged through can be joined for this long after its query started.
+    single_flight_max_join_seconds: float = 10.0
+    # Default and maximum number of records a tool returns per page.
+    tool_page_size: int = 100
+    max_open_result_cursors: int = 128
+    result_cursor_ttl_seconds: float = 600.0
+    # Default result format for the toll record tools: "rows" or "compact" (see encoding.encode_compact).
+    tool_result_format: str = os.environ.get("TRAFFIC_TOOL_RESULT_FORMAT", "rows")
+    # Reads of one plate more than this far apart belong to separate journeys.
+    journey_gap_seconds: float = 1800.0
+    # Position of each toll point along the road in km, used for journey distances and speeds.
+    toll_point_positions_km: Dict[str, float] = field(default_factory=lambda: {
+        f"TP-{i:03d}": (i - 1) * 4.5 for i in range(1, 11)
+    })
+    # Answer similar plate searches from an in-process fuzzy plate index built on first use,
+    # rather than by scoring every distinct plate in the table on each search.
+    fuzzy_plate_index_enabled: bool = os.environ.get("TRAFFIC_FUZZY_PLATE_INDEX", "false").lower() == "true"
+    # Largest edit distance the fuzzy plate index (see fuzzy_plates.py) can search, and the cost of
+    # substituting a character for one readers commonly confuse it with (e.g. O and 0).
+    fuzzy_plate_max_edits: int = 2
+    fuzzy_plate_confusion_cost: float = 0.25
+    # Run the streaming anomaly detector (see anomalies.py) over ingested toll reads.
+    anomaly_detection_enabled: bool = os.environ.get("TRAFFIC_ANOMALY_DETECTION", "false").lower() == "true"
+    # Implied speeds between a plate's reads above these flag impossible travel and plate cloning.
+    anomaly_max_speed_kmh: float = 200.0
+    anomaly_clone_speed_kmh: float = 400.0
+    # Two vehicles this close together at this many different toll points in a row form a convoy.
+    anomaly_convoy_headway_seconds: float = 3.0
+    anomaly_convoy_min_points: int = 3
+    anomaly_max_tracked_plates: int = 1_000_000
+    anomaly_max_alerts: int = 10_000
+    # When the detector starts, replay this many seconds of the latest toll reads from the table.
+    anomaly_backfill_seconds: float = 3600.0
+    # CCTV preprocessing (see footage.py): frames decoded per second, the clip kept around an incident,
+    # the share of a frame that must change to count as motion and as a new frame, and the keyframe cap.
+    footage_sample_fps: float = 4.0
+    footage_clip_seconds: float = 5.0
+    footage_clip_fps: float = 2.0
+    footage_motion_threshold: float = 0.005
+    footage_duplicate_threshold: float = 0.005
+    footage_max_keyframes: int = 24
+    footage_keyframe_max_size: int = 1280
+    # Prepared footage is cached by content hash in memory and, when set, in this directory.
+    footage_cache_max_entries: int = 32
+    footage_cache_dir: Optional[str] = os.environ.get("TRAFFIC_FOOTAGE_CACHE_DIR")
+    # Toolbox tool definitions compiled into agent tools (see toolset.py); tools implemented in Python
+    # take precedence over entries of the same name and run their statements for their plain queries.
+    # `toolset_name` limits the agent tools to one toolset. The file ships inside the package so
+    # deployments have it.
+    toolset_path: str = os.environ.get(
+        "TRAFFIC_TOOLSET_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools.yaml")
+    )
+    toolset_name: Optional[str] = os.environ.get("TRAFFIC_TOOLSET")
+    # Record spans and counters for tool calls, queries and agent turns (see instrumentation.py).
+    instrumentation_enabled: bool = os.environ.get("TRAFFIC_INSTRUMENTATION", "true").lower() == "true"
+    # Fraction of traces whose spans are exported; counters always cover every call.
+    instrumentation_sample_rate: float = float(os.environ.get("TRAFFIC_INSTRUMENTATION_SAMPLE_RATE", "1.0"))
+    # Fraction of sampled tool spans that also record the JSON size of the tool's result,
+    # which means serializing the whole result.
+    instrumentation_payload_sample_rate: float = float(
+        os.environ.get("TRAFFIC_INSTRUMENTATION_PAYLOAD_SAMPLE_RATE", "0.1")
+    )
+    # Agent turn spans still open after this long are ended as abandoned, e.g. when the agent raised.
+    instrumentation_max_open_seconds: float = 3600.0
+    # Spans kept in memory for `instrumentation.recent_spans`.
+    instrumentation_buffer_size: int = 1000
+    # Also append spans to this JSON lines file when set.
+    instrumentation_jsonl_path: Optional[str] = os.environ.get("TRAFFIC_INSTRUMENTATION_JSONL")
+    # Columns the compact format can drop because they are derived from other columns.
+    derived_columns: Dict[str, str] = field(default_factory=lambda: {
+        "image_url": "http://example.com/images/{record_id}.jpg",
+    })
 
 config = AgentConfiguration()
@@ -0,0 +1,119 @@
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+import json
+import re
+from .columnar import from_micros, to_micros
+
+COMPACT_FORMAT = "compact-v1"
+
+# Rough characters-per-token ratio for JSON payloads, used to report token savings.
+CHARS_PER_TOKEN = 4
+
+_TEMPLATE_FIELD = re.compile(r"\{(\w+)\}")
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, default=str, separators=(",", ":")))
+
+
+def _matches_template(records: List[Dict[str, Any]], column: str, template: str) -> bool:
+    return all(record[column] == template.format(**record) for record in records)
+
+
+def encode_compact(records: List[Dict[str, Any]], templates: Optional[Dict[str, str]] = None,
+                   max_dictionary_size: int = 256) -> Dict[str, Any]:
+    """
+    Encode records as a header row plus value arrays, for sending to the model.
+
+    - `columns` names each position in the `rows` arrays.
+    - String columns with few distinct values are dictionary-encoded: the row
+      holds an index into `dictionaries[column]`.
+    - Timestamp columns are delta-encoded: `timestamp_bases[column]` is the
+      first value and each row holds the seconds elapsed since the previous row.
+    - A column that is fully derivable from the others via `templates`
+      (e.g. image_url from record_id) is dropped and listed in `derived`.
+
+    Returns:
+        Dict[str, Any]: The encoded payload; `decode_compact` reverses it.
+    """
+    payload: Dict[str, Any] = {"format": COMPACT_FORMAT, "columns": [], "rows": []}
+    if not records:
+        return payload
+
+    columns = list(records[0])
+    derived = {}
+    for column, template in (templates or {}).items():
+        fields = set(_TEMPLATE_FIELD.findall(template))
+        if column in columns and fields <= set(columns) - {column} and _matches_template(records, column, template):
+            derived[column] = template
+            columns.remove(column)
+
+    dictionaries: Dict[str, List[Any]] = {}
+    timestamp_bases: Dict[str, str] = {}
+    for column in columns:
+        values = [record[column] for record in records]
+        if all(isinstance(v, datetime) for v in values):
+            timestamp_bases[column] = values[0].isoformat()
+        elif all(isinstance(v, str) for v in values):
+            distinct = list(dict.fromkeys(values))
+            if len(distinct) <= max_dictionary_size and len(distinct) * 2 <= len(values):
+                dictionaries[column] = distinct
+
+    codes = {column: {value: i for i, value in enumerate(values)} for column, values in dictionaries.items()}
+    previous = {column: to_micros(records[0][column]) for column in timestamp_bases}
+    rows = []
+    for record in records:
+        row = []
+        for column in columns:
+            value = record[column]
+            if column in codes:
+                value = codes[column][value]
+            elif column in previous:
+                micros = to_micros(value)
+                delta = (micros - previous[column]) / 1_000_000
+                previous[column] = micros
+                value = int(delta) if delta.is_integer() else round(delta, 6)
+            row.append(value)
+        rows.append(row)
+
+    payload.update(columns=columns, rows=rows)
+    if dictionaries:
+        payload["dictionaries"] = dictionaries
+    if timestamp_bases:
+        payload["timestamp_bases"] = timestamp_bases
+    if derived:
+        payload["derived"] = derived
+    return payload
+
+
+def decode_compact(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Rebuild plain records from an `encode_compact` payload (timestamps come back in UTC)."""
+    columns = payload["columns"]
+    dictionaries = payload.get("dictionaries", {})
+    current = {column: to_micros(datetime.fromisoformat(base)) for column, base in payload.get("timestamp_bases", {}).items()}
+    records = []
+    for row in payload["rows"]:
+        record = {}
+        for column, value in zip(columns, row):
+            if column in dictionaries:
+                value = dictionaries[column][value]
+            elif column in current:
+                current[column] += round(value * 1_000_000)
+                value = from_micros(current[column])
+            record[column] = value
+        for column, template in payload.get("derived", {}).items():
+            record[column] = template.format(**record)
+        records.append(record)
+    return records
+
+
+def encoding_stats(records: List[Dict[str, Any]], payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Serialized size of the plain records versus the compact payload."""
+    plain_bytes = _json_size(records)
+    compact_bytes = _json_size(payload)
+    return {
+        "plain_bytes": plain_bytes,
+        "compact_bytes": compact_bytes,
+        "approx_tokens_saved": (plain_bytes - compact_bytes) // CHARS_PER_TOKEN,
+        "reduction": round(1 - compact_bytes / plain_bytes, 3) if plain_bytes else 0.0,
+    }
@@ -0,0 +1,34 @@
+from typing import Any, Mapping, Optional
+
+# Session state keys written by the research stages and read by the report composer.
+CCTV_FINDINGS_KEY = "cctv_findings"
+DATABASE_FINDINGS_KEY = "database_findings"
+RESEARCH_FINDINGS_KEY = "research_findings"
+
+_SECTIONS = (
+    (CCTV_FINDINGS_KEY, "CCTV Analysis"),
+    (DATABASE_FINDINGS_KEY, "Toll and Traffic Database Research"),
+)
+
+
+def merge_research_findings(state: Mapping[str, Any]) -> Optional[str]:
+    """
+    Combine the per-stage findings in `state` into one markdown document.
+
+    Each research stage writes its own state key so that neither can overwrite
+    the other. Returns None when no stage has produced findings yet.
+    """
+    sections = [
+        f"## {title}\n\n{str(state[key]).strip()}"
+        for key, title in _SECTIONS
+        if state.get(key)
+    ]
+    return "\n\n".join(sections) if sections else None
+
+
+def merge_research_findings_callback(callback_context) -> None:
+    """ADK `before_agent_callback` that writes the merged findings to `research_findings`."""
+    merged = merge_research_findings(callback_context.state)
+    if merged is not None:
+        callback_context.state[RESEARCH_FINDINGS_KEY] = merged
+    return None
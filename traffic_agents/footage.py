@@ -0,0 +1,373 @@
+"""
+CCTV footage preprocessing: keyframes instead of whole videos.
+
+`select_keyframes` works on any sequence of (seconds, frame) pairs, so it can
+be run on synthetic frames as well as decoded video. Frames are compared on a
+small grayscale thumbnail by the share of its pixels that changed noticeably,
+which ignores sensor noise and still sees a small vehicle. A frame is kept
+when enough of it changed since the frame before it (`motion_threshold`) and
+since the last kept frame (`duplicate_threshold`); a parked scene yields one
+frame and a passing vehicle one. Around an incident time every new frame
+is kept at `clip_fps`, giving a short clip of stills.
+
+`prepare_footage` decodes a video (PyAV), selects keyframes and encodes them
+as JPEGs (Pillow), caching the result by the video's content hash so the same
+clip is never decoded twice. The `prepare_cctv_footage` tool runs it on an
+uploaded artifact and saves the keyframes as user-scoped artifacts named by
+that hash, so a clip analysed again, in any session, reuses the images already
+stored instead of uploading them again.
+"""
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+import asyncio
+import hashlib
+import heapq
+import io
+import json
+import logging
+import os
+import threading
+import numpy as np
+from .config import config
+from .instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+# Frames are compared as grayscale thumbnails at most this many pixels on a side.
+_THUMBNAIL_SIZE = 96
+# A thumbnail pixel has changed when its brightness moves by more than this.
+_PIXEL_CHANGE = 20
+
+FIRST = "first"
+MOTION = "motion"
+INCIDENT = "incident"
+
+
+@dataclass
+class Keyframe:
+    timestamp_seconds: float
+    frame: np.ndarray
+    # Share of thumbnail pixels that changed since the previous frame.
+    motion: float
+    reason: str
+
+
+def thumbnail(frame: np.ndarray) -> np.ndarray:
+    """Small grayscale copy of an (H, W) or (H, W, C) uint8 frame, as int16."""
+    factor = max(1, -(-max(frame.shape[:2]) // _THUMBNAIL_SIZE))
+    # Average 2x2 samples per thumbnail pixel from a strided view, rather than every pixel,
+    # which keeps the noise down at a fraction of the cost of a full block average.
+    half = max(1, factor // 2)
+    height, width = frame.shape[0] // factor * factor, frame.shape[1] // factor * factor
+    sampled = frame[:height:half, :width:half].astype(np.int16)
+    if sampled.ndim == 3:
+        sampled = sampled.sum(axis=2, dtype=np.int16) // sampled.shape[2]
+    if factor == 1:
+        return sampled
+    blocks = factor // half
+    rows, columns = sampled.shape[0] // blocks * blocks, sampled.shape[1] // blocks * blocks
+    return sampled[:rows, :columns].reshape(rows // blocks, blocks, columns // blocks, blocks).mean(
+        axis=(1, 3), dtype=np.float32).astype(np.int16)
+
+
+def changed_share(a: np.ndarray, b: np.ndarray) -> float:
+    """Share of pixels that differ by more than `_PIXEL_CHANGE` between two thumbnails."""
+    return float(np.count_nonzero(np.abs(a - b) > _PIXEL_CHANGE)) / a.size
+
+
+def select_keyframes(frames: Iterable[Tuple[float, np.ndarray]], incident_seconds: Optional[float] = None,
+                     clip_seconds: float = 5.0, clip_fps: float = 2.0, motion_threshold: float = 0.005,
+                     duplicate_threshold: float = 0.005, max_keyframes: int = 24,
+                     max_event_seconds: float = 5.0) -> List[Keyframe]:
+    """
+    Pick the frames worth showing a model from time-ordered (seconds, frame) pairs.
+
+    Consecutive frames with motion form one event, of which only the frame
+    with the most motion is kept, so each passing vehicle gets a keyframe
+    rather than the cap going to a few of them. Events longer than
+    `max_event_seconds` are split, so continuous motion is still sampled.
+
+    Args:
+        frames (Iterable[Tuple[float, np.ndarray]]): Frames in time order, e.g. from `decode_video`.
+        incident_seconds (float, optional): Time of the incident; frames within `clip_seconds`
+            of it are kept at up to `clip_fps`, dropping those that duplicate the last kept frame.
+        motion_threshold (float): Smallest share of the frame changed since the previous frame
+            that counts as motion.
+        duplicate_threshold (float): Smallest share of the frame changed since the last kept frame
+            for a frame to count as new.
+        max_keyframes (int): Most motion keyframes to keep; the events with the most motion win.
+            The first frame and incident clip frames are kept in addition.
+
+    Returns:
+        List[Keyframe]: The kept frames in time order.
+    """
+    kept: List[Keyframe] = []
+    # Min-heap of (motion, sequence, keyframe) holding the strongest events' keyframes.
+    strongest: List[Tuple[float, int, Keyframe]] = []
+    # The current event's strongest frame as (keyframe, thumbnail, sequence), and when it started.
+    event = None
+    event_start = 0.0
+    previous = last_kept = None
+    last_clip_time = None
+
+    def close_event():
+        nonlocal event, last_kept
+        if event is None:
+            return
+        keyframe, small, sequence = event
+        heapq.heappush(strongest, (keyframe.motion, sequence, keyframe))
+        if len(strongest) > max_keyframes:
+            heapq.heappop(strongest)
+        # Later frames are compared against the event's frame even if the cap drops it.
+        last_kept = small
+        event = None
+
+    for sequence, (seconds, frame) in enumerate(frames):
+        small = thumbnail(frame)
+        motion = changed_share(small, previous) if previous is not None else 0.0
+        previous = small
+
+        if last_kept is None and event is None:
+            kept.append(Keyframe(seconds, frame, motion, FIRST))
+            last_kept = small
+            continue
+        if incident_seconds is not None and abs(seconds - incident_seconds) <= clip_seconds:
+            close_event()
+            # The first clip frame is always kept, to show the scene at the incident.
+            if last_clip_time is not None and (seconds - last_clip_time < 1 / clip_fps
+                                               or changed_share(small, last_kept) < duplicate_threshold):
+                continue
+            kept.append(Keyframe(seconds, frame, motion, INCIDENT))
+            last_kept = small
+            last_clip_time = seconds
+            continue
+        if motion < motion_threshold or changed_share(small, last_kept) < duplicate_threshold:
+            close_event()
+            continue
+        if event is not None and seconds - event_start >= max_event_seconds:
+            close_event()
+        if event is None:
+            event_start = seconds
+        if event is None or motion > event[0].motion:
+            event = (Keyframe(seconds, frame, motion, MOTION), small, sequence)
+    close_event()
+
+    kept.extend(keyframe for _, _, keyframe in strongest)
+    return sorted(kept, key=lambda keyframe: keyframe.timestamp_seconds)
+
+
+def decode_video(data: bytes, sample_fps: float = 4.0) -> Iterator[Tuple[float, np.ndarray]]:
+    """Decode a video to (seconds, RGB frame) pairs, at most `sample_fps` frames per second."""
+    try:
+        import av
+    except ImportError as e:
+        raise ImportError(
+            "Decoding CCTV footage requires the optional video dependencies: pip install 'traffic-workshop[video]'"
+        ) from e
+
+    with av.open(io.BytesIO(data)) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        next_time = 0.0
+        for frame in container.decode(stream):
+            if frame.time is None or frame.time < next_time:
+                continue
+            next_time = frame.time + 1 / sample_fps
+            yield float(frame.time), frame.to_ndarray(format="rgb24")
+
+
+def encode_jpeg(frame: np.ndarray, max_size: int = 1280, quality: int = 85) -> bytes:
+    """JPEG bytes of a frame, scaled down so neither side exceeds `max_size`."""
+    from PIL import Image
+
+    image = Image.fromarray(frame)
+    image.thumbnail((max_size, max_size))
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+@dataclass
+class PreparedFootage:
+    content_hash: str
+    frames_decoded: int
+    duration_seconds: float
+    # Per keyframe: timestamp_seconds, motion and reason.
+    keyframes: List[Dict[str, Any]]
+    images: List[bytes] = field(repr=False)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class FootageCache:
+    """
+    Prepared footage by content hash and options, in memory and optionally on disk.
+
+    On disk each entry is a directory holding manifest.json and the JPEG keyframes.
+    """
+
+    def __init__(self, max_entries: int = 32, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries: "OrderedDict[str, PreparedFootage]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[PreparedFootage]:
+        with self._lock:
+            prepared = self._entries.get(key)
+            if prepared is not None:
+                self._entries.move_to_end(key)
+                return prepared
+        prepared = self._read(key)
+        if prepared is not None:
+            self._remember(key, prepared)
+        return prepared
+
+    def put(self, key: str, prepared: PreparedFootage) -> None:
+        self._remember(key, prepared)
+        if self.directory:
+            self._write(key, prepared)
+
+    def _remember(self, key: str, prepared: PreparedFootage) -> None:
+        with self._lock:
+            self._entries[key] = prepared
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read(self, key: str) -> Optional[PreparedFootage]:
+        if not self.directory:
+            return None
+        path = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(path, "manifest.json")) as f:
+                manifest = json.load(f)
+            images = []
+            for i in range(len(manifest["keyframes"])):
+                with open(os.path.join(path, f"keyframe-{i:03d}.jpg"), "rb") as f:
+                    images.append(f.read())
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Ignoring unreadable footage cache entry {path}: {e}")
+            return None
+        return PreparedFootage(images=images, **manifest)
+
+    def _write(self, key: str, prepared: PreparedFootage) -> None:
+        path = os.path.join(self.directory, key)
+        os.makedirs(path, exist_ok=True)
+        for i, image in enumerate(prepared.images):
+            with open(os.path.join(path, f"keyframe-{i:03d}.jpg"), "wb") as f:
+                f.write(image)
+        manifest = {k: v for k, v in asdict(prepared).items() if k != "images"}
+        # Written last, so a partly written entry is never read.
+        with open(os.path.join(path, "manifest.json.tmp"), "w") as f:
+            json.dump(manifest, f)
+        os.replace(os.path.join(path, "manifest.json.tmp"), os.path.join(path, "manifest.json"))
+
+
+footage_cache = FootageCache(config.footage_cache_max_entries, config.footage_cache_dir)
+
+
+def footage_cache_key(digest: str, incident_seconds: Optional[float] = None) -> str:
+    """Cache key for footage with content hash `digest`, covering every option that changes its keyframes."""
+    options = (config.footage_sample_fps, config.footage_clip_seconds, config.footage_clip_fps,
+               config.footage_motion_threshold, config.footage_duplicate_threshold, config.footage_max_keyframes,
+               config.footage_keyframe_max_size, incident_seconds)
+    return f"{digest[:32]}-{hashlib.sha256(repr(options).encode()).hexdigest()[:12]}"
+
+
+def prepare_footage(data: bytes, incident_seconds: Optional[float] = None,
+                    cache: Optional[FootageCache] = footage_cache) -> Tuple[PreparedFootage, bool]:
+    """
+    Keyframes of a video, from `cache` when the same bytes were prepared with the same options.
+
+    Returns:
+        Tuple[PreparedFootage, bool]: The prepared footage and whether it came from the cache.
+    """
+    digest = content_hash(data)
+    key = footage_cache_key(digest, incident_seconds)
+    if cache is not None:
+        prepared = cache.get(key)
+        if prepared is not None:
+            return prepared, True
+
+    decoded = 0
+    duration = 0.0
+
+    def frames():
+        nonlocal decoded, duration
+        for seconds, frame in decode_video(data, config.footage_sample_fps):
+            decoded += 1
+            duration = seconds
+            yield seconds, frame
+
+    keyframes = select_keyframes(
+        frames(), incident_seconds,
+        clip_seconds=config.footage_clip_seconds, clip_fps=config.footage_clip_fps,
+        motion_threshold=config.footage_motion_threshold, duplicate_threshold=config.footage_duplicate_threshold,
+        max_keyframes=config.footage_max_keyframes,
+    )
+    prepared = PreparedFootage(
+        content_hash=digest,
+        frames_decoded=decoded,
+        duration_seconds=round(duration, 3),
+        keyframes=[
+            {"timestamp_seconds": round(k.timestamp_seconds, 3), "motion": round(k.motion, 4), "reason": k.reason}
+            for k in keyframes
+        ],
+        images=[encode_jpeg(k.frame, config.footage_keyframe_max_size) for k in keyframes],
+    )
+    logger.info(f"Prepared footage {digest[:12]}: {len(keyframes)} keyframes from {decoded} decoded frames")
+    if cache is not None:
+        cache.put(key, prepared)
+    return prepared, False
+
+
+async def prepare_cctv_footage(artifact_name: str, incident_seconds: Optional[float] = None,
+                               tool_context=None) -> Dict[str, Any]:
+    """
+    Reduce uploaded CCTV footage to its keyframes, saved as image artifacts to load instead of the video.
+
+    Near-duplicate frames are dropped and only frames with motion are kept,
+    plus a short run of frames around the incident when its time is given.
+    Repeat calls for the same footage reuse the earlier keyframes.
+
+    Args:
+        artifact_name (str): The name of the uploaded video artifact.
+        incident_seconds (float, optional): When the incident happens, in seconds from the start of the footage.
+
+    Returns:
+        Dict[str, Any]: 'keyframes', each with 'artifact_name', 'timestamp_seconds' (from the start
+        of the footage), 'motion' and 'reason' ('first', 'motion' or 'incident'); 'frames_decoded',
+        'duration_seconds' and 'cached'.
+    """
+    from google.genai import types
+
+    with span("prepare_cctv_footage", kind="tool") as tool_span:
+        video = await tool_context.load_artifact(artifact_name)
+        if video is None or video.inline_data is None:
+            raise ValueError(f"No uploaded artifact named {artifact_name!r}")
+        prepared, cached = await asyncio.to_thread(prepare_footage, video.inline_data.data, incident_seconds)
+
+        # User-scoped and named by content and image size, so stored keyframes carry over to later sessions.
+        prefix = f"user:cctv-{prepared.content_hash[:16]}-{config.footage_keyframe_max_size}px"
+        existing = set(await tool_context.list_artifacts())
+        keyframes = []
+        uploaded = 0
+        for i, (keyframe, image) in enumerate(zip(prepared.keyframes, prepared.images)):
+            name = f"{prefix}-{i:03d}-{keyframe['timestamp_seconds']:.1f}s.jpg"
+            if name not in existing:
+                await tool_context.save_artifact(name, types.Part.from_bytes(data=image, mime_type="image/jpeg"))
+                uploaded += 1
+            keyframes.append(dict(keyframe, artifact_name=name))
+        tool_span.set(cached=cached, keyframes=len(keyframes), uploaded=uploaded,
+                      frames_decoded=prepared.frames_decoded)
+        return {
+            "keyframes": keyframes,
+            "frames_decoded": prepared.frames_decoded,
+            "duration_seconds": prepared.duration_seconds,
+            "cached": cached,
+        }
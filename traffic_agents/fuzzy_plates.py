@@ -0,0 +1,285 @@
+from typing import List, Dict, Any, Callable, Iterable, Optional, Sequence, Tuple
+import logging
+import re
+import threading
+import numpy as np
+from .resultset import ResultSet
+
+logger = logging.getLogger(__name__)
+
+# Characters plate readers commonly mistake for one another.
+DEFAULT_CONFUSIONS = ("0ODQ", "1IL", "2Z", "4A", "5S", "6G", "7T", "8B", "UV")
+
+_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_NOT_ALPHABET = re.compile("[^0-9A-Z]+")
+_NOT_ALPHABET_OR_NEWLINE = re.compile("[^0-9A-Z\n]+")
+# Block keys are base-_BASE numbers of canonical character codes (1.._BASE-1).
+_BASE = len(_ALPHABET) + 1
+# Distances are computed in integer hundredths of an edit.
+_COST_SCALE = 100
+
+
+def normalize_plate(plate_number: str) -> str:
+    """Uppercase a plate and drop separators, e.g. 'abc-123' -> 'ABC123'."""
+    return _NOT_ALPHABET.sub("", plate_number.upper())
+
+
+def _normalize_plates(plate_numbers: Sequence[str]) -> List[str]:
+    """`normalize_plate` for many plates at once."""
+    return _NOT_ALPHABET_OR_NEWLINE.sub("", "\n".join(plate_numbers).upper()).split("\n")
+
+
+def _block_bounds(length: int, blocks: int) -> List[Tuple[int, int]]:
+    """Split `length` characters into `blocks` contiguous blocks of near equal size."""
+    edges = [round(i * length / blocks) for i in range(blocks + 1)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+class _LengthGroup:
+    """Every indexed plate of one normalized length, as sorted arrays plus one block index per block."""
+
+    def __init__(self, plates: np.ndarray, normalized: List[str], counts: np.ndarray, blocks: int,
+                 canonical: np.ndarray):
+        length = len(normalized[0])
+        normalized = np.asarray(normalized, dtype=f"S{length}")
+        order = np.argsort(normalized, kind="stable")
+        self.plates = plates[order]
+        self.normalized = normalized[order]
+        self.counts = counts[order]
+        self.raw = self.normalized.view(np.uint8).reshape(-1, length)
+        self.canonical = canonical[self.raw]
+        self.bounds = _block_bounds(length, blocks)
+        # Per block: the plates' block keys, sorted, and the plate positions in that order.
+        self.block_keys: List[Tuple[np.ndarray, np.ndarray]] = []
+        for start, end in self.bounds:
+            keys = np.zeros(len(self.plates), dtype=np.int64)
+            for column in range(start, end):
+                keys = keys * _BASE + self.canonical[:, column]
+            order = np.argsort(keys, kind="stable")
+            self.block_keys.append((keys[order], order))
+
+    def find(self, normalized: str) -> int:
+        """Position of an exact normalized plate, or -1."""
+        key = normalized.encode("ascii")
+        position = int(np.searchsorted(self.normalized, key))
+        if position < len(self.normalized) and self.normalized[position] == key:
+            return position
+        return -1
+
+
+class FuzzyPlateIndex:
+    """
+    Finds plates within a few edits of a possibly misread plate number.
+
+    Distances are weighted Levenshtein distances over normalized plates (see
+    `normalize_plate`): inserting, deleting or substituting a character costs 1,
+    except substituting a character for one it is commonly confused with
+    (`confusions`, e.g. O/0, I/1, B/8), which costs `confusion_cost`.
+
+    Lookups avoid comparing against every plate using the pigeonhole principle.
+    Each plate is split into `max_edits + 1` blocks and indexed by each block
+    after mapping confusable characters to one canonical character. A plate
+    within k edits of the query must have at least `blocks - k` of its blocks
+    appear unchanged in the query, shifted by at most k positions, so only
+    plates sharing enough blocks are scored, all at once with numpy.
+
+    Plates added after the build are kept in a small pending set that is
+    searched exhaustively and merged into the index once it grows. `scan`
+    searches a given set of plates the same way without indexing them.
+    """
+
+    def __init__(self, max_edits: int = 2, confusion_cost: float = 0.25,
+                 confusions: Sequence[str] = DEFAULT_CONFUSIONS, merge_threshold: int = 10_000):
+        self.max_edits = max_edits
+        self.blocks = max_edits + 1
+        self.confusion_cost = confusion_cost
+        self.merge_threshold = merge_threshold
+        self._canonical = np.zeros(256, dtype=np.uint8)
+        for code, char in enumerate(_ALPHABET, start=1):
+            self._canonical[ord(char)] = code
+        for group in confusions:
+            for char in group[1:]:
+                self._canonical[ord(char)] = self._canonical[ord(group[0])]
+        self._groups: Dict[int, _LengthGroup] = {}
+        self._pending: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, run_query: Callable[[str], ResultSet], table: str, **kwargs) -> "FuzzyPlateIndex":
+        """Build an index of every distinct plate in `table` using `run_query` (e.g. tools.execute_query)."""
+        index = cls(**kwargs)
+        rows = run_query(f"""
+        select plate_number, count(*) as reads
+        from `{table}`
+        group by plate_number;
+        """)
+        index._rebuild(dict(zip(rows.values("plate_number"), rows.values("reads"))))
+        logger.info(f"Built fuzzy plate index over {len(rows)} plates")
+        return index
+
+    @property
+    def size(self) -> int:
+        return sum(len(group.plates) for group in self._groups.values()) + len(self._pending)
+
+    def _rebuild(self, extra: Dict[str, int]) -> None:
+        counts: Dict[str, int] = {}
+        for group in self._groups.values():
+            counts.update(zip(group.plates.tolist(), group.counts.tolist()))
+        for plate, count in extra.items():
+            counts[plate] = counts.get(plate, 0) + count
+        plates = np.asarray(list(counts), dtype=object)
+        normalized = _normalize_plates(plates.tolist())
+        read_counts = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+        lengths = np.fromiter(map(len, normalized), dtype=np.int64, count=len(normalized))
+        groups = {}
+        for length in np.unique(lengths[lengths > 0]).tolist():
+            members = np.flatnonzero(lengths == length)
+            groups[length] = _LengthGroup(plates[members], [normalized[i] for i in members.tolist()],
+                                          read_counts[members], self.blocks, self._canonical)
+        self._groups = groups
+
+    def add_records(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Count new toll_records rows towards their plates, indexing plates not seen before."""
+        with self._lock:
+            for row in rows:
+                plate = row["plate_number"]
+                normalized = normalize_plate(plate)
+                group = self._groups.get(len(normalized))
+                position = group.find(normalized) if group is not None else -1
+                if position >= 0 and group.plates[position] == plate:
+                    group.counts[position] += 1
+                else:
+                    self._pending[plate] = self._pending.get(plate, 0) + 1
+            if len(self._pending) >= self.merge_threshold:
+                self._rebuild(self._pending)
+                self._pending = {}
+
+    def _codes(self, plates: Sequence[str]) -> np.ndarray:
+        return np.frombuffer("".join(plates).encode("ascii"), dtype=np.uint8).reshape(len(plates), -1)
+
+    def _distances(self, query: str, raw: np.ndarray) -> np.ndarray:
+        """Weighted edit distance from `query` to each row of plate character codes."""
+        query_raw = np.frombuffer(query.encode("ascii"), dtype=np.uint8)
+        # One row per plate position, so each step of the recurrence works on contiguous memory.
+        columns = np.ascontiguousarray(raw.T)
+        length, count = columns.shape
+        confusion = round(self.confusion_cost * _COST_SCALE)
+        previous = np.repeat(np.arange(length + 1, dtype=np.int32)[:, None] * _COST_SCALE, count, axis=1)
+        current = np.empty_like(previous)
+        for i, char in enumerate(query_raw.tolist(), start=1):
+            # Cost of substituting each possible character for this query character.
+            costs = np.where(self._canonical == self._canonical[char], confusion, _COST_SCALE).astype(np.int32)
+            costs[char] = 0
+            current[0] = i * _COST_SCALE
+            # Substitutions and deletions only depend on the previous row; insertions chain along this one.
+            np.minimum(previous[:-1] + costs[columns], previous[1:] + _COST_SCALE, out=current[1:])
+            for j in range(1, length + 1):
+                np.minimum(current[j], current[j - 1] + _COST_SCALE, out=current[j])
+            previous, current = current, previous
+        return previous[length] / _COST_SCALE
+
+    def _candidates(self, group: _LengthGroup, query: str, max_edits: int) -> np.ndarray:
+        """Positions in `group` of plates sharing at least `blocks - max_edits` blocks with the query."""
+        query_canonical = self._canonical[np.frombuffer(query.encode("ascii"), dtype=np.uint8)].tolist()
+        hits = []
+        for (start, end), (keys, order) in zip(group.bounds, group.block_keys):
+            # Each plate has one key per block, so distinct keys give disjoint plates.
+            block_keys = set()
+            for shift in range(-max_edits, max_edits + 1):
+                if start + shift < 0 or end + shift > len(query):
+                    continue
+                key = 0
+                for code in query_canonical[start + shift:end + shift]:
+                    key = key * _BASE + code
+                block_keys.add(key)
+            for key in block_keys:
+                low, high = np.searchsorted(keys, [key, key + 1])
+                hits.append(order[low:high])
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        positions = np.sort(np.concatenate(hits))
+        needed = len(group.bounds) - max_edits
+        if needed <= 1:
+            return positions[np.concatenate(([True], positions[1:] != positions[:-1]))]
+        # Runs of equal positions count the blocks each plate shares with the query.
+        run_starts = np.flatnonzero(np.concatenate(([True], positions[1:] != positions[:-1])))
+        run_lengths = np.diff(np.append(run_starts, len(positions)))
+        return positions[run_starts[run_lengths >= needed]]
+
+    def _query(self, plate_number: str, max_edits: float) -> str:
+        if max_edits > self.max_edits:
+            raise ValueError(f"max_edits must be at most {self.max_edits}")
+        return normalize_plate(plate_number)
+
+    def _score(self, query: str, plate_counts: Dict[str, int], whole_edits: int, plates: List[str],
+               distances: List[np.ndarray], counts: List[np.ndarray]) -> None:
+        """Score every plate in `plate_counts` of a length within `whole_edits` of the query."""
+        by_length: Dict[int, List[Tuple[str, str, int]]] = {}
+        for plate, count in plate_counts.items():
+            normalized = normalize_plate(plate)
+            if normalized and abs(len(normalized) - len(query)) <= whole_edits:
+                by_length.setdefault(len(normalized), []).append((plate, normalized, count))
+        for entries in by_length.values():
+            plates.extend(plate for plate, _, _ in entries)
+            distances.append(self._distances(query, self._codes([normalized for _, normalized, _ in entries])))
+            counts.append(np.asarray([count for _, _, count in entries], dtype=np.int64))
+
+    @staticmethod
+    def _rank(plates: List[str], distances: List[np.ndarray], counts: List[np.ndarray], max_edits: float,
+              limit: int) -> List[Dict[str, Any]]:
+        if not plates:
+            return []
+        distances = np.concatenate(distances)
+        counts = np.concatenate(counts)
+        within = np.flatnonzero(distances <= max_edits + 1e-6)
+        ranked = within[np.lexsort((-counts[within], distances[within]))][:limit]
+        return [
+            {"plate_number": plates[i], "distance": round(float(distances[i]), 2), "reads": int(counts[i])}
+            for i in ranked.tolist()
+        ]
+
+    def search(self, plate_number: str, max_edits: float = 1, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Plates within `max_edits` of `plate_number`, closest first, then most read.
+
+        Returns:
+            List[Dict[str, Any]]: Up to `limit` dictionaries with 'plate_number', 'distance' and 'reads'.
+        """
+        query = self._query(plate_number, max_edits)
+        if not query:
+            return []
+        # Cheaper edits only make distances smaller, so whole edits bound the candidate search.
+        whole_edits = int(max_edits)
+        plates: List[str] = []
+        distances: List[np.ndarray] = []
+        counts: List[np.ndarray] = []
+        with self._lock:
+            for length, group in self._groups.items():
+                if abs(length - len(query)) > whole_edits:
+                    continue
+                if length <= whole_edits:
+                    positions = np.arange(len(group.plates))
+                else:
+                    positions = self._candidates(group, query, whole_edits)
+                if positions.size:
+                    plates.extend(group.plates[positions].tolist())
+                    distances.append(self._distances(query, group.raw[positions]))
+                    counts.append(group.counts[positions])
+            self._score(query, self._pending, whole_edits, plates, distances, counts)
+        return self._rank(plates, distances, counts, max_edits, limit)
+
+    def scan(self, plate_counts: Dict[str, int], plate_number: str, max_edits: float = 1,
+             limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        `search` over `plate_counts` (plate number -> reads) rather than the index, scoring every plate.
+
+        Returns what `search` would on an index of exactly those plates, without building one.
+        """
+        query = self._query(plate_number, max_edits)
+        if not query:
+            return []
+        plates: List[str] = []
+        distances: List[np.ndarray] = []
+        counts: List[np.ndarray] = []
+        self._score(query, plate_counts, int(max_edits), plates, distances, counts)
+        return self._rank(plates, distances, counts, max_edits, limit)
@@ -0,0 +1,342 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Sequence
+import json
+import logging
+import hashlib
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# BigQuery streaming inserts are capped at 10 MB per request and recommended at ~500 rows.
+DEFAULT_CHUNK_ROWS = 500
+DEFAULT_CHUNK_BYTES = 9 * 1024 * 1024
+# Above this many rows, file-based load jobs are cheaper and faster than streaming inserts.
+LOAD_JOB_THRESHOLD = 100_000
+# BigQuery allows 1,500 load jobs per table per day, so load-job chunks are large:
+# 100M rows take 200 jobs.
+LOAD_JOB_CHUNK_ROWS = 500_000
+LOAD_JOB_CHUNK_BYTES = 1024 * 1024 * 1024
+
+
+class IngestError(Exception):
+    """Raised when a chunk could not be written after all retries."""
+
+
+@dataclass
+class IngestResult:
+    rows: int
+    chunks: int
+    skipped_chunks: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _json_safe(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()}
+
+
+def _estimate_row_bytes(row: Dict[str, Any]) -> int:
+    return len(json.dumps(row, default=str))
+
+
+def chunk_rows(rows: Iterable[Dict[str, Any]], max_rows: int = DEFAULT_CHUNK_ROWS,
+               max_bytes: int = DEFAULT_CHUNK_BYTES) -> Iterator[List[Dict[str, Any]]]:
+    """Split a stream of rows into chunks capped by row count and estimated JSON size."""
+    chunk, chunk_bytes = [], 0
+    for row in rows:
+        row_bytes = _estimate_row_bytes(row)
+        if chunk and (len(chunk) >= max_rows or chunk_bytes + row_bytes > max_bytes):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(row)
+        chunk_bytes += row_bytes
+    if chunk:
+        yield chunk
+
+
+class IngestSink:
+    """Destination for chunks of rows. `write` must be safe to call from several threads."""
+
+    def write(self, chunk_id: int, rows: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+
+class BigQueryStreamingSink(IngestSink):
+    """Writes chunks with the streaming insert API."""
+
+    def __init__(self, client, table_ref):
+        # Look the table up once rather than on every chunk.
+        self.client = client
+        self.table = client.get_table(table_ref)
+        # Insert ids of rows without a record_id are unique to this run, so that
+        # BigQuery never drops new rows as duplicates of an earlier run's.
+        self.run_id = uuid.uuid4().hex
+
+    def write(self, chunk_id: int, rows: List[Dict[str, Any]]) -> None:
+        # Insert ids stable across retries let BigQuery de-duplicate a chunk that is retried.
+        row_ids = [row.get("record_id") or f"{self.run_id}-{chunk_id}-{i}" for i, row in enumerate(rows)]
+        errors = self.client.insert_rows(self.table, rows, row_ids=row_ids)
+        if errors:
+            raise IngestError(f"Chunk {chunk_id} was rejected: {errors[:3]}")
+
+
+class BigQueryLoadJobSink(IngestSink):
+    """
+    Writes each chunk as a file-based load job, which suits large backfills.
+
+    Chunks are staged as NDJSON in a temporary file, spilling to disk past a
+    few megabytes, rather than held as one JSON document in memory. Each
+    chunk's load job gets a deterministic id derived from `source_fingerprint`,
+    the table and the chunk id, so a retry or resumed run whose earlier job
+    had in fact committed finds that job instead of appending the chunk
+    again. Loading the same input into the same table twice is therefore a
+    no-op. Without a fingerprint, job ids are only stable within one run.
+    """
+
+    def __init__(self, client, table_ref, schema, source_fingerprint: Optional[str] = None,
+                 location: Optional[str] = None):
+        from google.cloud import bigquery
+
+        self.client = client
+        self.table_ref = table_ref
+        self.location = location
+        self.job_config = bigquery.LoadJobConfig(
+            schema=schema,
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        key = f"{table_ref.project}.{table_ref.dataset_id}.{table_ref.table_id}:{source_fingerprint or uuid.uuid4().hex}"
+        self.job_prefix = "ingest_" + hashlib.sha256(key.encode()).hexdigest()[:32]
+
+    def write(self, chunk_id: int, rows: List[Dict[str, Any]]) -> None:
+        from google.api_core.exceptions import Conflict
+
+        # A job that failed outright keeps its id, so each attempt steps past
+        # the chunk's failed jobs to a job still running or not yet created.
+        attempt = 0
+        while True:
+            job_id = f"{self.job_prefix}_{chunk_id:08d}_{attempt}"
+            try:
+                job = self._start_job(job_id, rows)
+                started = True
+            except Conflict:
+                job = self.client.get_job(job_id, project=self.table_ref.project, location=self.location)
+                started = False
+            try:
+                job.result()
+                return
+            except Exception:
+                # Timeouts, transient errors and jobs this attempt started are retried by the caller.
+                if started or not (job.done() and job.error_result):
+                    raise
+            attempt += 1
+
+    def _start_job(self, job_id: str, rows: List[Dict[str, Any]]):
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as staged:
+            for row in rows:
+                staged.write(json.dumps(_json_safe(row)).encode())
+                staged.write(b"\n")
+            staged.seek(0)
+            return self.client.load_table_from_file(
+                staged, self.table_ref, job_id=job_id, location=self.location, job_config=self.job_config
+            )
+
+
+class ParquetSink(IngestSink):
+    """
+    Local stand-in sink that writes one Parquet file per chunk.
+
+    Files are named after the chunk id and written atomically, so a retried or
+    resumed chunk overwrites rather than duplicates. The output directory can
+    be served directly by the duckdb query backend. With `partition_by_date`,
+    rows go to hive-style `date=YYYY-MM-DD` directories by the UTC day of
+    their timestamp, like a day-partitioned BigQuery table, so the backend can
+    skip the days a query does not cover.
+    """
+
+    def __init__(self, directory: str, partition_by_date: bool = True):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.partition_by_date = partition_by_date
+
+    def write(self, chunk_id: int, rows: List[Dict[str, Any]]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        partitions: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            timestamp = row.get("timestamp") if self.partition_by_date else None
+            if timestamp is None:
+                directory = self.directory
+            else:
+                if timestamp.tzinfo is not None:
+                    timestamp = timestamp.astimezone(timezone.utc)
+                directory = os.path.join(self.directory, f"date={timestamp.date().isoformat()}")
+            partitions.setdefault(directory, []).append(row)
+        for directory, partition_rows in partitions.items():
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"chunk-{chunk_id:08d}.parquet")
+            pq.write_table(pa.Table.from_pylist(partition_rows), path + ".tmp")
+            os.replace(path + ".tmp", path)
+
+
+def fingerprint_rows(rows: Sequence[Dict[str, Any]]) -> str:
+    """A digest of in-memory rows, to pass as an ingest's `source_fingerprint`."""
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(json.dumps(row, sort_keys=True, default=str).encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+class IngestCheckpoint:
+    """
+    Records completed chunk ids in a JSON file so an interrupted ingest can resume.
+
+    Progress is stored as a watermark (every chunk below it is done) plus the few
+    out-of-order chunks completed above it, so the file stays small however long
+    the ingest runs. The checkpoint also stores the fingerprint of the input it
+    was written for, and refuses to resume a different input, whose chunks
+    would otherwise be skipped.
+    """
+
+    def __init__(self, path: str, fingerprint: Optional[str] = None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self.watermark = 0
+        self.completed = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state.get("fingerprint") != fingerprint:
+                raise IngestError(
+                    f"Checkpoint {path} was written for a different input "
+                    f"(fingerprint {state.get('fingerprint')!r}, not {fingerprint!r}); "
+                    f"remove it to start the ingest over"
+                )
+            self.watermark = state["watermark"]
+            self.completed = set(state["completed_chunks"])
+
+    def is_done(self, chunk_id: int) -> bool:
+        return chunk_id < self.watermark or chunk_id in self.completed
+
+    def mark_done(self, chunk_id: int) -> None:
+        with self._lock:
+            self.completed.add(chunk_id)
+            while self.watermark in self.completed:
+                self.completed.remove(self.watermark)
+                self.watermark += 1
+            with open(self.path + ".tmp", "w") as f:
+                json.dump({"fingerprint": self.fingerprint, "watermark": self.watermark,
+                           "completed_chunks": sorted(self.completed)}, f)
+            os.replace(self.path + ".tmp", self.path)
+
+
+def _write_with_retries(sink: IngestSink, chunk_id: int, rows: List[Dict[str, Any]],
+                        max_retries: int, backoff_seconds: float) -> None:
+    for attempt in range(max_retries + 1):
+        try:
+            sink.write(chunk_id, rows)
+            return
+        except Exception as e:
+            if attempt == max_retries:
+                raise IngestError(f"Chunk {chunk_id} failed after {attempt + 1} attempts: {e}") from e
+            # Exponential backoff with jitter so concurrent workers do not retry in lockstep.
+            delay = backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+            logger.warning(f"Chunk {chunk_id} failed ({e}); retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+
+def ingest_rows(
+    rows: Iterable[Dict[str, Any]],
+    sink: IngestSink,
+    chunk_size: int = DEFAULT_CHUNK_ROWS,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    workers: int = 8,
+    max_retries: int = 5,
+    backoff_seconds: float = 0.5,
+    checkpoint_path: Optional[str] = None,
+    listeners: Sequence[Callable[[List[Dict[str, Any]]], None]] = (),
+    source_fingerprint: Optional[str] = None,
+) -> IngestResult:
+    """
+    Write rows to a sink in size-capped chunks, concurrently, with retries and checkpointing.
+
+    Chunk ids are assigned in input order, so resuming from a checkpoint requires
+    replaying the same rows in the same order; chunks already recorded in the
+    checkpoint are skipped. Pass a `source_fingerprint` identifying the input
+    (e.g. `fingerprint_rows`, or the generator's seed and size) so that a
+    checkpoint is never resumed against a different one. At most `2 * workers` chunks are in flight at once,
+    which keeps memory bounded for arbitrarily long row streams.
+
+    Args:
+        rows: The rows to write, as dictionaries keyed by column name.
+        sink: Where to write each chunk.
+        chunk_size: Maximum rows per chunk.
+        chunk_bytes: Maximum estimated JSON bytes per chunk.
+        workers: Number of chunks uploaded concurrently.
+        max_retries: Retries per chunk before the ingest fails.
+        backoff_seconds: Base delay for exponential backoff between retries.
+        checkpoint_path: Optional JSON file used to record and resume progress.
+        listeners: Callables invoked with each chunk once it has been written,
+            e.g. to keep in-process indexes up to date.
+        source_fingerprint: Identifies the input; stored in and checked against the checkpoint.
+
+    Returns:
+        IngestResult: Row and chunk counts for this run along with its throughput.
+    """
+    checkpoint = IngestCheckpoint(checkpoint_path, source_fingerprint) if checkpoint_path else None
+    started = time.perf_counter()
+    written_rows = written_chunks = skipped_chunks = 0
+
+    in_flight = {}
+
+    def on_done(future) -> None:
+        nonlocal written_rows, written_chunks
+        chunk_id, chunk = in_flight.pop(future)
+        future.result()
+        if checkpoint:
+            checkpoint.mark_done(chunk_id)
+        for listener in listeners:
+            listener(chunk)
+        written_rows += len(chunk)
+        written_chunks += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for chunk_id, chunk in enumerate(chunk_rows(rows, chunk_size, chunk_bytes)):
+                if checkpoint and checkpoint.is_done(chunk_id):
+                    skipped_chunks += 1
+                    continue
+                while len(in_flight) >= 2 * workers:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        on_done(future)
+                future = executor.submit(_write_with_retries, sink, chunk_id, chunk, max_retries, backoff_seconds)
+                in_flight[future] = (chunk_id, chunk)
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    on_done(future)
+        except BaseException:
+            for future in in_flight:
+                future.cancel()
+            raise
+
+    result = IngestResult(written_rows, written_chunks, skipped_chunks, time.perf_counter() - started)
+    logger.info(
+        f"Ingested {result.rows} rows in {result.chunks} chunks "
+        f"({result.skipped_chunks} resumed from checkpoint) at {result.rows_per_second:.0f} rows/s"
+    )
+    return result
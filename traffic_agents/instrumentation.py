@@ -0,0 +1,335 @@
+"""
+Lightweight spans and counters for the tool, query and agent hot paths.
+
+A span times one unit of work (a tool call, a backend query, an agent turn)
+and carries attributes such as rows returned or payload size. Spans nest via
+a context variable, so the queries a tool runs are children of the tool span,
+including across `asyncio.to_thread`. Finished spans go to the configured
+exporters; counters are aggregated in memory and are always kept, even for
+traces that sampling drops.
+
+    with span("query", kind="query", backend="duckdb") as s:
+        rows = run()
+        s.set(rows=len(rows))
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Any, Callable, Iterator, Optional, Sequence, Tuple
+import functools
+import json
+import logging
+import random
+import secrets
+import threading
+import time
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    name: str
+    kind: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_time: float
+    duration_ms: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    sampled: bool = True
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set(self, **attributes: Any) -> None:
+        """Add or overwrite attributes on the span."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = asdict(self)
+        del record["_started"], record["sampled"]
+        return record
+
+
+class SpanExporter:
+    """Receives every finished, sampled span."""
+
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+
+class InMemoryExporter(SpanExporter):
+    """Keeps the most recent `max_spans` spans, for inspection in tests, notebooks and benchmarks."""
+
+    def __init__(self, max_spans: int = 1000):
+        self._spans: "deque[Dict[str, Any]]" = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span.to_dict())
+
+    def spans(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [s for s in self._spans if kind is None or s["kind"] == kind]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class JsonLinesExporter(SpanExporter):
+    """Appends one JSON object per span to a file, kept open and line buffered."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class Instrumentation:
+    """
+    Records spans and counters and hands finished spans to exporters.
+
+    Sampling is decided once per trace, at its root span, so a sampled trace
+    is always complete. `sample_rate` of 1.0 keeps everything and 0.0 keeps
+    only the counters. `payload_sample_rate` is the fraction of sampled tool
+    spans that also record their result's payload size.
+    """
+
+    def __init__(self, exporters: Sequence[SpanExporter] = (), sample_rate: float = 1.0, enabled: bool = True,
+                 payload_sample_rate: float = 1.0, max_open_seconds: float = 3600.0):
+        self.exporters = list(exporters)
+        self.sample_rate = sample_rate
+        self.enabled = enabled
+        self.payload_sample_rate = payload_sample_rate
+        self.max_open_seconds = max_open_seconds
+        self._current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+        self._counters: Dict[str, float] = {}
+        self._counter_lock = threading.Lock()
+        # Spans that start and end in different callbacks, such as agent turns, as a stack
+        # per key, so an agent re-entered before its previous turn ended gets its own span.
+        self._open: Dict[Tuple, List[Tuple[Span, Any, Optional[Span]]]] = {}
+        self._open_lock = threading.Lock()
+
+    def current_span(self) -> Optional[Span]:
+        return self._current.get()
+
+    def start_span(self, name: str, kind: str = "internal", **attributes: Any) -> Span:
+        parent = self._current.get()
+        if parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        else:
+            trace_id, parent_id = secrets.token_hex(8), None
+            sampled = self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        return Span(name, kind, trace_id, secrets.token_hex(8), parent_id, time.time(),
+                    attributes=attributes, sampled=sampled)
+
+    def end_span(self, span: Span) -> None:
+        span.duration_ms = round((time.perf_counter() - span._started) * 1000, 3)
+        self.increment(f"{span.kind}.{span.name}.count")
+        self.increment(f"{span.kind}.{span.name}.duration_ms", span.duration_ms)
+        if span.attributes.get("error"):
+            self.increment(f"{span.kind}.{span.name}.errors")
+        if not span.sampled:
+            return
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logger.warning(f"Span exporter {type(exporter).__name__} failed: {e}")
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes: Any) -> Iterator[Span]:
+        """Time the enclosed block as a child of the current span."""
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+        span = self.start_span(name, kind, **attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            self._current.reset(token)
+            self.end_span(span)
+
+    def set_attributes(self, **attributes: Any) -> None:
+        """Add attributes to the current span, if any; lets callees annotate their caller's span."""
+        span = self._current.get()
+        if span is not None:
+            span.set(**attributes)
+
+    def begin(self, key: Tuple, name: str, kind: str = "internal", **attributes: Any) -> None:
+        """Open a span under `key`, for work whose start and end are seen by different callbacks."""
+        if not self.enabled:
+            return
+        span = self.start_span(name, kind, **attributes)
+        parent = self._current.get()
+        deadline = time.perf_counter() - self.max_open_seconds
+        with self._open_lock:
+            abandoned = self._take_open(lambda open_span: open_span._started < deadline)
+            self._open.setdefault(key, []).append((span, self._current.set(span), parent))
+        self._abandon(abandoned)
+
+    def finish(self, key: Tuple, **attributes: Any) -> None:
+        """Close the latest span opened by `begin` under `key`, and any of its descendants left open."""
+        with self._open_lock:
+            stack = self._open.get(key)
+            if not stack:
+                return
+            span, token, parent = stack.pop()
+            if not stack:
+                del self._open[key]
+            # A descendant still open raised, or was cancelled, without finishing.
+            descendants = {span.span_id}
+
+            def is_descendant(open_span: Span) -> bool:
+                if open_span.parent_id not in descendants:
+                    return False
+                descendants.add(open_span.span_id)
+                return True
+
+            abandoned = self._take_open(is_descendant)
+        self._abandon(abandoned)
+        span.set(**attributes)
+        try:
+            self._current.reset(token)
+        except ValueError:
+            # Ended from a different context than it started in.
+            self._current.set(parent)
+        self.end_span(span)
+
+    def _take_open(self, abandoned: Callable[[Span], bool]) -> List[Span]:
+        """Remove and return the open spans for which `abandoned(span)` is true, testing oldest first."""
+        taken = []
+        opened = sorted(((key, entry) for key, stack in self._open.items() for entry in stack),
+                        key=lambda item: item[1][0]._started)
+        for key, entry in opened:
+            if abandoned(entry[0]):
+                stack = self._open[key]
+                stack.remove(entry)
+                if not stack:
+                    del self._open[key]
+                taken.append(entry[0])
+        return taken
+
+    def _abandon(self, spans: List[Span]) -> None:
+        for span in spans:
+            logger.warning(f"Ending {span.kind} span {span.name} that was never finished")
+            span.set(error="abandoned: never finished")
+            self.end_span(span)
+
+    def open_spans(self) -> int:
+        with self._open_lock:
+            return sum(len(stack) for stack in self._open.values())
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._counter_lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def counters(self) -> Dict[str, float]:
+        with self._counter_lock:
+            return dict(self._counters)
+
+    def reset_counters(self) -> None:
+        with self._counter_lock:
+            self._counters.clear()
+
+
+class _NoopSpan:
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def payload_size(value: Any) -> int:
+    """Size in bytes of `value` serialized as JSON, as sent to the model."""
+    return len(json.dumps(value, default=str, separators=(",", ":")))
+
+
+def _default_exporters() -> List[SpanExporter]:
+    exporters: List[SpanExporter] = [InMemoryExporter(config.instrumentation_buffer_size)]
+    if config.instrumentation_jsonl_path:
+        exporters.append(JsonLinesExporter(config.instrumentation_jsonl_path))
+    return exporters
+
+
+instrumentation = Instrumentation(
+    exporters=_default_exporters(),
+    sample_rate=config.instrumentation_sample_rate,
+    enabled=config.instrumentation_enabled,
+    payload_sample_rate=config.instrumentation_payload_sample_rate,
+    max_open_seconds=config.instrumentation_max_open_seconds,
+)
+span = instrumentation.span
+set_attributes = instrumentation.set_attributes
+increment = instrumentation.increment
+
+
+def recent_spans(kind: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Spans held by the in-memory exporter, oldest first."""
+    for exporter in instrumentation.exporters:
+        if isinstance(exporter, InMemoryExporter):
+            return exporter.spans(kind)
+    return []
+
+
+def _result_count(result: Any) -> Optional[int]:
+    """Number of items in a tool result: a list, or the first list in a dict (compact payloads count rows)."""
+    if isinstance(result, dict):
+        for value in result.values():
+            if isinstance(value, dict) and isinstance(value.get("rows"), list):
+                return len(value["rows"])
+            if isinstance(value, list):
+                return len(value)
+        return None
+    return len(result) if isinstance(result, list) else None
+
+
+def traced_tool(func):
+    """Record a `tool` span for each call of `func`, with its result count and, sampled, its payload size."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(func.__name__, kind="tool") as s:
+            result = func(*args, **kwargs)
+            if isinstance(s, Span) and s.sampled:
+                s.set(results=_result_count(result))
+                # Serializing the result costs about as much as sending it, so only a sample is measured.
+                rate = instrumentation.payload_sample_rate
+                if rate >= 1.0 or random.random() < rate:
+                    s.set(payload_bytes=payload_size(result))
+            return result
+    return wrapper
+
+
+def before_agent_callback(callback_context) -> None:
+    """ADK `before_agent_callback` that opens a span for the agent's turn."""
+    key = (callback_context.invocation_id, callback_context.agent_name)
+    instrumentation.begin(key, callback_context.agent_name, kind="agent",
+                          invocation_id=callback_context.invocation_id)
+    return None
+
+
+def after_agent_callback(callback_context) -> None:
+    """ADK `after_agent_callback` that closes the span opened by `before_agent_callback`."""
+    instrumentation.finish((callback_context.invocation_id, callback_context.agent_name))
+    return None
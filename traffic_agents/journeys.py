@@ -0,0 +1,92 @@
+from typing import List, Dict, Any, Optional, Sequence
+import numpy as np
+from .columnar import from_micros
+
+
+def _round(value: float, digits: int = 1) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def reconstruct_journeys(plate_numbers: Sequence[str], toll_point_ids: Sequence[str],
+                         timestamps_micros: Sequence[int], gap_seconds: float,
+                         positions_km: Dict[str, float]) -> List[Dict[str, Any]]:
+    """
+    Split toll reads into journeys and summarise each one.
+
+    The reads must be ordered by plate number, then time. A new journey starts
+    at a plate's first read and whenever more than `gap_seconds` pass between
+    two reads. Within a journey, consecutive reads at the same toll point
+    count as dwell time there; reads at different points form a hop, whose
+    distance comes from the toll points' positions along the road
+    (`positions_km`) and gives an implied speed. Hops involving a toll point
+    without a known position have no distance or speed.
+
+    Returns:
+        List[Dict[str, Any]]: One summary per journey, ordered like the reads.
+    """
+    count = len(timestamps_micros)
+    if count == 0:
+        return []
+
+    plates = np.asarray(plate_numbers, dtype=object)
+    timestamps = np.asarray(timestamps_micros, dtype=np.int64)
+    point_names, point_codes = np.unique(np.asarray(toll_point_ids, dtype=object), return_inverse=True)
+    positions = np.array([positions_km.get(name, np.nan) for name in point_names], dtype=float)[point_codes]
+
+    # Quantities for each step from read i to read i + 1.
+    step_seconds = np.diff(timestamps) / 1_000_000
+    same_plate = plates[1:] == plates[:-1]
+    same_point = point_codes[1:] == point_codes[:-1]
+    journey_start = np.concatenate(([True], ~same_plate | (step_seconds > gap_seconds)))
+    within_journey = ~journey_start[1:]
+    is_hop = within_journey & ~same_point
+    is_dwell = within_journey & same_point
+    step_km = np.abs(np.diff(positions))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        step_kmh = np.where(step_seconds > 0, step_km / (step_seconds / 3600), np.nan)
+
+    starts = np.flatnonzero(journey_start)
+    ends = np.append(starts[1:], count)
+    journeys = []
+    previous_end: Dict[str, int] = {}
+    for first, end in zip(starts.tolist(), ends.tolist()):
+        last = end - 1
+        plate = plates[first]
+        steps = slice(first, last)
+        hops = np.flatnonzero(is_hop[steps]) + first
+        hop_km = step_km[hops]
+        hop_seconds = step_seconds[hops]
+        known = ~np.isnan(hop_km)
+        moving_seconds = hop_seconds[known].sum()
+        distance_km = hop_km[known].sum()
+        speeds = step_kmh[hops]
+        speeds = speeds[~np.isnan(speeds)]
+
+        route = [point_names[point_codes[first]]] + [point_names[point_codes[i + 1]] for i in hops.tolist()]
+        gap_before = int(timestamps[first] - previous_end[plate]) / 1_000_000 if plate in previous_end else None
+        previous_end[plate] = timestamps[last]
+        journeys.append({
+            "plate_number": plate,
+            "start_time": from_micros(int(timestamps[first])).isoformat(),
+            "end_time": from_micros(int(timestamps[last])).isoformat(),
+            "duration_seconds": round(int(timestamps[last] - timestamps[first]) / 1_000_000, 1),
+            "reads": end - first,
+            "route": route,
+            "dwell_seconds": round(float(step_seconds[steps][is_dwell[steps]].sum()), 1),
+            "gap_before_seconds": None if gap_before is None else round(gap_before, 1),
+            "distance_km": round(float(distance_km), 2),
+            "mean_speed_kmh": _round(distance_km / (moving_seconds / 3600)) if moving_seconds > 0 else None,
+            "max_speed_kmh": _round(speeds.max()) if speeds.size else None,
+            "hops": [
+                {
+                    "from_toll_point": point_names[point_codes[i]],
+                    "to_toll_point": point_names[point_codes[i + 1]],
+                    "departed": from_micros(int(timestamps[i])).isoformat(),
+                    "travel_seconds": round(float(step_seconds[i]), 1),
+                    "distance_km": _round(step_km[i], 2),
+                    "speed_kmh": _round(step_kmh[i]),
+                }
+                for i in hops.tolist()
+            ],
+        })
+    return journeys
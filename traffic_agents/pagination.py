@@ -0,0 +1,88 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import islice
+from typing import List, Dict, Any, Iterator, Optional, Sequence
+import secrets
+import threading
+import time
+
+
+@dataclass
+class _OpenCursor:
+    rows: Iterator[Dict[str, Any]]
+    columns: Optional[Sequence[str]]
+    expires_at: float
+    lock: threading.Lock
+    # Row read ahead of the previous page to detect that this page exists.
+    pending: Optional[Dict[str, Any]] = None
+
+
+def _project(row: Dict[str, Any], columns: Optional[Sequence[str]]) -> Dict[str, Any]:
+    return row if columns is None else {column: row[column] for column in columns}
+
+
+class ResultPager:
+    """
+    Serves query results one page at a time from the underlying row iterator.
+
+    The first page is read straight from a fresh iterator. If rows remain, the
+    iterator is parked under an opaque cursor token and later pages continue
+    reading from it, so the query is never re-run and at most one page is held
+    in memory per call. Cursors are process-local, expire after `ttl` seconds
+    of inactivity, and at most `max_open` are kept (least recently used first
+    out). Closing a cursor closes its iterator, releasing any backend cursor.
+    """
+
+    def __init__(self, max_open: int = 128, ttl: float = 600.0):
+        self.max_open = max_open
+        self.ttl = ttl
+        self._cursors: "OrderedDict[str, _OpenCursor]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def first_page(self, rows: Iterator[Dict[str, Any]], page_size: int,
+                   columns: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Read the first page of `rows`, returning {'records': [...], 'next_cursor': token or None}."""
+        return self._read_page(_OpenCursor(iter(rows), columns, 0.0, threading.Lock()), page_size, None)
+
+    def next_page(self, cursor: str, page_size: int) -> Dict[str, Any]:
+        """Read the page after `cursor`."""
+        with self._lock:
+            self._expire()
+            state = self._cursors.pop(cursor, None)
+        if state is None:
+            raise ValueError(f"Unknown or expired cursor '{cursor}'; re-run the query without a cursor.")
+        return self._read_page(state, page_size, cursor)
+
+    def _read_page(self, state: _OpenCursor, page_size: int, cursor: Optional[str]) -> Dict[str, Any]:
+        with state.lock:
+            # Read one row past the page to learn whether another page exists.
+            rows = [state.pending] if state.pending is not None else []
+            rows.extend(islice(state.rows, page_size + 1 - len(rows)))
+            if len(rows) <= page_size:
+                _close(state.rows)
+                return {"records": [_project(row, state.columns) for row in rows], "next_cursor": None}
+            state.pending = rows[-1]
+            state.expires_at = time.monotonic() + self.ttl
+
+        cursor = cursor or secrets.token_urlsafe(16)
+        with self._lock:
+            self._cursors[cursor] = state
+            while len(self._cursors) > self.max_open:
+                _, evicted = self._cursors.popitem(last=False)
+                _close(evicted.rows)
+        return {"records": [_project(row, state.columns) for row in rows[:-1]], "next_cursor": cursor}
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for cursor in [c for c, state in self._cursors.items() if state.expires_at <= now]:
+            _close(self._cursors.pop(cursor).rows)
+
+    def open_cursors(self) -> int:
+        with self._lock:
+            return len(self._cursors)
+
+
+def _close(rows: Iterator[Dict[str, Any]]) -> None:
+    close = getattr(rows, "close", None)
+    if close is not None:
+        close()
@@ -0,0 +1,137 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
+import logging
+import threading
+from .columnar import StringHeap, ValueDictionary, from_micros, to_micros
+from .resultset import ResultSet, as_rows, column_values, timestamp_micros
+
+logger = logging.getLogger(__name__)
+
+
+class _PlateReads:
+    """Time-sorted reads for one plate, stored column-wise; record ids and image URLs as `StringHeap` references."""
+
+    __slots__ = ("timestamps", "toll_points", "vehicle_types", "record_ids", "image_urls")
+
+    def __init__(self):
+        self.timestamps = array("q")
+        self.toll_points = array("H")
+        self.vehicle_types = array("H")
+        self.record_ids = array("Q")
+        self.image_urls = array("Q")
+
+    def insert(self, timestamp: int, toll_point: int, vehicle_type: int, record_id: int, image_url: int):
+        if not self.timestamps or timestamp >= self.timestamps[-1]:
+            # Reads almost always arrive in time order, making this an append.
+            self.timestamps.append(timestamp)
+            self.toll_points.append(toll_point)
+            self.vehicle_types.append(vehicle_type)
+            self.record_ids.append(record_id)
+            self.image_urls.append(image_url)
+            return
+        position = bisect_right(self.timestamps, timestamp)
+        self.timestamps.insert(position, timestamp)
+        self.toll_points.insert(position, toll_point)
+        self.vehicle_types.insert(position, vehicle_type)
+        self.record_ids.insert(position, record_id)
+        self.image_urls.insert(position, image_url)
+
+
+class PlateIndex:
+    """
+    In-process index from plate number to its time-sorted toll reads.
+
+    Once built from the backing table it is authoritative: a plate with no
+    entry has no reads, so lookups never need to fall back to the warehouse.
+    New reads are folded in with `add_records`. Lookups are O(log n) in the
+    number of reads for the plate, plus the size of the result.
+    """
+
+    def __init__(self):
+        self._plates: Dict[str, _PlateReads] = {}
+        self._toll_points = ValueDictionary()
+        self._vehicle_types = ValueDictionary()
+        self._strings = StringHeap()
+        self._lock = threading.Lock()
+        self.size = 0
+
+    @classmethod
+    def build(cls, run_query: Callable[[str], ResultSet], table: str) -> "PlateIndex":
+        """Build an index from every row of `table` using `run_query` (e.g. tools.execute_query)."""
+        index = cls()
+        # Fetch timestamps as integers and in index order, so every insert is an append.
+        rows = run_query(f"""
+        select record_id, plate_number, toll_point_id, unix_micros(timestamp) as timestamp_micros,
+          vehicle_type, image_url
+        from `{table}`
+        order by plate_number, timestamp;
+        """)
+        index.add_records(rows)
+        logger.info(f"Built plate index with {index.size} reads for {len(index._plates)} plates")
+        return index
+
+    def add_records(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Add toll_records rows, a `ResultSet` or row dicts, to the index.
+
+        Rows carry either a `timestamp` datetime or a precomputed `timestamp_micros`.
+        """
+        rows = as_rows(rows)
+        columns = zip(
+            column_values(rows, "plate_number"),
+            timestamp_micros(rows),
+            column_values(rows, "toll_point_id"),
+            column_values(rows, "vehicle_type", None),
+            column_values(rows, "record_id"),
+            column_values(rows, "image_url", None),
+        )
+        plates = self._plates
+        encode_toll_point = self._toll_points.encode
+        encode_vehicle_type = self._vehicle_types.encode
+        add_string = self._strings.add
+        with self._lock:
+            for plate_number, timestamp, toll_point_id, vehicle_type, record_id, image_url in columns:
+                reads = plates.get(plate_number)
+                if reads is None:
+                    reads = plates[plate_number] = _PlateReads()
+                reads.insert(timestamp, encode_toll_point(toll_point_id), encode_vehicle_type(vehicle_type),
+                             add_string(record_id), add_string(image_url))
+                self.size += 1
+
+    def lookup(self, plate_number: str, start: Optional[datetime] = None,
+               end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Return the reads for `plate_number` between `start` and `end` inclusive, oldest first."""
+        with self._lock:
+            reads = self._plates.get(plate_number)
+            if reads is None:
+                return []
+            lo = bisect_left(reads.timestamps, to_micros(start)) if start else 0
+            hi = bisect_right(reads.timestamps, to_micros(end)) if end else len(reads.timestamps)
+            string = self._strings.get
+            return [
+                {
+                    "record_id": string(reads.record_ids[i]),
+                    "plate_number": plate_number,
+                    "toll_point_id": self._toll_points.values[reads.toll_points[i]],
+                    "timestamp": from_micros(reads.timestamps[i]),
+                    "vehicle_type": self._vehicle_types.values[reads.vehicle_types[i]],
+                    "image_url": string(reads.image_urls[i]),
+                }
+                for i in range(lo, hi)
+            ]
+
+    def trace(self, plate_number: str, start: Optional[datetime] = None,
+              end: Optional[datetime] = None) -> Tuple[List[int], List[str]]:
+        """Timestamps (microseconds) and toll points of `plate_number`'s reads in the window, oldest first."""
+        with self._lock:
+            reads = self._plates.get(plate_number)
+            if reads is None:
+                return [], []
+            lo = bisect_left(reads.timestamps, to_micros(start)) if start else 0
+            hi = bisect_right(reads.timestamps, to_micros(end)) if end else len(reads.timestamps)
+            return reads.timestamps[lo:hi].tolist(), [self._toll_points.values[c] for c in reads.toll_points[lo:hi]]
+
+    def __contains__(self, plate_number: str) -> bool:
+        return plate_number in self._plates
@@ -1,38 +1,116 @@
+from typing import Any, Callable, Dict, Sequence
 import datetime
+import inspect
 from .config import config
 
 COMPANY_NAME = config.COMPANY_NAME
 
+# What the researcher and the planner are told about each database tool. The prompts list
+# only the tools the researcher is actually given; a tool without an entry, e.g. a new
+# tools.yaml entry, is described by the first line of its docstring.
+RESEARCH_TOOL_NOTES: Dict[str, str] = {
+    "get_toll_records_by_plate_number": "Get toll records by license plate to identify vehicle movements relevant to the incident.",
+    "get_toll_records_by_plate_numbers": "Get toll records for several license plates in one call. Prefer this over repeated single-plate calls when several vehicles are involved.",
+    "get_vehicle_count_by_type": "Get the count of vehicles by type within a specified time interval to understand traffic context around the incident window.",
+    "get_vehicle_count_by_toll_point": "Get the count of vehicles by toll point and type within a specified time interval to see where traffic was concentrated around the incident.",
+    "get_distinct_vehicle_count": "Get how many distinct vehicles were read within a time interval, in total and per toll point. Counts may be estimates; the result says so and gives the error.",
+    "get_frequent_plate_numbers": "Get the plates read most often within a time interval, optionally at given toll points, e.g. to spot regular commuters or fleet vehicles. Counts may be estimates with a stated maximum overcount.",
+    "find_similar_plate_numbers": "Find the plates a possibly misread or partially reported plate number could really be (e.g. O/0, I/1, B/8 confusions or a missed character), ranked by closeness. Use this when a plate has no records or a witness is unsure of it.",
+    "get_vehicle_journeys": "Get each vehicle's journeys (route, timing, dwell and implied speed between toll points) for one or more plates. Prefer this over raw toll records when you need to know where a vehicle went and how fast.",
+    "find_witness_vehicles": "Find vehicles that passed the same toll points as a target vehicle within a time window, or every vehicle at given toll points during an incident window. Use this to identify potential witnesses or accomplices.",
+    "get_anomaly_alerts": "Get alerts from the live anomaly detector: impossible travel times, likely cloned plates and convoys of vehicles travelling together. Filter by kind, plate or start time.",
+    "get_plate_read_summary": "Get when a plate was first and last read, how many times and at how many toll points. Use this for a quick presence check before fetching full records.",
+}
+
+PLAN_TOOL_NOTES: Dict[str, str] = {
+    "get_toll_records_by_plate_number": "`get_toll_records_by_plate_number(plate_number: string)`: Use this to retrieve toll records for a specific license plate to verify presence and movement near the incident time.",
+    "get_toll_records_by_plate_numbers": "`get_toll_records_by_plate_numbers(plate_numbers: list[string])`: Use this to retrieve toll records for every vehicle involved in a multi-vehicle incident at once.",
+    "get_vehicle_count_by_type": "`get_vehicle_count_by_type(start_timestamp: timestamp, end_timestamp: timestamp)`: Use this to understand traffic density and vehicle mix within the incident window.",
+    "get_vehicle_count_by_toll_point": "`get_vehicle_count_by_toll_point(start_timestamp: timestamp, end_timestamp: timestamp)`: Use this to compare traffic density and vehicle mix across toll points within the incident window.",
+    "get_distinct_vehicle_count": "`get_distinct_vehicle_count(start_timestamp: timestamp, end_timestamp: timestamp, toll_point_ids: list[string])`: Use this to learn how many different vehicles passed the incident area, e.g. to size the pool of potential witnesses.",
+    "get_frequent_plate_numbers": "`get_frequent_plate_numbers(start_timestamp: timestamp, end_timestamp: timestamp, toll_point_ids: list[string])`: Use this to identify vehicles that regularly pass the incident location and may be familiar with it or have passed it before.",
+    "find_similar_plate_numbers": "`find_similar_plate_numbers(plate_number: string)`: Use this when a reported plate returns no records or may have been misread, then look up the likely candidates.",
+    "get_vehicle_journeys": "`get_vehicle_journeys(plate_numbers: list[string])`: Use this to reconstruct where involved vehicles travelled, when, and at what implied speed.",
+    "find_witness_vehicles": "`find_witness_vehicles(plate_number: string, window_seconds: float)`: Use this to find potential witnesses or vehicles travelling with a suspect; without a plate, pass start_timestamp, end_timestamp and toll_point_ids for an incident window.",
+    "get_anomaly_alerts": "`get_anomaly_alerts(kind: string, plate_number: string)`: Use this to check whether involved vehicles were flagged for impossible travel, plate cloning or driving in a convoy.",
+    "get_plate_read_summary": "`get_plate_read_summary(plate_number: string)`: Use this for a quick check of whether and when a vehicle was on the road before pulling its full toll records.",
+}
+
+
+def _summary(tool: Callable[..., Any]) -> str:
+    return (inspect.getdoc(tool) or "").split("\n")[0].strip()
+
+
+def research_tool_list(tools: Sequence[Callable[..., Any]]) -> str:
+    """The researcher prompt's bullet list of `tools`."""
+    return "\n".join(
+        f"    - {tool.__name__}: {RESEARCH_TOOL_NOTES.get(tool.__name__) or _summary(tool)}" for tool in tools
+    )
+
+
+def plan_tool_list(tools: Sequence[Callable[..., Any]]) -> str:
+    """The planner prompt's bullet list of `tools`, with their signatures."""
+    return "\n".join(
+        f"    - {PLAN_TOOL_NOTES.get(tool.__name__) or f'`{tool.__name__}`: {_summary(tool)}'}" for tool in tools
+    )
+
+
 CCTV_ANALYSIS_PROMPT = f"""
     You are a {COMPANY_NAME} CCTV analysis assistant. Your primary function is to analyze CCTV footage to identify safety violations, sequence of events, and contributing factors.
 
-    Start by asking the user to upload the CCTV footage then use the *load_artifacts* tool to watch the video.
+    Start by asking the user to upload the CCTV footage then use the *prepare_cctv_footage* tool to reduce it to keyframes.
     Do not proceed until the user has uploaded the footage.
 
-    - Use **load_artifacts** tool to load the CCTV footage.
+    - Call **prepare_cctv_footage** with the video's artifact name, and the incident time in seconds from the start of the footage if you know it.
+    - Use **load_artifacts** tool to load the returned keyframe images rather than the whole video. Only load the video itself if the keyframes cannot answer a question.
     - Analyze the footage to identify safety violations, sequence of events, and contributing factors.
     - Your output MUST be a comprehensive analysis of the footage.
-    - Synthesize the new findings and COMBINE them with the existing information in 'research_findings'
     - Comment on what you see in the video and the sequence of events including timestamps.
     
     You are part of a larger team of agents, do not greet users, ask clarifying questions and output your findings.
 """
 
 
-RESEARCH_EXECUTOR_PROMPT = """
+_RESEARCH_EXECUTOR_TEMPLATE = """
     You are a specialist safety investigation researcher. You have access to the following tools:
     
-    - get_toll_records_by_plate_number: Get toll records by license plate to identify vehicle movements relevant to the incident.
-    - get_vehicle_count_by_type: Get the count of vehicles by type within a specified time interval to understand traffic context around the incident window.
+{database_tools}
     
+    Toll record results are paged: narrow them with start/end timestamps and `columns` where possible, and only pass `next_cursor` back to fetch more records if you need them. For large result sets pass `result_format="compact"`: records then arrive as `columns` plus value `rows`, where repeated strings are indexes into `dictionaries` and timestamps are seconds since the previous row (the first row is relative to `timestamp_bases`).
+
     Use toll records to verify whether the vehicle linked to the incident was present at the relevant time and location. Use vehicle counts to assess surrounding traffic density and potential contributing factors during the incident timeframe.
     You are part of a larger team of agents, do not greet users, ask clarifying questions and output your findings.
     
-    - Add your findings to the 'research_findings' state key.
-
     IMPORTANT: Once you have completed your research, return to the parent *research_coordinator_agent* agent.
 """
 
+# Pipeline mode runs the CCTV analysis and database research concurrently with
+# no user in the loop, so neither stage may ask questions or transfer.
+CCTV_ANALYSIS_PIPELINE_PROMPT = f"""
+    You are a {COMPANY_NAME} CCTV analysis assistant. Your primary function is to analyze CCTV footage to identify safety violations, sequence of events, and contributing factors.
+
+    - Call **prepare_cctv_footage** with the artifact name of the video the user has already uploaded, and the incident time in seconds from the start of the footage if you know it.
+    - Use **load_artifacts** tool to load the returned keyframe images rather than the whole video. Only load the video itself if the keyframes cannot answer a question.
+    - If no footage has been uploaded, reply with the single line "No CCTV footage was provided." and stop.
+    - Analyze the footage to identify safety violations, sequence of events, and contributing factors.
+    - Your output MUST be a comprehensive analysis of the footage.
+    - Comment on what you see in the video and the sequence of events including timestamps.
+
+    You run alongside the database researcher as part of a larger team of agents. Do not greet users or ask questions; output your findings.
+"""
+
+
+def research_executor_prompt(tools: Sequence[Callable[..., Any]], pipeline: bool = False) -> str:
+    """The database researcher's instruction, listing the tools it is given."""
+    prompt = _RESEARCH_EXECUTOR_TEMPLATE.replace("{database_tools}", research_tool_list(tools))
+    if pipeline:
+        prompt = prompt.replace(
+            "IMPORTANT: Once you have completed your research, return to the parent *research_coordinator_agent* agent.",
+            "IMPORTANT: Research the approved plan in the session, then output your findings. Do not transfer to other agents.",
+        )
+    return prompt
+
+
 REPORT_COMPOSER_PROMPT = f"""
     Transform the provided safety investigation data into a polished, professional, and meticulously crafted safety investigation report.
 
@@ -105,7 +183,10 @@ RESEARCH_EVALUATOR_PROMPT = f"""
     Your response must be a single, raw JSON object validating against the 'InvestigationFeedback' schema.
     """
 
-PLAN_GENERATOR_PROMPT = f"""
+
+def plan_generator_prompt(tools: Sequence[Callable[..., Any]]) -> str:
+    """The plan generator's instruction, listing the database tools the researcher is given."""
+    return f"""
     You are a {COMPANY_NAME} safety investigation research strategist. Your job is to create a high-level SAFETY INVESTIGATION RESEARCH PLAN focused on incident analysis, risk assessment, regulatory compliance, and operational safety improvements. If there is already a SAFETY INVESTIGATION RESEARCH PLAN in the session state, improve upon it based on the user feedback.
 
     SAFETY INVESTIGATION RESEARCH PLAN(SO FAR):
@@ -149,8 +230,7 @@ PLAN_GENERATOR_PROMPT = f"""
     - **Research value:** Identifies safety violations, sequence of events, personnel behavior, equipment status, and contributing factors from video evidence
 
     **Database Analysis Functions**
-    - `get_toll_records_by_plate_number(plate_number: string)`: Use this to retrieve toll records for a specific license plate to verify presence and movement near the incident time.
-    - `get_vehicle_count_by_type(start_timestamp: timestamp, end_timestamp: timestamp)`: Use this to understand traffic density and vehicle mix within the incident window.
+{plan_tool_list(tools)}
     - **Research value:** Provides concrete movement evidence and traffic context to understand incident conditions and identify contributing patterns
 
     **TOOL USE IS STRICTLY LIMITED:**
@@ -0,0 +1,186 @@
+"""
+Query results held as Arrow columns.
+
+`execute_query` returns a `ResultSet` over the Arrow table the backend
+produced, instead of one dict per row. Values stay in typed Arrow columns
+(timestamps as int64 microseconds) until something asks for them:
+
+- `values`, `numpy` and `column` read whole columns for aggregation, e.g.
+  journeys from the plate, toll point and timestamp columns.
+- Indexing and iteration give lazy `Row` views, which read a column's Python
+  values once, on first access, and share them with every other row.
+- `slice` and `select` are zero-copy.
+- `to_pylist` and `iter_dicts` build plain dicts, for the rows a tool finally
+  returns to the agent.
+
+A ResultSet is immutable, so the query cache and single flight share one
+instance between callers without copying it.
+"""
+from collections.abc import Mapping, Sequence
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Union
+import numpy as np
+from .columnar import to_micros
+
+Rows = Union["ResultSet", Sequence]
+
+
+class Row(Mapping):
+    """Read-only view of one row of a `ResultSet`."""
+
+    __slots__ = ("_results", "_index")
+
+    def __init__(self, results: "ResultSet", index: int):
+        self._results = results
+        self._index = index
+
+    def __getitem__(self, column: str) -> Any:
+        return self._results.values(column)[self._index]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._results.columns)
+
+    def __len__(self) -> int:
+        return len(self._results.columns)
+
+    def __repr__(self) -> str:
+        return f"Row({dict(self)!r})"
+
+
+class ResultSet(Sequence):
+    """Rows of a query result, stored as the columns of a `pyarrow.Table`."""
+
+    def __init__(self, table):
+        self.table = table
+        # Python values of the columns read through `values` or row views.
+        self._values: Dict[str, List[Any]] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Sequence, columns: Optional[Sequence[str]] = None) -> "ResultSet":
+        """Build a result set from row dicts, e.g. rows cached from a stream; `columns` names an empty one's columns."""
+        import pyarrow as pa
+
+        if not rows:
+            return cls(pa.table({column: pa.nulls(0) for column in columns or []}))
+        return cls(pa.Table.from_pylist([dict(row) for row in rows]))
+
+    @property
+    def columns(self) -> List[str]:
+        return self.table.column_names
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return ResultSet(self.table.take(list(range(start, stop, step))))
+            return self.slice(start, max(stop - start, 0))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ResultSet index out of range")
+        return Row(self, index)
+
+    def __iter__(self) -> Iterator[Row]:
+        for index in range(len(self)):
+            yield Row(self, index)
+
+    def __repr__(self) -> str:
+        return f"ResultSet({len(self)} rows, columns={self.columns})"
+
+    def _check_column(self, name: str) -> bool:
+        """Whether `name` is a column; an empty result built from no rows has none, and reads as empty."""
+        if name in self.table.column_names:
+            return True
+        if len(self) == 0:
+            return False
+        raise KeyError(name)
+
+    def column(self, name: str):
+        """One column as a `pyarrow.ChunkedArray`."""
+        return self.table.column(name)
+
+    def values(self, name: str) -> List[Any]:
+        """One column as Python values (timestamps as aware datetimes), converted once and reused."""
+        values = self._values.get(name)
+        if values is None:
+            values = self._values[name] = self.table.column(name).to_pylist() if self._check_column(name) else []
+        return values
+
+    def numpy(self, name: str) -> np.ndarray:
+        """
+        One column as a numpy array.
+
+        Timestamps come back as int64 epoch microseconds. Numeric columns of a
+        single chunk without nulls are not copied; strings are object arrays.
+        """
+        import pyarrow as pa
+
+        if not self._check_column(name):
+            return np.empty(0, dtype=np.int64)
+        column = self.table.column(name)
+        if pa.types.is_timestamp(column.type):
+            if column.type.unit != "us":
+                column = column.cast(pa.timestamp("us", tz=column.type.tz))
+            column = column.cast(pa.int64())
+        return column.to_numpy()
+
+    def select(self, columns: Sequence[str]) -> "ResultSet":
+        """The given columns only, without copying them."""
+        return ResultSet(self.table.select(list(columns)))
+
+    def slice(self, offset: int, length: Optional[int] = None) -> "ResultSet":
+        """Rows [offset, offset + length), without copying them."""
+        return ResultSet(self.table.slice(offset, length))
+
+    def sort_by(self, keys: Sequence) -> "ResultSet":
+        """Rows sorted by `keys`, a list of (column, 'ascending' or 'descending') pairs."""
+        return ResultSet(self.table.sort_by(list(keys)))
+
+    def to_pylist(self, columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Every row as a plain dict (only `columns`, if given), for returning to the agent."""
+        table = self.table.select(list(columns)) if columns is not None else self.table
+        return table.to_pylist()
+
+    def iter_dicts(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Rows as plain dicts, built one batch at a time as they are consumed."""
+        for batch in self.table.to_batches(max_chunksize=batch_size):
+            yield from batch.to_pylist()
+
+
+def as_rows(rows: Iterable) -> Rows:
+    """`rows` as a `ResultSet` or a list, so that several columns can be read from it."""
+    return rows if isinstance(rows, (ResultSet, list)) else list(rows)
+
+
+def column_values(rows: Rows, name: str, default: Any = KeyError) -> Sequence:
+    """
+    Values of column `name`, from a `ResultSet` or from a list of row dicts.
+
+    Lets code shared by SQL results and in-process indexes or ingested rows
+    work column-wise on either. Missing values are `default` when one is given.
+    """
+    if isinstance(rows, ResultSet):
+        if default is not KeyError and name not in rows.columns:
+            return [default] * len(rows)
+        return rows.values(name)
+    if default is KeyError:
+        return [row[name] for row in rows]
+    return [row.get(name, default) for row in rows]
+
+
+def timestamp_micros(rows: Rows) -> Sequence[int]:
+    """Read times in epoch microseconds, from a `timestamp_micros` column or `timestamp` datetimes."""
+    if isinstance(rows, ResultSet):
+        if "timestamp_micros" in rows.columns:
+            return rows.values("timestamp_micros")
+        return rows.numpy("timestamp").tolist()
+    return [
+        row["timestamp_micros"] if row.get("timestamp_micros") is not None else to_micros(row["timestamp"])
+        for row in rows
+    ]
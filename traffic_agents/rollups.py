@@ -0,0 +1,138 @@
+from array import array
+from datetime import datetime
+from typing import Dict, Any, Callable, Iterable, Tuple
+import logging
+import threading
+from .columnar import ValueDictionary, to_micros
+from .resultset import ResultSet, as_rows, column_values, timestamp_micros
+
+logger = logging.getLogger(__name__)
+
+
+class _Series:
+    """Per-bucket counts for one (toll point, vehicle type) pair with lazily maintained prefix sums."""
+
+    __slots__ = ("origin", "counts", "prefix", "dirty_from")
+
+    def __init__(self, origin: int):
+        self.origin = origin
+        self.counts = array("q")
+        # prefix[i] is the sum of counts[:i]; it is valid up to index dirty_from.
+        self.prefix = array("q", [0])
+        self.dirty_from = 0
+
+    def add(self, bucket: int, count: int) -> None:
+        if bucket < self.origin:
+            self.counts = array("q", bytes(8 * (self.origin - bucket))) + self.counts
+            self.origin = bucket
+            self.dirty_from = 0
+        i = bucket - self.origin
+        if i >= len(self.counts):
+            self.counts.frombytes(bytes(8 * (i + 1 - len(self.counts))))
+        self.counts[i] += count
+        self.dirty_from = min(self.dirty_from, i)
+
+    def _refresh(self) -> None:
+        if self.dirty_from >= len(self.counts) and len(self.prefix) == len(self.counts) + 1:
+            return
+        del self.prefix[self.dirty_from + 1:]
+        running = self.prefix[self.dirty_from]
+        for count in self.counts[self.dirty_from:]:
+            running += count
+            self.prefix.append(running)
+        self.dirty_from = len(self.counts)
+
+    def range_sum(self, first_bucket: int, end_bucket: int) -> int:
+        """Sum of counts for buckets in [first_bucket, end_bucket)."""
+        self._refresh()
+        lo = min(max(first_bucket - self.origin, 0), len(self.counts))
+        hi = min(max(end_bucket - self.origin, 0), len(self.counts))
+        return self.prefix[hi] - self.prefix[lo] if hi > lo else 0
+
+
+class RollupStore:
+    """
+    Vehicle counts pre-aggregated by (time bucket, toll point, vehicle type).
+
+    Each (toll point, vehicle type) pair keeps a dense per-bucket count array
+    and its cumulative prefix sums, so the count over any run of whole buckets
+    is a single subtraction. Callers answer the partial buckets at either end
+    of a window from raw rows (see `full_buckets`), which keeps results exact.
+    Counts are updated incrementally with `add_records`; prefix sums are
+    recomputed lazily from the earliest bucket that changed.
+    """
+
+    def __init__(self, bucket_seconds: int = 60):
+        self.bucket_micros = bucket_seconds * 1_000_000
+        self._toll_points = ValueDictionary()
+        self._vehicle_types = ValueDictionary()
+        self._series: Dict[Tuple[int, int], _Series] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, run_query: Callable[..., ResultSet], table: str,
+              bucket_seconds: int = 60) -> "RollupStore":
+        """Build rollups for every row of `table` with a single grouped query."""
+        store = cls(bucket_seconds)
+        rows = run_query(f"""
+        select
+          toll_point_id,
+          vehicle_type,
+          div(unix_micros(timestamp), @bucket_micros) as bucket,
+          count(record_id) as vehicle_count
+        from `{table}`
+        group by toll_point_id, vehicle_type, bucket;
+        """, {"bucket_micros": store.bucket_micros})
+        cells = zip(rows.values("toll_point_id"), rows.values("vehicle_type"), rows.values("bucket"),
+                    rows.values("vehicle_count"))
+        with store._lock:
+            for toll_point_id, vehicle_type, bucket, count in cells:
+                store._add(toll_point_id, vehicle_type, bucket, count)
+        logger.info(f"Built rollups for {len(rows)} (bucket, toll point, vehicle type) cells")
+        return store
+
+    def _add(self, toll_point_id: str, vehicle_type: str, bucket: int, count: int) -> None:
+        key = (self._toll_points.encode(toll_point_id), self._vehicle_types.encode(vehicle_type))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(bucket)
+        series.add(bucket, count)
+
+    def add_records(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Count newly ingested toll_records rows, a `ResultSet` or row dicts.
+
+        Rows carry either a `timestamp` datetime or a precomputed `timestamp_micros`.
+        """
+        rows = as_rows(rows)
+        cells = zip(column_values(rows, "toll_point_id"), column_values(rows, "vehicle_type", None),
+                    timestamp_micros(rows))
+        with self._lock:
+            for toll_point_id, vehicle_type, timestamp in cells:
+                self._add(toll_point_id, vehicle_type, timestamp // self.bucket_micros, 1)
+
+    def full_buckets(self, start: datetime, end: datetime) -> Tuple[int, int]:
+        """
+        Return [first, end) bucket numbers lying entirely inside [start, end].
+
+        Rows in [start, first * bucket) and [end_bucket * bucket, end] are not
+        covered and must be counted from raw rows. If first >= end_bucket no
+        whole bucket fits and the entire window must be counted from raw rows.
+        """
+        first = -(-to_micros(start) // self.bucket_micros)
+        end_bucket = (to_micros(end) + 1) // self.bucket_micros
+        return first, end_bucket
+
+    def bucket_start(self, bucket: int) -> int:
+        """Start of `bucket` in epoch microseconds."""
+        return bucket * self.bucket_micros
+
+    def counts(self, first_bucket: int, end_bucket: int) -> Dict[Tuple[str, str], int]:
+        """Vehicle counts per (toll_point_id, vehicle_type) over buckets [first_bucket, end_bucket)."""
+        with self._lock:
+            counts = {}
+            for (toll_point, vehicle_type), series in self._series.items():
+                count = series.range_sum(first_bucket, end_bucket)
+                if count:
+                    counts[(self._toll_points.values[toll_point], self._vehicle_types.values[vehicle_type])] = count
+            return counts
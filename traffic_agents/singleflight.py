@@ -0,0 +1,220 @@
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+import asyncio
+import threading
+import time
+
+
+@dataclass
+class SingleFlightStats:
+    # Calls that ran the work themselves.
+    leaders: int = 0
+    # Calls that attached to an identical call already in flight, i.e. jobs saved.
+    coalesced: int = 0
+    in_flight: int = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the work; callers arriving
+    while it is in flight wait for and share its result, or its exception.
+    Nothing is remembered once the leader finishes: this dedupes concurrent
+    work and is not a cache. Thread and asyncio callers share the same flights,
+    as each flight is a `concurrent.futures.Future`.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, Future] = {}
+        self._streams: Dict[Hashable, "SharedRowStream"] = {}
+        self._lock = threading.Lock()
+        self._stats = SingleFlightStats()
+
+    def _join_or_lead(self, key: Hashable):
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self._stats.coalesced += 1
+                return future, False
+            future = self._flights[key] = Future()
+            self._stats.leaders += 1
+            return future, True
+
+    def _land(self, key: Hashable, future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            del self._flights[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, work: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run `work()`, sharing one execution among concurrent callers with the same key.
+
+        Returns:
+            Tuple[Any, bool]: The result, and whether it came from another caller's run.
+            A shared result is the same object for every caller.
+        """
+        future, leader = self._join_or_lead(key)
+        if not leader:
+            return future.result(), True
+        try:
+            result = work()
+        except BaseException as e:
+            self._land(key, future, error=e)
+            raise
+        self._land(key, future, result)
+        return result, False
+
+    async def do_async(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Like `do`, for a coroutine function; waiting callers do not block the event loop."""
+        future, leader = self._join_or_lead(key)
+        if not leader:
+            return await asyncio.wrap_future(future), True
+        try:
+            result = await work()
+        except BaseException as e:
+            self._land(key, future, error=e)
+            raise
+        self._land(key, future, result)
+        return result, False
+
+    def stream(self, key: Hashable, open_rows: Callable[[], Iterator[Dict[str, Any]]],
+               max_buffered: int, max_join_age: float) -> Tuple[Iterator[Dict[str, Any]], bool]:
+        """
+        Return an iterator over `open_rows()`, sharing one source among concurrent readers with the same key.
+
+        A reader arriving while an identical stream is still joinable (see
+        `SharedRowStream`) reads the leader's rows from the start instead of
+        opening its own; otherwise it becomes the leader of a new stream.
+
+        Returns:
+            Tuple[Iterator, bool]: The rows, and whether they come from another caller's stream.
+        """
+        # Never hold self._lock while taking a stream's lock: the stream's
+        # source takes self._lock when it finishes.
+        with self._lock:
+            shared = self._streams.get(key)
+        reader = shared.reader() if shared is not None else None
+        if reader is not None:
+            with self._lock:
+                self._stats.coalesced += 1
+            return reader, True
+
+        shared = SharedRowStream(open_rows(), max_buffered, max_join_age,
+                                 on_finish=lambda done: self._forget_stream(key, done))
+        with self._lock:
+            self._streams[key] = shared
+            self._stats.leaders += 1
+        return shared.reader(), False
+
+    def _forget_stream(self, key: Hashable, shared: "SharedRowStream") -> None:
+        with self._lock:
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+
+    def forget_streams(self) -> None:
+        """Stop new readers joining open streams, e.g. after the data they read has changed."""
+        with self._lock:
+            self._streams.clear()
+
+    def stats(self) -> SingleFlightStats:
+        with self._lock:
+            return SingleFlightStats(self._stats.leaders, self._stats.coalesced, len(self._flights) + len(self._streams))
+
+
+class SharedRowStream:
+    """
+    Lets several readers consume one row iterator, each from the first row.
+
+    Rows are pulled from the source only once, by whichever reader gets
+    furthest ahead, and kept until every reader has passed them. Readers can
+    join while the stream is `joinable`: it started less than `max_join_age`
+    seconds ago, nothing has been discarded yet and at most `max_buffered`
+    rows have been read, so a late joiner never forces an unbounded buffer or
+    sees results older than an in-flight query's.
+    """
+
+    def __init__(self, rows: Iterator[Dict[str, Any]], max_buffered: int, max_join_age: float,
+                 on_finish: Optional[Callable[["SharedRowStream"], None]] = None):
+        self._source = rows
+        self.max_buffered = max_buffered
+        self._join_deadline = time.monotonic() + max_join_age
+        # Called once the source is exhausted, fails or is closed.
+        self._on_finish = on_finish
+        self._buffer: List[Dict[str, Any]] = []
+        # Absolute position of _buffer[0].
+        self._offset = 0
+        self._positions: Dict[int, int] = {}
+        self._next_reader = 0
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+
+    @property
+    def joinable(self) -> bool:
+        return (self._offset == 0 and len(self._buffer) <= self.max_buffered and self._error is None
+                and time.monotonic() < self._join_deadline)
+
+    def reader(self) -> Optional[Iterator[Dict[str, Any]]]:
+        """Return a new reader from the first row, or None if the stream can no longer be joined."""
+        with self._lock:
+            if not self.joinable:
+                return None
+            reader_id = self._next_reader
+            self._next_reader += 1
+            self._positions[reader_id] = 0
+        return self._read(reader_id)
+
+    def _read(self, reader_id: int) -> Iterator[Dict[str, Any]]:
+        try:
+            while True:
+                with self._lock:
+                    position = self._positions[reader_id]
+                    index = position - self._offset
+                    if index >= len(self._buffer):
+                        if self._error is not None:
+                            raise self._error
+                        if self._done:
+                            return
+                        try:
+                            self._buffer.append(next(self._source))
+                        except StopIteration:
+                            self._finish()
+                            return
+                        except BaseException as e:
+                            self._error = e
+                            self._finish()
+                            raise
+                    row = self._buffer[index]
+                    self._positions[reader_id] = position + 1
+                    self._trim()
+                yield row
+        finally:
+            with self._lock:
+                del self._positions[reader_id]
+                self._trim()
+                if not self._positions and not self._done:
+                    # The last reader left early; release the source, e.g. a backend cursor.
+                    close = getattr(self._source, "close", None)
+                    if close is not None:
+                        close()
+                    self._finish()
+
+    def _finish(self) -> None:
+        self._done = True
+        if self._on_finish is not None:
+            self._on_finish(self)
+
+    def _trim(self) -> None:
+        # Keep rows for late joiners until the buffer is full, then drop what every reader has passed.
+        if len(self._buffer) <= self.max_buffered and not self._done:
+            return
+        slowest = min(self._positions.values(), default=self._offset + len(self._buffer))
+        drop = slowest - self._offset
+        if drop > 0:
+            del self._buffer[:drop]
+            self._offset += drop
@@ -0,0 +1,446 @@
+"""
+Mergeable sketches of toll reads per (toll point, time bucket).
+
+Each cell keeps a HyperLogLog of the plates read, a count-min sketch of how
+often each plate was read and the plates with the highest count-min estimates
+as heavy hitter candidates. Sketches of the same shape merge by register-wise
+max (HyperLogLog) and addition (count-min), so any run of buckets over any set
+of toll points is answered by merging a fixed number of fixed-size arrays:
+memory and query time depend on the window, never on the table size.
+
+Candidates picked within one bucket miss a plate read once an hour all day,
+which ties with every other plate inside any hour. So each toll point also
+keeps a count-min sketch and candidates for aligned ranges of 2, 4, 8, ...
+buckets; a window is split into the fewest such ranges, and a plate with a
+large share of the window's reads has a large share of at least one of them.
+
+Errors are bounded and reported with each answer:
+
+- Distinct counts have a relative standard error of 1.04 / sqrt(2 ** precision)
+  (1.6% at the default precision of 12).
+- Count-min estimates never undercount and overcount by at most
+  e / width * reads in the window with probability 1 - exp(-depth).
+"""
+from typing import Dict, Any, Callable, Iterable, Iterator, Optional, Sequence, Tuple
+import itertools
+import logging
+import math
+import threading
+import numpy as np
+from .columnar import ValueDictionary
+from .resultset import ResultSet, as_rows, column_values, timestamp_micros
+
+logger = logging.getLogger(__name__)
+
+_SEED = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+# Rows are folded into the sketches this many at a time.
+_CHUNK_ROWS = 100_000
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer over a uint64 array (wrapping arithmetic)."""
+    values = (values ^ (values >> np.uint64(30))) * _MIX_1
+    values = (values ^ (values >> np.uint64(27))) * _MIX_2
+    return values ^ (values >> np.uint64(31))
+
+
+def plate_hashes(plate_numbers: Sequence[str]) -> np.ndarray:
+    """
+    Stable 64-bit hashes of plate numbers, computed for all of them at once.
+
+    Each plate is hashed over its own 8-byte words and its length only, so its
+    hash does not depend on the other plates in the batch.
+    """
+    if not len(plate_numbers):
+        return np.empty(0, dtype=np.uint64)
+    encoded = np.asarray([plate.encode() for plate in plate_numbers])
+    lengths = np.char.str_len(encoded).astype(np.uint64)
+    word_counts = (lengths + np.uint64(7)) // np.uint64(8)
+    width = -(-encoded.dtype.itemsize // 8) * 8
+    words = encoded.astype(f"S{width}").view(np.uint64).reshape(len(encoded), width // 8)
+    hashes = _mix(_SEED ^ lengths)
+    for i, column in enumerate(words.T):
+        hashes = np.where(word_counts > np.uint64(i), _mix(hashes ^ column), hashes)
+    return hashes
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Number of significant bits of each uint64 value."""
+    lengths = np.zeros(len(values), dtype=np.int64)
+    values = values.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= np.uint64(1 << shift)
+        lengths += high * shift
+        values = np.where(high, values >> np.uint64(shift), values)
+    return lengths + (values > 0)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter over 64-bit hashes."""
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = 12, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        suffix_bits = 64 - self.precision
+        index = (hashes >> np.uint64(suffix_bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << suffix_bits) - 1)
+        rank = (suffix_bits - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def copy(self) -> "HyperLogLog":
+        return HyperLogLog(self.precision, self.registers.copy())
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.ldexp(1.0, -self.registers.astype(np.int32)).sum())
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are still empty.
+            return m * math.log(m / zeros)
+        return raw
+
+
+class CountMinSketch:
+    """Count-min sketch over 64-bit hashes; estimates never undercount."""
+
+    __slots__ = ("width", "depth", "table", "total")
+
+    def __init__(self, width: int = 2048, depth: int = 4, table: Optional[np.ndarray] = None, total: int = 0):
+        if width & (width - 1):
+            raise ValueError("Count-min width must be a power of two")
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int32) if table is None else table
+        self.total = total
+
+    def _columns(self, hashes: np.ndarray) -> np.ndarray:
+        # Double hashing: row i uses h1 + i * h2, with h2 odd so the rows differ.
+        low = hashes & np.uint64(0xFFFFFFFF)
+        high = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((low + rows * high) & np.uint64(self.width - 1)).astype(np.int64)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        """
+        Count one occurrence of each hash, with conservative update: each
+        counter is only raised as far as the new estimate of its key needs,
+        which keeps estimates upper bounds but cuts the overcount.
+        """
+        hashes, counts = np.unique(hashes, return_counts=True)
+        columns = self._columns(hashes)
+        rows = np.arange(self.depth)[:, None]
+        targets = (self.table[rows, columns].min(axis=0) + counts).astype(np.int32)
+        for row, row_columns in zip(self.table, columns):
+            np.maximum.at(row, row_columns, targets)
+        self.total += int(counts.sum())
+
+    def merge(self, other: "CountMinSketch") -> None:
+        self.table += other.table
+        self.total += other.total
+
+    def copy(self) -> "CountMinSketch":
+        return CountMinSketch(self.width, self.depth, self.table.copy(), self.total)
+
+    def estimate_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        columns = self._columns(hashes)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    @property
+    def max_overcount(self) -> int:
+        """Overcount bound that holds for each estimate with probability 1 - exp(-depth)."""
+        return math.ceil(math.e / self.width * self.total)
+
+
+class _HeavyHitters:
+    """A count-min sketch of plate reads and the plates with the highest estimates, as heavy hitter candidates."""
+
+    __slots__ = ("counts", "candidate_plates", "candidate_hashes")
+
+    def __init__(self, width: int, depth: int):
+        self.counts = CountMinSketch(width, depth)
+        self.candidate_plates = np.empty(0, dtype=object)
+        self.candidate_hashes = np.empty(0, dtype=np.uint64)
+
+    def add(self, plates: np.ndarray, hashes: np.ndarray, top_k: int) -> None:
+        self.counts.add_hashes(hashes)
+        plates = np.concatenate([self.candidate_plates, plates])
+        hashes = np.concatenate([self.candidate_hashes, hashes])
+        hashes, first = np.unique(hashes, return_index=True)
+        plates = plates[first]
+        if len(hashes) > top_k:
+            keep = np.argpartition(-self.counts.estimate_hashes(hashes), top_k - 1)[:top_k]
+            hashes, plates = hashes[keep], plates[keep]
+        self.candidate_plates, self.candidate_hashes = plates, hashes
+
+
+class _Cell(_HeavyHitters):
+    """The sketches of one (toll point, bucket)."""
+
+    __slots__ = ("distinct",)
+
+    def __init__(self, precision: int, width: int, depth: int):
+        super().__init__(width, depth)
+        self.distinct = HyperLogLog(precision)
+
+    def add(self, plates: np.ndarray, hashes: np.ndarray, top_k: int) -> None:
+        self.distinct.add_hashes(hashes)
+        super().add(plates, hashes, top_k)
+
+
+class SketchStore:
+    """
+    Distinct plate and heavy hitter sketches per (toll point, time bucket).
+
+    Updated incrementally with `add_records`. At most `max_buckets` buckets
+    are kept; the oldest are dropped as newer ones arrive, along with the
+    bucket ranges that contain them. Memory is bounded by about twice
+    max_buckets * toll points * the size of one cell.
+    """
+
+    def __init__(self, bucket_seconds: int = 3600, precision: int = 12, width: int = 2048, depth: int = 4,
+                 top_k: int = 32, max_buckets: int = 24 * 7):
+        self.bucket_micros = bucket_seconds * 1_000_000
+        self.precision = precision
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.max_buckets = max_buckets
+        # Ranges of 2 ** level buckets are kept for levels 1 to this, enough to span max_buckets.
+        self.levels = (max_buckets - 1).bit_length()
+        self._toll_points = ValueDictionary()
+        # bucket -> toll point code -> cell
+        self._buckets: Dict[int, Dict[int, _Cell]] = {}
+        # (level, bucket >> level) -> toll point code -> heavy hitters of those 2 ** level buckets
+        self._ranges: Dict[Tuple[int, int], Dict[int, _HeavyHitters]] = {}
+        # Buckets before this one were dropped (or never kept), so windows reaching them cannot be answered.
+        self._retained_from: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, iter_rows: Callable[..., Iterable[Dict[str, Any]]], table: str, **kwargs) -> "SketchStore":
+        """
+        Build sketches from every row of `table` using `iter_rows` (e.g. tools.iter_query).
+
+        Rows are folded in `_CHUNK_ROWS` at a time as they stream in, so the
+        table is never held in memory at once.
+        """
+        store = cls(**kwargs)
+        rows = iter(iter_rows(f"""
+        select toll_point_id, plate_number, div(unix_micros(timestamp), @bucket_micros) as bucket
+        from `{table}`;
+        """, {"bucket_micros": store.bucket_micros}))
+        while True:
+            chunk = list(itertools.islice(rows, _CHUNK_ROWS))
+            if not chunk:
+                break
+            store.add_records(chunk)
+        logger.info(f"Built sketches for {store.cell_count} (toll point, bucket) cells")
+        return store
+
+    @property
+    def cell_count(self) -> int:
+        return sum(len(cells) for cells in self._buckets.values())
+
+    def add_records(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Fold toll_records rows, a `ResultSet` or row dicts, into the sketches.
+
+        Rows carry either a `timestamp` datetime or a precomputed `bucket`.
+        """
+        rows = as_rows(rows)
+        for offset in range(0, len(rows), _CHUNK_ROWS):
+            # A zero-copy slice of a result set.
+            chunk = rows[offset:offset + _CHUNK_ROWS]
+            if isinstance(chunk, ResultSet) and "bucket" in chunk.columns:
+                buckets = chunk.numpy("bucket")
+            elif isinstance(chunk, list) and chunk and "bucket" in chunk[0]:
+                buckets = np.asarray(column_values(chunk, "bucket"), dtype=np.int64)
+            else:
+                buckets = np.asarray(timestamp_micros(chunk), dtype=np.int64) // self.bucket_micros
+            self._add_columns(column_values(chunk, "toll_point_id"), column_values(chunk, "plate_number"), buckets)
+
+    def _add_columns(self, toll_point_ids: Sequence[str], plate_numbers: Sequence[str], buckets: np.ndarray) -> None:
+        plates = np.asarray(plate_numbers, dtype=object)
+        hashes = plate_hashes(plate_numbers)
+        with self._lock:
+            encode = self._toll_points.encode
+            toll_points = np.fromiter(map(encode, toll_point_ids), dtype=np.int64, count=len(toll_point_ids))
+            # Group the chunk by cell so each cell's sketches are updated once.
+            keys = buckets * (1 << 20) + toll_points
+            order = np.argsort(keys, kind="stable")
+            keys = keys[order]
+            starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+            for start, end in zip(starts, np.append(starts[1:], len(keys))):
+                members = order[start:end]
+                bucket, toll_point = int(buckets[members[0]]), int(toll_points[members[0]])
+                cells = self._buckets.get(bucket)
+                if cells is None:
+                    if len(self._buckets) >= self.max_buckets and bucket < min(self._buckets):
+                        self._drop_before(bucket + 1)
+                        continue
+                    cells = self._buckets[bucket] = {}
+                    while len(self._buckets) > self.max_buckets:
+                        oldest = min(self._buckets)
+                        del self._buckets[oldest]
+                        self._drop_before(oldest + 1)
+                cell = cells.get(toll_point)
+                if cell is None:
+                    cell = cells[toll_point] = _Cell(self.precision, self.width, self.depth)
+                cell.add(plates[members], hashes[members], self.top_k)
+                for level in range(1, self.levels + 1):
+                    index = bucket >> level
+                    # A range reaching dropped buckets is never used, so it is not rebuilt.
+                    if self._retained_from is not None and index << level < self._retained_from:
+                        continue
+                    heavy = self._ranges.setdefault((level, index), {}).get(toll_point)
+                    if heavy is None:
+                        heavy = self._ranges[level, index][toll_point] = _HeavyHitters(self.width, self.depth)
+                    heavy.add(plates[members], hashes[members], self.top_k)
+
+    def _drop_before(self, bucket: int) -> None:
+        if self._retained_from is None or bucket > self._retained_from:
+            self._retained_from = bucket
+            for level, index in [key for key in self._ranges if key[1] << key[0] < bucket]:
+                del self._ranges[level, index]
+
+    def full_buckets(self, start_micros: int, end_micros: int) -> Tuple[int, int]:
+        """
+        [first, end) buckets lying entirely inside [start_micros, end_micros].
+
+        Reads in the partial buckets at either edge are not covered; pass them
+        to `distinct_vehicles` and `top_plates` as `edges`. If first >= end no
+        whole bucket fits and the sketches cannot answer the window.
+        """
+        return -(-start_micros // self.bucket_micros), (end_micros + 1) // self.bucket_micros
+
+    def retains(self, first_bucket: int) -> bool:
+        """Whether every bucket from `first_bucket` on is still kept, so windows starting there can be answered."""
+        with self._lock:
+            return self._retained_from is None or first_bucket >= self._retained_from
+
+    def bucket_start(self, bucket: int) -> int:
+        """Start of `bucket` in epoch microseconds."""
+        return bucket * self.bucket_micros
+
+    def _toll_point_codes(self, toll_point_ids: Optional[Sequence[str]]) -> Optional[set]:
+        if toll_point_ids is None:
+            return None
+        return {self._toll_points.codes[t] for t in toll_point_ids if t in self._toll_points.codes}
+
+    def _cells(self, first_bucket: int, end_bucket: int,
+               toll_point_ids: Optional[Sequence[str]]) -> Iterator[Tuple[str, _Cell]]:
+        codes = self._toll_point_codes(toll_point_ids)
+        for bucket, cells in self._buckets.items():
+            if first_bucket <= bucket < end_bucket:
+                for code, cell in cells.items():
+                    if codes is None or code in codes:
+                        yield self._toll_points.values[code], cell
+
+    def _pieces(self, first_bucket: int, end_bucket: int) -> Iterator[Tuple[int, int]]:
+        """Split buckets [first_bucket, end_bucket) into the fewest aligned ranges of 2 ** level buckets."""
+        bucket = first_bucket
+        while bucket < end_bucket:
+            level = 0
+            while level < self.levels and bucket % (2 << level) == 0 and bucket + (2 << level) <= end_bucket:
+                level += 1
+            yield level, bucket >> level
+            bucket += 1 << level
+
+    def _edge_cells(self, edges: Iterable[Dict[str, Any]],
+                    toll_point_ids: Optional[Sequence[str]]) -> Iterator[Tuple[str, _Cell]]:
+        """One cell per toll point holding `edges`, reads outside the whole buckets of a window."""
+        rows = as_rows(edges)
+        if not len(rows):
+            return
+        toll_points = np.asarray(column_values(rows, "toll_point_id"), dtype=object)
+        plate_numbers = column_values(rows, "plate_number")
+        plates, hashes = np.asarray(plate_numbers, dtype=object), plate_hashes(plate_numbers)
+        for toll_point in sorted(set(toll_points.tolist())):
+            if toll_point_ids is None or toll_point in toll_point_ids:
+                members = np.flatnonzero(toll_points == toll_point)
+                cell = _Cell(self.precision, self.width, self.depth)
+                cell.add(plates[members], hashes[members], self.top_k)
+                yield toll_point, cell
+
+    def distinct_vehicles(self, first_bucket: int, end_bucket: int, toll_point_ids: Optional[Sequence[str]] = None,
+                          edges: Iterable[Dict[str, Any]] = ()) -> Dict[str, Any]:
+        """
+        Estimated distinct vehicles (plates) over buckets [first_bucket, end_bucket) at `toll_point_ids` (default all).
+
+        `edges` are toll_records rows (toll_point_id and plate_number) from
+        the partial buckets around the window, which are counted in as well.
+
+        Returns:
+            Dict[str, Any]: 'distinct_vehicles' across every selected toll point, 'reads',
+            'relative_error' and 'by_toll_point', each toll point's own 'distinct_vehicles' and 'reads'.
+        """
+        edge_cells = list(self._edge_cells(edges, toll_point_ids))
+        with self._lock:
+            merged = HyperLogLog(self.precision)
+            per_point: Dict[str, Tuple[HyperLogLog, int]] = {}
+            for toll_point, cell in itertools.chain(self._cells(first_bucket, end_bucket, toll_point_ids), edge_cells):
+                merged.merge(cell.distinct)
+                sketch, reads = per_point.get(toll_point) or (HyperLogLog(self.precision), 0)
+                sketch.merge(cell.distinct)
+                per_point[toll_point] = (sketch, reads + cell.counts.total)
+        return {
+            "distinct_vehicles": round(merged.estimate()),
+            "reads": sum(reads for _, reads in per_point.values()),
+            "relative_error": round(merged.relative_error, 4),
+            "by_toll_point": [
+                {"toll_point_id": toll_point, "distinct_vehicles": round(sketch.estimate()), "reads": reads}
+                for toll_point, (sketch, reads) in sorted(per_point.items())
+            ],
+        }
+
+    def top_plates(self, first_bucket: int, end_bucket: int, toll_point_ids: Optional[Sequence[str]] = None,
+                   limit: int = 10, edges: Iterable[Dict[str, Any]] = ()) -> Dict[str, Any]:
+        """
+        Plates with the most estimated reads over buckets [first_bucket, end_bucket) at `toll_point_ids`.
+
+        The buckets are split into the fewest aligned ranges of 2 ** level
+        buckets (see `_pieces`). Candidates are the heavy hitters of each range
+        at the selected toll points, and each candidate's estimates in those
+        ranges are summed; `edges`, as for `distinct_vehicles`, count as one
+        more range. Each is an upper bound, and the sum is never above
+        the estimate of the merged sketch, so the count-min error bound of the
+        whole window still holds.
+
+        Returns:
+            Dict[str, Any]: 'plates', each with 'plate_number' and estimated 'reads', most first;
+            'reads' in the window and 'max_overcount', the error bound on each estimate.
+        """
+        pieces = [cell for _, cell in self._edge_cells(edges, toll_point_ids)]
+        with self._lock:
+            codes = self._toll_point_codes(toll_point_ids)
+            for level, index in self._pieces(first_bucket, end_bucket):
+                ranges = self._buckets.get(index) if level == 0 else self._ranges.get((level, index))
+                pieces.extend(heavy for code, heavy in (ranges or {}).items() if codes is None or code in codes)
+            if not pieces:
+                return {"plates": [], "reads": 0, "max_overcount": 0}
+            hashes, first = np.unique(np.concatenate([piece.candidate_hashes for piece in pieces]), return_index=True)
+            plates = np.concatenate([piece.candidate_plates for piece in pieces])[first]
+            estimates = np.zeros(len(hashes), dtype=np.int64)
+            for piece in pieces:
+                estimates += piece.counts.estimate_hashes(hashes)
+            reads = sum(piece.counts.total for piece in pieces)
+        ranked = np.lexsort((plates.astype(str), -estimates))[:limit]
+        return {
+            "plates": [{"plate_number": plates[i], "reads": int(estimates[i])} for i in ranked.tolist()],
+            "reads": reads,
+            "max_overcount": math.ceil(math.e / self.width * reads),
+        }
@@ -0,0 +1,117 @@
+"""
+Columnar building blocks for synthetic toll records.
+
+Shared by create_data.py, which draws every column at random, and
+simulate_traffic.py, which simulates a recurring fleet. A batch is a dict of
+NumPy arrays keyed by TOLL_RECORD_COLUMNS: string columns are fixed-width byte
+strings, `toll_point_id` and `vehicle_type` are also available as integer
+codes (`toll_point_code`, `vehicle_type_code`) into `toll_points` /
+`vehicle_types`, and `timestamp` is datetime64[us] in UTC.
+"""
+import numpy as np
+
+# Define realistic toll points
+toll_points = [
+    "TP-001", "TP-002", "TP-003", "TP-004", "TP-005",
+    "TP-006", "TP-007", "TP-008", "TP-009", "TP-010"
+]
+
+# Vehicle types
+vehicle_types = ["Car", "Truck", "Bus", "Motorcycle", "Van"]
+
+# Columns of a batch, in toll_records schema order.
+TOLL_RECORD_COLUMNS = ["record_id", "plate_number", "toll_point_id", "timestamp", "vehicle_type", "image_url"]
+
+_HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+_IMAGE_URL_PREFIX = np.frombuffer(b"http://example.com/images/", dtype=np.uint8)
+_IMAGE_URL_SUFFIX = np.frombuffer(b".jpg", dtype=np.uint8)
+
+
+def fixed_width_strings(byte_matrix):
+    """View an (n, width) uint8 matrix of ASCII codes as an array of n fixed-width byte strings."""
+    byte_matrix = np.ascontiguousarray(byte_matrix)
+    return byte_matrix.view(f"S{byte_matrix.shape[1]}").ravel()
+
+
+def generate_uuid4_bytes(rng, n):
+    """Generate n random version 4 UUIDs as (n, 36) ASCII codes in canonical form."""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+
+    hex_codes = np.empty((n, 32), dtype=np.uint8)
+    hex_codes[:, 0::2] = _HEX_DIGITS[raw >> 4]
+    hex_codes[:, 1::2] = _HEX_DIGITS[raw & 0x0F]
+
+    uuids = np.full((n, 36), ord("-"), dtype=np.uint8)
+    uuids[:, 0:8] = hex_codes[:, 0:8]
+    uuids[:, 9:13] = hex_codes[:, 8:12]
+    uuids[:, 14:18] = hex_codes[:, 12:16]
+    uuids[:, 19:23] = hex_codes[:, 16:20]
+    uuids[:, 24:36] = hex_codes[:, 20:32]
+    return uuids
+
+
+def generate_plate_bytes(rng, n):
+    """Generate n random 'AAA-999' plates as (n, 7) ASCII codes."""
+    plates = np.full((n, 7), ord("-"), dtype=np.uint8)
+    plates[:, 0:3] = rng.integers(ord("A"), ord("Z") + 1, size=(n, 3), dtype=np.uint8)
+    plates[:, 4:7] = rng.integers(ord("0"), ord("9") + 1, size=(n, 3), dtype=np.uint8)
+    return plates
+
+
+def make_toll_records_batch(uuids, plate_numbers, toll_point_codes, timestamps, vehicle_type_codes):
+    """
+    Assemble a batch from its generated columns.
+
+    Args:
+        uuids (np.ndarray): (n, 36) ASCII codes of the record ids, as from generate_uuid4_bytes.
+        plate_numbers (np.ndarray): n fixed-width byte strings.
+        toll_point_codes (np.ndarray): n indexes into `toll_points`.
+        timestamps (np.ndarray): n datetime64[us] values in UTC.
+        vehicle_type_codes (np.ndarray): n indexes into `vehicle_types`.
+    """
+    n = len(uuids)
+    image_urls = np.concatenate(
+        [np.broadcast_to(_IMAGE_URL_PREFIX, (n, _IMAGE_URL_PREFIX.size)), uuids,
+         np.broadcast_to(_IMAGE_URL_SUFFIX, (n, _IMAGE_URL_SUFFIX.size))],
+        axis=1,
+    )
+    toll_point_codes = np.asarray(toll_point_codes, dtype=np.int8)
+    vehicle_type_codes = np.asarray(vehicle_type_codes, dtype=np.int8)
+    return {
+        "record_id": fixed_width_strings(uuids),
+        "plate_number": plate_numbers,
+        "toll_point_id": np.array(toll_points, dtype="S")[toll_point_codes],
+        "toll_point_code": toll_point_codes,
+        "timestamp": timestamps,
+        "vehicle_type": np.array(vehicle_types, dtype="S")[vehicle_type_codes],
+        "vehicle_type_code": vehicle_type_codes,
+        "image_url": fixed_width_strings(image_urls),
+    }
+
+
+def toll_records_batch_to_arrow(batch):
+    """Convert a batch into a pyarrow Table."""
+    import pyarrow as pa
+
+    return pa.table({
+        "record_id": pa.array(batch["record_id"], type=pa.binary()).cast(pa.string()),
+        "plate_number": pa.array(batch["plate_number"], type=pa.binary()).cast(pa.string()),
+        "toll_point_id": pa.DictionaryArray.from_arrays(batch["toll_point_code"], pa.array(toll_points)),
+        "timestamp": pa.array(batch["timestamp"], type=pa.timestamp("us", tz="UTC")),
+        "vehicle_type": pa.DictionaryArray.from_arrays(batch["vehicle_type_code"], pa.array(vehicle_types)),
+        "image_url": pa.array(batch["image_url"], type=pa.binary()).cast(pa.string()),
+    })
+
+
+def toll_records_batch_to_ndjson(batch):
+    """Render a batch as newline-delimited JSON bytes."""
+    timestamps = np.datetime_as_string(batch["timestamp"], unit="us").astype("S")
+    lines = b'{"record_id": "' + batch["record_id"]
+    lines = lines + b'", "plate_number": "' + batch["plate_number"]
+    lines = lines + b'", "toll_point_id": "' + batch["toll_point_id"]
+    lines = lines + b'", "timestamp": "' + timestamps
+    lines = lines + b'Z", "vehicle_type": "' + batch["vehicle_type"]
+    lines = lines + b'", "image_url": "' + batch["image_url"] + b'"}'
+    return b"\n".join(lines.tolist()) + b"\n"
@@ -0,0 +1,139 @@
+"""
+Following new toll reads for the in-process structures built from the table.
+
+The plate index, rollups, sketches and the other structures behind the tools
+are built once from the whole table. A `TableTail` keeps one of them current
+afterwards: `poll` reads the rows with a timestamp after the structure's
+high-water mark, less `lateness_seconds` for reads that land a little out of
+order, and passes the ones it has not seen before to the structure. Reads are
+recognized by record_id, and only the ids inside the lateness window are
+remembered, so memory stays bounded. Rows ingested in this process can be
+handed over with `deliver` as well; a read both delivered and polled is only
+applied once.
+
+Polls are cheap. They run at most every `min_interval_seconds`, only once the
+backend reports a new table version, and their constant lower bound on
+timestamp means only the latest partitions are read. A read that lands after
+the mark has moved more than `lateness_seconds` past its timestamp, or while
+the structure is being built, is not picked up.
+"""
+from typing import List, Dict, Any, Callable, Iterable, Optional
+import logging
+import threading
+import time
+from .backends import partition_range
+from .columnar import from_micros
+from .resultset import ResultSet, as_rows, column_values, timestamp_micros
+
+logger = logging.getLogger(__name__)
+
+
+class TableTail:
+    """Feeds reads added to `table` after a structure was built into that structure's `apply`."""
+
+    def __init__(self, apply: Callable[[List[Dict[str, Any]]], None], run_query: Callable[..., ResultSet],
+                 table: str, table_version: Optional[Callable[[], Any]] = None,
+                 lateness_seconds: float = 300.0, min_interval_seconds: float = 5.0):
+        self.apply = apply
+        self.run_query = run_query
+        self.table = table
+        self.table_version = table_version
+        self.lateness_micros = int(lateness_seconds * 1_000_000)
+        self.min_interval_seconds = min_interval_seconds
+        # Latest timestamp applied, in epoch microseconds; None until the table has rows.
+        self.watermark: Optional[int] = None
+        # record_id -> timestamp of the reads applied within the lateness window.
+        self._seen: Dict[str, int] = {}
+        self._version: Any = None
+        self._polled_at = float("-inf")
+        self._lock = threading.Lock()
+        self.applied = 0
+
+    def start(self) -> None:
+        """
+        Take the table as it is now as already applied.
+
+        Call right after building the structure from the table.
+        """
+        with self._lock:
+            self._version = self._current_version()
+            self._polled_at = time.monotonic()
+            rows = self.run_query(f"select unix_micros(max(timestamp)) as latest from `{self.table}`;")
+            latest = rows[0]["latest"] if rows else None
+            if latest is None:
+                return
+            self.watermark = latest
+            recent = self.run_query(f"""
+            select record_id, unix_micros(timestamp) as timestamp_micros
+            from `{self.table}`
+            where timestamp > @since
+            {partition_range("@since")};
+            """, {"since": from_micros(latest - self.lateness_micros)})
+            self._seen = dict(zip(column_values(recent, "record_id"), column_values(recent, "timestamp_micros")))
+
+    def poll(self, force: bool = False) -> int:
+        """
+        Apply the reads added since the last poll; returns how many.
+
+        Skipped, returning 0, within `min_interval_seconds` of the last poll
+        (unless `force`), while another thread is polling, or when the table
+        version has not changed. A failed poll is logged and retried later
+        rather than failing the caller, which keeps serving what it has.
+        """
+        if not force and time.monotonic() - self._polled_at < self.min_interval_seconds:
+            return 0
+        if not self._lock.acquire(blocking=force):
+            return 0
+        try:
+            self._polled_at = time.monotonic()
+            try:
+                version = self._current_version()
+                if version is not None and version == self._version and not force:
+                    return 0
+                query = f"""
+                select record_id, plate_number, toll_point_id, unix_micros(timestamp) as timestamp_micros,
+                  vehicle_type, image_url
+                from `{self.table}`
+                """
+                params = {}
+                if self.watermark is not None:
+                    query += f"where timestamp > @since\n{partition_range('@since')}\n"
+                    params["since"] = from_micros(self.watermark - self.lateness_micros)
+                rows = self.run_query(query + "order by timestamp;", params)
+            except Exception as e:
+                logger.warning(f"Could not poll {self.table} for new reads: {e}")
+                return 0
+            self._version = version
+            return self._apply(rows)
+        finally:
+            self._lock.release()
+
+    def deliver(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Apply rows ingested in this process, skipping any already applied; returns how many were applied."""
+        with self._lock:
+            return self._apply(rows)
+
+    def _current_version(self) -> Any:
+        return self.table_version() if self.table_version is not None else None
+
+    def _apply(self, rows: Iterable[Dict[str, Any]]) -> int:
+        rows = as_rows(rows)
+        if not len(rows):
+            return 0
+        new_rows, new_micros = [], []
+        for row, record_id, micros in zip(rows, column_values(rows, "record_id", None), timestamp_micros(rows)):
+            if record_id is not None and record_id in self._seen:
+                continue
+            new_rows.append(dict(row))
+            new_micros.append(micros)
+            if record_id is not None:
+                self._seen[record_id] = micros
+        if not new_rows:
+            return 0
+        self.apply(new_rows)
+        self.applied += len(new_rows)
+        self.watermark = max(new_micros) if self.watermark is None else max(self.watermark, *new_micros)
+        horizon = self.watermark - self.lateness_micros
+        self._seen = {record_id: micros for record_id, micros in self._seen.items() if micros > horizon}
+        logger.info(f"Applied {len(new_rows)} new reads from {self.table}")
+        return len(new_rows)
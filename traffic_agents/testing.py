@@ -0,0 +1,111 @@
+"""
+A scripted stand-in for the LLM, so the agent can run offline in tests and load tests.
+
+`ScriptedLlm` answers every request by playing the part of the agent that sent
+it, recognised from ADK's "Your internal name is ..." instruction, according to
+`script`: the planner calls the plan generator and, once the user approves,
+transfers to the research coordinator; the researcher calls the toll tools with
+the plate and window from the user's incident report; every other agent writes
+fixed findings. Runs are deterministic and need no model endpoint, while the
+agents, callbacks and tools run for real.
+
+    model = ScriptedLlm(model="stub", delay=0.0)
+    runner = InMemoryRunner(agent=create_root_agent("pipeline", model=model))
+"""
+from typing import List, Dict, Any, AsyncGenerator
+import asyncio
+import re
+import time
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import Field
+
+_AGENT_NAME = re.compile(r'Your internal name is "(\w+)"')
+_INCIDENT = re.compile(r"plate (\S+) between (.+? UTC) and (.+? UTC)")
+
+# The user's second turn, approving the proposed plan.
+APPROVAL = "Looks good, run it."
+CCTV_FINDINGS = "CCTV: vehicle changes lanes without signalling at 10:02."
+DATABASE_FINDINGS = "Database: the vehicle passed the incident toll point in the window."
+FINAL_REPORT = "# Incident report\n\nFindings and sources."
+
+
+def incident_report(plate_number: str, start_timestamp: str, end_timestamp: str) -> str:
+    """The user's first turn, in the form `script` reads the plate and window from."""
+    return (f"There was an incident on the Monash Freeway involving plate {plate_number} between "
+            f"{start_timestamp} and {end_timestamp}. Help me investigate it.")
+
+
+def _text(request: LlmRequest) -> str:
+    return "\n".join(part.text for content in request.contents for part in content.parts or [] if part.text)
+
+
+def agent_name(request: LlmRequest) -> str:
+    """The name of the agent that sent `request`."""
+    instruction = request.config.system_instruction if request.config else None
+    match = _AGENT_NAME.search(instruction if isinstance(instruction, str) else str(instruction or ""))
+    return match.group(1) if match else "unknown"
+
+
+def script(agent: str, request: LlmRequest) -> List[types.Part]:
+    """The parts `agent` responds with, given the conversation so far in `request`."""
+    last = request.contents[-1] if request.contents else None
+    last_parts = (last.parts or []) if last else []
+    after_tools = any(part.function_response for part in last_parts)
+    last_text = " ".join(part.text for part in last_parts if part.text)
+    can_transfer = "transfer_to_agent" in request.tools_dict
+
+    def call(name, **args):
+        return types.Part.from_function_call(name=name, args=args)
+
+    def transfer(target):
+        return [call("transfer_to_agent", agent_name=target)] if can_transfer else []
+
+    if agent == "interactive_planner_agent":
+        if after_tools:
+            return [types.Part(text="Here is the proposed research plan. Shall I run it?")]
+        if APPROVAL in last_text:
+            return transfer("research_coordinator_agent")
+        return [call("plan_generator", request=last_text)]
+    if agent == "plan_generator":
+        return [types.Part(text="1. Review the CCTV footage.\n2. Trace the vehicle's toll records.\n"
+                                "3. Reconstruct its journeys.\n4. Check traffic density.\n5. Compose the report.")]
+    if agent == "research_coordinator_agent":
+        return transfer("cctv_analysis_agent")
+    if agent == "cctv_analysis_agent":
+        return [types.Part(text=CCTV_FINDINGS)] + transfer("internal_research_executor")
+    if agent == "internal_research_executor":
+        if after_tools:
+            return [types.Part(text=DATABASE_FINDINGS)] + transfer("report_composer_with_citations")
+        incident = _INCIDENT.search(_text(request))
+        plate, start, end = incident.groups()
+        calls = [
+            ("get_toll_records_by_plate_number", {"plate_number": plate, "start_timestamp": start, "end_timestamp": end}),
+            ("get_vehicle_journeys", {"plate_numbers": [plate]}),
+            ("get_vehicle_count_by_toll_point", {"start_timestamp": start, "end_timestamp": end}),
+        ]
+        return [call(name, **args) for name, args in calls if name in request.tools_dict]
+    if agent == "report_composer_with_citations":
+        return [types.Part(text=FINAL_REPORT)]
+    return [types.Part(text=f"Stub output from {agent}.")]
+
+
+class ScriptedLlm(BaseLlm):
+    """Plays each agent's scripted part after `delay` seconds, recording calls and time per agent."""
+
+    delay: float = 0.2
+    usage: Dict[str, Dict[str, float]] = Field(default_factory=dict)
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        started = time.perf_counter()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        agent = agent_name(llm_request)
+        parts = script(agent, llm_request)
+        usage: Dict[str, Any] = self.usage.setdefault(agent, {"calls": 0, "seconds": 0.0})
+        usage["calls"] += 1
+        usage["seconds"] += time.perf_counter() - started
+        yield LlmResponse(content=types.Content(role="model", parts=parts))
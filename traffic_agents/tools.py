@@ -1,77 +1,1101 @@
-from google.cloud import bigquery
-from typing import List, Dict, Any
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import logging
+import threading
+from .anomalies import ALERT_KINDS, AnomalyEngine
+from .backends import QueryBackend, create_backend, partition_range
+from .cache import QueryCache, query_key, referenced_tables
+from .colocation import TollPointIndex, merge_windows, summarize_witnesses
+from .columnar import from_micros, to_micros
 from .config import config
+from .encoding import encode_compact, encoding_stats
+from .fuzzy_plates import FuzzyPlateIndex, normalize_plate
+from .journeys import reconstruct_journeys
+from .instrumentation import instrumentation, set_attributes, span, traced_tool
+from .pagination import ResultPager
+from .plate_index import PlateIndex
+from .resultset import ResultSet
+from .rollups import RollupStore
+from .sketches import SketchStore
+from .singleflight import SingleFlight
+from .tail import TableTail
 
-client = bigquery.Client(project=config.PROJECT_ID)
 logger = logging.getLogger(__name__)
 
+# Created on first use by get_backend(), so importing the tools stays cheap.
+_backend: Optional[QueryBackend] = None
+_backend_lock = threading.Lock()
 
-def execute_query(query: str) -> List[Dict[str, Any]]:
+TOLL_RECORDS_TABLE = f"{config.PROJECT_ID}.{config.DATASET_ID}.toll_records"
+TOLL_RECORD_COLUMNS = ("record_id", "plate_number", "toll_point_id", "timestamp", "vehicle_type", "image_url")
+
+query_cache = QueryCache(
+    max_entries=config.query_cache_max_entries,
+    version_check_interval=config.query_cache_version_check_seconds,
+    table_version=lambda table: get_backend().table_version(table),
+)
+
+# Identical queries running at the same time share one backend job.
+query_flights = SingleFlight()
+
+_plate_index: Optional[PlateIndex] = None
+result_pager = ResultPager(max_open=config.max_open_result_cursors, ttl=config.result_cursor_ttl_seconds)
+
+_rollup_store: Optional[RollupStore] = None
+_sketch_store: Optional[SketchStore] = None
+_anomaly_engine: Optional[AnomalyEngine] = None
+_fuzzy_plate_index: Optional[FuzzyPlateIndex] = None
+_toll_point_index: Optional[TollPointIndex] = None
+_build_lock = threading.Lock()
+# Structure name -> the tail feeding it the reads added to the table after it was built.
+_tails: Dict[str, TableTail] = {}
+
+
+def get_backend() -> QueryBackend:
+    """Return the shared query backend selected by `config.query_backend`, creating it on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(config)
+    return _backend
+
+
+def set_backend(new_backend: QueryBackend) -> None:
+    """Use `new_backend` for every tool, e.g. to wrap the configured backend or point at test data."""
+    global _backend
+    with _backend_lock:
+        _backend = new_backend
+    query_cache.clear()
+
+
+def __getattr__(name: str) -> Any:
+    # `tools.backend` predates lazy creation; keep it working.
+    if name == "backend":
+        return get_backend()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def parse_timestamp(value: str) -> datetime:
     """
-    Execute a BigQuery SQL query and return results as a list of dictionaries.
-    
-    This simplified version streams results directly from the BigQuery API
-    without using pandas, avoiding complex data cleaning.
+    Parse a timestamp string such as '2023-01-01 00:00:00 UTC' into an aware datetime.
+
+    Accepts ISO 8601 strings with or without an offset and the BigQuery style
+    ' UTC' suffix. Timestamps without an offset are treated as UTC.
     """
-    try:
-        logger.info(f"Executing query: {query[:150]}...")
-        
-        # 1. Execute the query
-        query_job = client.query(query)
-        
-        # 2. Get the RowIterator from the results
-        results = query_job.result()
-        
-        # 3. Convert the RowIterator directly to a list of dicts
-        # The `bigquery.Row` object behaves like a dict, so
-        # we can just cast it. The client library handles
-        # BQ types (e.g., TIMESTAMP) to Python types (e.g., datetime.datetime).
-        records = [dict(row) for row in results]
-        
+    value = value.strip()
+    if value.upper().endswith(" UTC"):
+        value = value[:-4]
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def execute_query(query: str, params: Optional[Dict[str, Any]] = None,
+                  cache_ttl: Optional[float] = None, coalesce: bool = True) -> ResultSet:
+    """
+    Execute a SQL query on the configured backend and return its rows as a `ResultSet`.
+
+    Queries use BigQuery Standard SQL with named `@parameters`; `params` binds
+    those parameters by name so values are never interpolated into the SQL.
+
+    The rows stay in Arrow columns: aggregate over `values` or `numpy`, index or
+    iterate for lazy row views, and only call `to_pylist` for rows returned to
+    the agent. Result sets are immutable, so cached and coalesced results are
+    shared rather than copied.
+
+    Results are served from `query_cache` when enabled. `cache_ttl` sets how
+    long this result may be reused (defaults to `config.query_cache_default_ttl`;
+    0 bypasses the cache).
+
+    With `coalesce` (and `config.single_flight_enabled`), a call made while an
+    identical query (same normalized SQL and parameters) is already running
+    waits for that query's result instead of starting another job.
+    """
+    backend = get_backend()
+    with span("execute_query", kind="query", backend=backend.name, sql=query[:500]) as query_span:
+        if coalesce and config.single_flight_enabled:
+            records, coalesced = query_flights.do(
+                query_key(query, params), partial(_execute_query, backend, query, params, cache_ttl)
+            )
+            if coalesced:
+                logger.info(f"Joined in-flight query: {query[:150]}...")
+                query_span.set(coalesced=True)
+        else:
+            records = _execute_query(backend, query, params, cache_ttl)
+        query_span.set(rows=len(records))
         return records
-        
+
+
+def _execute_query(backend: QueryBackend, query: str, params: Optional[Dict[str, Any]],
+                   cache_ttl: Optional[float]) -> ResultSet:
+    if cache_ttl is None:
+        cache_ttl = config.query_cache_default_ttl
+    use_cache = config.query_cache_enabled and cache_ttl > 0
+    if use_cache:
+        key = query_key(query, params)
+        cached = query_cache.get(key)
+        if cached is not None:
+            logger.info(f"Query cache hit: {query[:150]}...")
+            set_attributes(cache_hit=True)
+            return cached
+
+    try:
+        logger.info(f"Executing query on {backend.name}: {query[:150]}...")
+        records = ResultSet(backend.execute_arrow(query, params))
+
     except Exception as e:
         logger.error(f"Error executing query: {e}")
         raise
 
+    set_attributes(cache_hit=False)
+    if use_cache:
+        query_cache.put(key, records, cache_ttl, referenced_tables(query))
+    return records
+
+
+def iter_query(query: str, params: Optional[Dict[str, Any]] = None,
+               cache_ttl: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Like `execute_query`, but yield rows lazily as the backend returns them.
+
+    Results of up to `config.query_cache_max_rows` rows are read in full and
+    cached before the first row is yielded, however many rows the caller reads;
+    larger results are streamed through without being held in memory.
+    Identical concurrent reads share one backend stream while it has read at
+    most `config.query_cache_max_rows` rows.
+    """
+    if cache_ttl is None:
+        cache_ttl = config.query_cache_default_ttl
+    use_cache = config.query_cache_enabled and cache_ttl > 0
+    # The generator may be resumed from other threads as pages are read, so its
+    # span is never made current; it ends when the rows run out or the cursor closes.
+    backend = get_backend()
+    query_span = instrumentation.start_span("iter_query", kind="query", backend=backend.name, sql=query[:500]) \
+        if instrumentation.enabled else None
+    rows = 0
+    try:
+        key = query_key(query, params)
+        if use_cache:
+            cached = query_cache.get(key)
+            if cached is not None:
+                logger.info(f"Query cache hit: {query[:150]}...")
+                if query_span:
+                    query_span.set(cache_hit=True)
+                for row in cached.iter_dicts():
+                    rows += 1
+                    yield row
+                return
+
+        if query_span:
+            query_span.set(cache_hit=False)
+        stream = partial(_stream_query, backend, query, params, key if use_cache else None, cache_ttl)
+        coalesced = False
+        if config.single_flight_enabled:
+            results, coalesced = query_flights.stream(
+                key, stream, config.query_cache_max_rows, config.single_flight_max_join_seconds
+            )
+        else:
+            results = stream()
+        if coalesced:
+            logger.info(f"Joined in-flight query stream: {query[:150]}...")
+            if query_span:
+                query_span.set(coalesced=True)
+        try:
+            for row in results:
+                rows += 1
+                yield dict(row) if coalesced else row
+        except Exception as e:
+            if query_span:
+                query_span.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            # Release our place in the stream (or the backend cursor) if the caller stops early.
+            results.close()
+    finally:
+        if query_span:
+            query_span.set(rows=rows)
+            instrumentation.end_span(query_span)
+
+
+def _stream_query(backend: QueryBackend, query: str, params: Optional[Dict[str, Any]],
+                  cache_key: Optional[tuple], cache_ttl: float) -> Iterator[Dict[str, Any]]:
+    """
+    Stream rows from the backend, caching the result if it is small and `cache_key` is given.
+
+    A cacheable result is read up to `config.query_cache_max_rows` rows before
+    the first row is yielded, so a small result is cached even when the reader
+    stops early, e.g. a pager cursor that is never read past its first page.
+    """
+    try:
+        logger.info(f"Streaming query on {backend.name}: {query[:150]}...")
+        rows = backend.execute_iter(query, params)
+        if cache_key is not None:
+            buffered = list(islice(rows, config.query_cache_max_rows + 1))
+            if len(buffered) <= config.query_cache_max_rows:
+                # Cached as a result set, like execute_query's, as both share cache keys.
+                query_cache.put(cache_key, ResultSet.from_rows(buffered), cache_ttl, referenced_tables(query))
+            yield from buffered
+        yield from rows
+
+    except Exception as e:
+        logger.error(f"Error executing query: {e}")
+        raise
+
+
+def _tool_cache_ttl(tool_name: str) -> float:
+    return config.query_cache_ttls.get(tool_name, config.query_cache_default_ttl)
+
+
+def _statement(tool_name: str):
+    """The `tools.yaml` statement of the same name, which runs a tool's plain query (see toolset.py)."""
+    # toolset.py imports this module.
+    from .toolset import prepared_tool
+
+    return prepared_tool(tool_name)
+
+
+def get_query_cache_stats() -> Dict[str, Any]:
+    """Hit/miss/eviction counters for the query result cache, for sizing it."""
+    stats = query_cache.stats()
+    return dict(vars(stats), hit_rate=stats.hit_rate)
+
+
+def get_single_flight_stats() -> Dict[str, Any]:
+    """How many identical in-flight queries were coalesced, i.e. warehouse jobs saved."""
+    stats = query_flights.stats()
+    return dict(vars(stats), jobs_saved=stats.coalesced)
+
+
+def _follow(name: str, apply) -> TableTail:
+    """Feed the reads added to the table from now on to `apply`; call right after building structure `name`."""
+    tail = TableTail(
+        apply, partial(execute_query, cache_ttl=0), TOLL_RECORDS_TABLE,
+        table_version=lambda: get_backend().table_version(TOLL_RECORDS_TABLE),
+        lateness_seconds=config.index_refresh_lateness_seconds, min_interval_seconds=config.index_refresh_seconds,
+    )
+    tail.start()
+    _tails[name] = tail
+    return tail
+
+
+def _refresh(name: str) -> None:
+    """Fold reads added to the table since structure `name` was last refreshed into it."""
+    tail = _tails.get(name)
+    if tail is not None:
+        tail.poll()
+
+
+def get_plate_index() -> Optional[PlateIndex]:
+    """
+    Return the in-process plate index, building it on first use when enabled in config.
+
+    Reads added to the table after the build are folded in (see `_refresh`).
+    """
+    global _plate_index
+    if not config.plate_index_enabled:
+        return None
+    if _plate_index is None:
+        with _build_lock:
+            if _plate_index is None:
+                index = PlateIndex.build(partial(execute_query, cache_ttl=0), TOLL_RECORDS_TABLE)
+                _follow("plate_index", index.add_records)
+                _plate_index = index
+    _refresh("plate_index")
+    return _plate_index
+
+
+def get_rollup_store() -> Optional[RollupStore]:
+    """
+    Return the vehicle count rollups, building them on first use when enabled in config.
+
+    Reads added to the table after the build are folded in (see `_refresh`).
+    """
+    global _rollup_store
+    if not config.rollups_enabled:
+        return None
+    if _rollup_store is None:
+        with _build_lock:
+            if _rollup_store is None:
+                store = RollupStore.build(
+                    partial(execute_query, cache_ttl=0), TOLL_RECORDS_TABLE, config.rollup_bucket_seconds
+                )
+                _follow("rollups", store.add_records)
+                _rollup_store = store
+    _refresh("rollups")
+    return _rollup_store
+
+
+def get_sketch_store() -> Optional[SketchStore]:
+    """
+    Return the distinct vehicle and frequent plate sketches, building them on first use when enabled in config.
+
+    Reads added to the table after the build are folded in (see `_refresh`).
+    """
+    global _sketch_store
+    if not config.sketches_enabled:
+        return None
+    if _sketch_store is None:
+        with _build_lock:
+            if _sketch_store is None:
+                store = SketchStore.build(
+                    partial(iter_query, cache_ttl=0), TOLL_RECORDS_TABLE,
+                    bucket_seconds=config.sketch_bucket_seconds, precision=config.sketch_hll_precision,
+                    width=config.sketch_cm_width, depth=config.sketch_cm_depth, top_k=config.sketch_top_k,
+                    max_buckets=config.sketch_max_buckets,
+                )
+                _follow("sketches", store.add_records)
+                _sketch_store = store
+    _refresh("sketches")
+    return _sketch_store
+
+
+def get_toll_point_index() -> Optional[TollPointIndex]:
+    """
+    Return the per-toll-point read index, building it on first use when enabled in config.
+
+    Reads added to the table after the build are folded in (see `_refresh`).
+    """
+    global _toll_point_index
+    if not config.colocation_index_enabled:
+        return None
+    if _toll_point_index is None:
+        with _build_lock:
+            if _toll_point_index is None:
+                index = TollPointIndex.build(partial(execute_query, cache_ttl=0), TOLL_RECORDS_TABLE)
+                _follow("toll_point_index", index.add_records)
+                _toll_point_index = index
+    _refresh("toll_point_index")
+    return _toll_point_index
+
+
+def get_fuzzy_plate_index() -> Optional[FuzzyPlateIndex]:
+    """
+    Return the fuzzy plate index over the distinct plates in the table, building it on first use when enabled in config.
+
+    Reads added to the table after the build are folded in (see `_refresh`).
+    """
+    global _fuzzy_plate_index
+    if not config.fuzzy_plate_index_enabled:
+        return None
+    if _fuzzy_plate_index is None:
+        with _build_lock:
+            if _fuzzy_plate_index is None:
+                index = FuzzyPlateIndex.build(
+                    partial(execute_query, cache_ttl=0), TOLL_RECORDS_TABLE,
+                    max_edits=config.fuzzy_plate_max_edits, confusion_cost=config.fuzzy_plate_confusion_cost,
+                )
+                _follow("fuzzy_plates", index.add_records)
+                _fuzzy_plate_index = index
+    _refresh("fuzzy_plates")
+    return _fuzzy_plate_index
+
+
+def get_anomaly_engine() -> Optional[AnomalyEngine]:
+    """
+    Return the streaming anomaly detector, starting it on first use when enabled in config.
+
+    A new detector replays the last `config.anomaly_backfill_seconds` of toll
+    reads from the table in time order, then follows reads added to the table
+    (see `_refresh`).
+    """
+    global _anomaly_engine
+    if not config.anomaly_detection_enabled:
+        return None
+    if _anomaly_engine is None:
+        with _build_lock:
+            if _anomaly_engine is None:
+                engine = AnomalyEngine(
+                    config.toll_point_positions_km,
+                    max_speed_kmh=config.anomaly_max_speed_kmh,
+                    clone_speed_kmh=config.anomaly_clone_speed_kmh,
+                    convoy_headway_seconds=config.anomaly_convoy_headway_seconds,
+                    convoy_min_points=config.anomaly_convoy_min_points,
+                    max_tracked_plates=config.anomaly_max_tracked_plates,
+                    max_alerts=config.anomaly_max_alerts,
+                )
+                latest = None
+                if config.anomaly_backfill_seconds > 0:
+                    rows = execute_query(f"select max(timestamp) as latest from `{TOLL_RECORDS_TABLE}`;", cache_ttl=0)
+                    latest = rows[0]["latest"] if rows else None
+                if latest is not None:
+                    # A constant lower bound on timestamp, so only the latest partitions are read.
+                    query = f"""
+                    select plate_number, toll_point_id, unix_micros(timestamp) as timestamp_micros
+                    from `{TOLL_RECORDS_TABLE}`
+                    where timestamp >= @since
+                    {partition_range("@since")}
+                    order by timestamp;
+                    """
+                    params = {"since": latest - timedelta(seconds=config.anomaly_backfill_seconds)}
+                    engine.consume(iter_query(query, params, cache_ttl=0))
+                    logger.info(f"Started anomaly detector after replaying {engine.events} toll reads")
+                _follow("anomalies", engine.consume)
+                _anomaly_engine = engine
+    _refresh("anomalies")
+    return _anomaly_engine
+
+
+def on_new_toll_records(rows: Iterable[Dict[str, Any]]) -> None:
+    """
+    Fold newly ingested toll_records rows into the in-process structures behind the tools.
+
+    Pass this as an ingest listener (see `ingest.ingest_rows`) when ingest runs
+    in the agent's process, so the structures see rows as soon as they are
+    written rather than on their next poll of the table. Rows a structure has
+    already polled are skipped. Structures that have not been built yet are
+    skipped too, as they will pick the rows up from the table when they are.
+    """
+    rows = list(rows)
+    query_cache.invalidate_table(TOLL_RECORDS_TABLE)
+    query_flights.forget_streams()
+    for tail in list(_tails.values()):
+        tail.deliver(rows)
+
+
+def _partition_range(start: Optional[datetime], end: Optional[datetime]) -> str:
+    """The `partition_range` hint for a query filtering on optional @start_timestamp / @end_timestamp."""
+    return partition_range("@start_timestamp" if start else None, "@end_timestamp" if end else None)
+
+
+def _page_size(page_size: Optional[int]) -> int:
+    return max(1, min(page_size or config.tool_page_size, config.tool_page_size))
+
+
+def _validate_columns(columns: Optional[List[str]]) -> Optional[List[str]]:
+    if not columns:
+        return None
+    unknown = [column for column in columns if column not in TOLL_RECORD_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns {unknown}; choose from {list(TOLL_RECORD_COLUMNS)}")
+    return list(columns)
+
+
+def _format_page(page: Dict[str, Any], result_format: Optional[str]) -> Dict[str, Any]:
+    """Apply the requested result format to a page of records."""
+    result_format = result_format or config.tool_result_format
+    if result_format == "rows":
+        return page
+    if result_format != "compact":
+        raise ValueError(f"Unknown result_format {result_format!r}; use 'rows' or 'compact'")
+    records = page["records"]
+    payload = encode_compact(records, templates=config.derived_columns)
+    stats = encoding_stats(records, payload)
+    logger.info(f"Compact encoding: {stats['plain_bytes']} -> {stats['compact_bytes']} bytes ({stats['reduction']:.0%} smaller)")
+    return {"records": payload, "next_cursor": page["next_cursor"], "encoding_stats": stats}
+
+
+def _toll_records_page(plate_numbers: List[str], start_timestamp: Optional[str], end_timestamp: Optional[str],
+                       columns: Optional[List[str]], page_size: Optional[int], cursor: Optional[str],
+                       tool_name: str, statement_arguments: Dict[str, Any],
+                       result_format: Optional[str]) -> Dict[str, Any]:
+    """
+    Return one page of toll records for `plate_numbers`, ordered by plate number and time.
+
+    Without an index, time bounds or columns, the records come from the `tool_name`
+    statement in tools.yaml, called with `statement_arguments`.
+    """
+    return _format_page(
+        _read_toll_records_page(plate_numbers, start_timestamp, end_timestamp, columns, page_size, cursor,
+                                tool_name, statement_arguments),
+        result_format,
+    )
+
+
+def _read_toll_records_page(plate_numbers: List[str], start_timestamp: Optional[str], end_timestamp: Optional[str],
+                            columns: Optional[List[str]], page_size: Optional[int], cursor: Optional[str],
+                            tool_name: str, statement_arguments: Dict[str, Any]) -> Dict[str, Any]:
+    page_size = _page_size(page_size)
+    if cursor:
+        return result_pager.next_page(cursor, page_size)
+
+    columns = _validate_columns(columns)
+    start = parse_timestamp(start_timestamp) if start_timestamp else None
+    end = parse_timestamp(end_timestamp) if end_timestamp else None
+
+    plate_index = get_plate_index()
+    if plate_index is not None:
+        rows = (record for plate in sorted(set(plate_numbers)) for record in plate_index.lookup(plate, start, end))
+        return result_pager.first_page(rows, page_size, columns)
+
+    if not (start or end or columns):
+        return result_pager.first_page(_statement(tool_name).iter_rows(**statement_arguments), page_size)
+
+    # Project in SQL so unused columns are never read, and filter every plate in one query.
+    query = f"""
+    select {", ".join(columns) if columns else "*"} from `{TOLL_RECORDS_TABLE}`
+    where plate_number in unnest(@plate_numbers)
+    """
+    params = {"plate_numbers": sorted(set(plate_numbers))}
+    if start:
+        query += "    and timestamp >= @start_timestamp\n"
+        params["start_timestamp"] = start
+    if end:
+        query += "    and timestamp <= @end_timestamp\n"
+        params["end_timestamp"] = end
+    query += f"    {_partition_range(start, end)}\n"
+    query += "    order by plate_number, timestamp;\n"
+    rows = iter_query(query, params, cache_ttl=_tool_cache_ttl(tool_name))
+    # Projection already happened in SQL.
+    return result_pager.first_page(rows, page_size)
+
 
-def get_toll_records_by_plate_number(plate_number: str = "NJL-694") -> List[Dict[str, Any]]:
+@traced_tool
+def get_toll_records_by_plate_number(plate_number: str = "NJL-694", start_timestamp: Optional[str] = None,
+                                     end_timestamp: Optional[str] = None, columns: Optional[List[str]] = None,
+                                     page_size: Optional[int] = None, cursor: Optional[str] = None,
+                                     result_format: Optional[str] = None) -> Dict[str, Any]:
     """
-    Get toll records by plate number.
-    
+    Get toll records by plate number, one page at a time, oldest first.
+
     Args:
         plate_number (str): The license plate number. Defaults to "NJL-694".
-    
+        start_timestamp (str, optional): Only return records at or after this time (e.g., '2023-01-01 00:00:00 UTC').
+        end_timestamp (str, optional): Only return records at or before this time (e.g., '2023-01-31 23:59:59 UTC').
+        columns (List[str], optional): Only return these columns, from record_id, plate_number,
+            toll_point_id, timestamp, vehicle_type and image_url. Defaults to all columns.
+        page_size (int, optional): Maximum records to return. Defaults to and is capped at 100.
+        cursor (str, optional): The 'next_cursor' from a previous call, to fetch the following page.
+            The other arguments except result_format are ignored when a cursor is given.
+        result_format (str, optional): "rows" for a list of records, or "compact" for a header of
+            'columns' plus value 'rows', with repeated values in 'dictionaries' and timestamps given
+            as seconds since the previous row (the first relative to 'timestamp_bases').
+
     Returns:
-        List[Dict[str, Any]]: A list of toll records, where each record is a dictionary.
+        Dict[str, Any]: 'records', a list of toll records, and 'next_cursor', which is null when
+        there are no more records.
     """
-    # Using f-string to build the query as shown in the provided example.
-    # Note: For production use, parameterized queries are safer against SQL injection.
-    query = f"""
-    select * from `ajmalaziz-814-20250326021733.tolls.toll_records`
-    where plate_number = '{plate_number}';
+    return _toll_records_page(
+        [plate_number], start_timestamp, end_timestamp, columns, page_size, cursor, "get_toll_records_by_plate_number",
+        {"plate_number": plate_number}, result_format,
+    )
+
+
+@traced_tool
+def get_toll_records_by_plate_numbers(plate_numbers: List[str], start_timestamp: Optional[str] = None,
+                                      end_timestamp: Optional[str] = None, columns: Optional[List[str]] = None,
+                                      page_size: Optional[int] = None, cursor: Optional[str] = None,
+                                      result_format: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get toll records for several plate numbers at once, e.g. all vehicles involved in an incident.
+
+    Args:
+        plate_numbers (List[str]): The license plate numbers.
+        start_timestamp (str, optional): Only return records at or after this time (e.g., '2023-01-01 00:00:00 UTC').
+        end_timestamp (str, optional): Only return records at or before this time (e.g., '2023-01-31 23:59:59 UTC').
+        columns (List[str], optional): Only return these columns, from record_id, plate_number,
+            toll_point_id, timestamp, vehicle_type and image_url. Defaults to all columns.
+        page_size (int, optional): Maximum records to return. Defaults to and is capped at 100.
+        cursor (str, optional): The 'next_cursor' from a previous call, to fetch the following page.
+            The other arguments except result_format are ignored when a cursor is given.
+        result_format (str, optional): "rows" for a list of records, or "compact" for a header of
+            'columns' plus value 'rows', with repeated values in 'dictionaries' and timestamps given
+            as seconds since the previous row (the first relative to 'timestamp_bases').
+
+    Returns:
+        Dict[str, Any]: 'records', toll records ordered by plate number and time, and 'next_cursor',
+        which is null when there are no more records.
+    """
+    return _toll_records_page(
+        plate_numbers, start_timestamp, end_timestamp, columns, page_size, cursor, "get_toll_records_by_plate_numbers",
+        {"plate_numbers": sorted(set(plate_numbers))}, result_format,
+    )
+
+
+@traced_tool
+def find_similar_plate_numbers(plate_number: str, max_edits: float = 1.0, limit: int = 20) -> Dict[str, Any]:
+    """
+    Find plates in the toll records that a possibly misread plate number could really be.
+
+    Plate readers often confuse characters such as O/0, I/1 and B/8, or miss or
+    add a character. Candidates are ranked by edit distance, where swapping a
+    commonly confused character costs only a fraction of an edit, then by how
+    often the plate was read. Separators and case are ignored.
+
+    Args:
+        plate_number (str): The plate number as read or reported (e.g., 'ABC-l23').
+        max_edits (float, optional): The largest edit distance to return, at most 2. Defaults to 1.
+        limit (int, optional): The maximum number of candidates to return. Defaults to 20.
+
+    Returns:
+        Dict[str, Any]: 'query', the normalized plate searched for, and 'candidates', a list of
+        dictionaries with 'plate_number', 'distance' (0 for an exact match) and 'reads'.
+    """
+    index = get_fuzzy_plate_index()
+    if index is not None:
+        candidates = index.search(plate_number, max_edits, limit)
+    else:
+        # Without the index, score every distinct plate in the table.
+        rows = execute_query(f"""
+        select plate_number, count(*) as reads
+        from `{TOLL_RECORDS_TABLE}`
+        group by plate_number;
+        """, cache_ttl=_tool_cache_ttl("find_similar_plate_numbers"))
+        scorer = FuzzyPlateIndex(max_edits=config.fuzzy_plate_max_edits,
+                                 confusion_cost=config.fuzzy_plate_confusion_cost)
+        candidates = scorer.scan(dict(zip(rows.values("plate_number"), rows.values("reads"))),
+                                 plate_number, max_edits, limit)
+    return {
+        "query": normalize_plate(plate_number),
+        "candidates": candidates,
+    }
+
+
+@traced_tool
+def find_witness_vehicles(plate_number: Optional[str] = None, window_seconds: float = 60.0,
+                          start_timestamp: Optional[str] = None, end_timestamp: Optional[str] = None,
+                          toll_point_ids: Optional[List[str]] = None, limit: int = 100) -> Dict[str, Any]:
+    """
+    Find vehicles that passed the same toll points as a target vehicle, or as an incident, at about the same time.
+
+    With `plate_number`, returns every other vehicle read at the same toll point
+    within `window_seconds` of any of the target's reads (optionally only reads
+    between `start_timestamp` and `end_timestamp`, or at `toll_point_ids`).
+    Without it, returns every vehicle read at `toll_point_ids` (or all toll
+    points) between `start_timestamp` and `end_timestamp`, e.g. an incident window.
+
+    Args:
+        plate_number (str, optional): The target vehicle's license plate number.
+        window_seconds (float, optional): How close in time a read must be to one of the target's reads. Defaults to 60.
+        start_timestamp (str, optional): Start of the time window (e.g., '2023-01-01 00:00:00 UTC').
+        end_timestamp (str, optional): End of the time window (e.g., '2023-01-01 01:00:00 UTC').
+        toll_point_ids (List[str], optional): Only consider these toll points.
+        limit (int, optional): The maximum number of witness plates and reads to return. Defaults to 100.
+
+    Returns:
+        Dict[str, Any]: 'target_reads', the number of target reads searched around (plate searches only);
+        'witness_plates', ranked by how many toll points they shared with the target, each with
+        plate_number, reads, toll_point_ids and closest_seconds; 'witness_reads', closest to a target read
+        first (plate searches) or in time order, with plate_number, toll_point_id, timestamp, vehicle_type
+        and seconds_from_target; and the total counts of both.
     """
-    return execute_query(query)
+    start = parse_timestamp(start_timestamp) if start_timestamp else None
+    end = parse_timestamp(end_timestamp) if end_timestamp else None
+    if plate_number is None and (start is None or end is None):
+        raise ValueError("Give a plate_number, or both start_timestamp and end_timestamp for an incident window")
+    points = set(toll_point_ids) if toll_point_ids else None
+    index = get_toll_point_index()
+    cache_ttl = _tool_cache_ttl("find_witness_vehicles")
 
+    if plate_number is None:
+        if index is not None:
+            reads = [
+                read
+                for toll_point_id in (sorted(points) if points else index.toll_point_ids)
+                for read in index.window(toll_point_id, to_micros(start), to_micros(end))
+            ]
+        else:
+            query = f"""
+            select plate_number, toll_point_id, unix_micros(timestamp) as timestamp_micros, vehicle_type
+            from `{TOLL_RECORDS_TABLE}`
+            where timestamp between @start_timestamp and @end_timestamp
+            {partition_range("@start_timestamp", "@end_timestamp")}
+            """
+            params = {"start_timestamp": start, "end_timestamp": end}
+            if points:
+                query += "    and toll_point_id in unnest(@toll_point_ids)\n"
+                params["toll_point_ids"] = sorted(points)
+            reads = execute_query(query, params, cache_ttl=cache_ttl)
+        return summarize_witnesses(reads, None, limit)
 
+    targets: Dict[str, List[int]] = {}
+    plate_index = get_plate_index()
+    if plate_index is not None:
+        for timestamp, toll_point_id in zip(*plate_index.trace(plate_number, start, end)):
+            targets.setdefault(toll_point_id, []).append(timestamp)
+    else:
+        query = f"""
+        select toll_point_id, unix_micros(timestamp) as timestamp_micros
+        from `{TOLL_RECORDS_TABLE}`
+        where plate_number = @plate_number
+        """
+        params = {"plate_number": plate_number}
+        if start:
+            query += "    and timestamp >= @start_timestamp\n"
+            params["start_timestamp"] = start
+        if end:
+            query += "    and timestamp <= @end_timestamp\n"
+            params["end_timestamp"] = end
+        query += f"    {_partition_range(start, end)}\n"
+        query += "    order by timestamp;\n"
+        target_reads = execute_query(query, params, cache_ttl=cache_ttl)
+        for toll_point_id, timestamp in zip(target_reads.values("toll_point_id"),
+                                            target_reads.values("timestamp_micros")):
+            targets.setdefault(toll_point_id, []).append(timestamp)
+    if points:
+        targets = {toll_point_id: times for toll_point_id, times in targets.items() if toll_point_id in points}
+
+    radius = int(window_seconds * 1_000_000)
+    reads = []
+    if index is not None:
+        for toll_point_id, times in targets.items():
+            for window_start, window_end in merge_windows(times, radius):
+                reads.extend(
+                    read for read in index.window(toll_point_id, window_start, window_end)
+                    if read["plate_number"] != plate_number
+                )
+    elif targets:
+        # Join the target's few reads to the table on toll point and a time range,
+        # rather than self-joining the whole table; the outer time bounds let the
+        # warehouse skip everything outside the target's reads.
+        query = f"""
+        with target as (
+          select toll_point_id, unix_micros(timestamp) as target_micros
+          from `{TOLL_RECORDS_TABLE}`
+          where plate_number = @plate_number
+            and toll_point_id in unnest(@toll_point_ids)
+            and timestamp between @target_start and @target_end
+        )
+        select distinct r.record_id, r.plate_number, r.toll_point_id,
+          unix_micros(r.timestamp) as timestamp_micros, r.vehicle_type
+        from `{TOLL_RECORDS_TABLE}` r
+        join target t on r.toll_point_id = t.toll_point_id
+        where r.timestamp between @scan_start and @scan_end
+          and unix_micros(r.timestamp) between t.target_micros - @window_micros and t.target_micros + @window_micros
+          and r.plate_number != @plate_number
+        {partition_range("@scan_start", "@scan_end")};
+        """
+        first = min(times[0] for times in targets.values())
+        last = max(times[-1] for times in targets.values())
+        params = {
+            "plate_number": plate_number,
+            "toll_point_ids": sorted(targets),
+            "target_start": from_micros(first),
+            "target_end": from_micros(last),
+            "scan_start": from_micros(first - radius),
+            "scan_end": from_micros(last + radius),
+            "window_micros": radius,
+        }
+        reads = execute_query(query, params, cache_ttl=cache_ttl)
+    result = summarize_witnesses(reads, {point: sorted(times) for point, times in targets.items()}, limit)
+    return dict(target_reads=sum(len(times) for times in targets.values()), **result)
+
+
+@traced_tool
+def get_vehicle_journeys(plate_numbers: List[str], start_timestamp: Optional[str] = None,
+                         end_timestamp: Optional[str] = None,
+                         max_gap_minutes: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Reconstruct the journeys of one or more vehicles from their toll reads.
+
+    Reads are split into journeys wherever a vehicle goes unseen for longer than
+    `max_gap_minutes`. Each journey summarises its route, timing, dwell time at
+    repeated toll points and the travel time, distance and implied speed of each
+    hop between toll points, instead of returning every raw read.
+
+    Args:
+        plate_numbers (List[str]): The license plate numbers.
+        start_timestamp (str, optional): Only use reads at or after this time (e.g., '2023-01-01 00:00:00 UTC').
+        end_timestamp (str, optional): Only use reads at or before this time (e.g., '2023-01-31 23:59:59 UTC').
+        max_gap_minutes (float, optional): Longest gap between reads within one journey. Defaults to 30.
+
+    Returns:
+        Dict[str, Any]: 'journeys', a list with plate_number, start_time, end_time, duration_seconds,
+        reads, route (toll points in order), dwell_seconds, gap_before_seconds (since the plate's
+        previous journey), distance_km, mean_speed_kmh, max_speed_kmh and hops; and
+        'plates_without_reads', the requested plates that had no reads in the window.
+    """
+    gap_seconds = max_gap_minutes * 60 if max_gap_minutes else config.journey_gap_seconds
+    start = parse_timestamp(start_timestamp) if start_timestamp else None
+    end = parse_timestamp(end_timestamp) if end_timestamp else None
+    plates, toll_points, timestamps = [], [], []
+
+    plate_index = get_plate_index()
+    if plate_index is not None:
+        for plate in sorted(set(plate_numbers)):
+            plate_timestamps, plate_toll_points = plate_index.trace(plate, start, end)
+            plates.extend([plate] * len(plate_timestamps))
+            toll_points.extend(plate_toll_points)
+            timestamps.extend(plate_timestamps)
+    else:
+        # Only the three columns the journeys need, already in journey order.
+        query = f"""
+        select plate_number, toll_point_id, unix_micros(timestamp) as timestamp_micros
+        from `{TOLL_RECORDS_TABLE}`
+        where plate_number in unnest(@plate_numbers)
+        """
+        params = {"plate_numbers": sorted(set(plate_numbers))}
+        if start:
+            query += "    and timestamp >= @start_timestamp\n"
+            params["start_timestamp"] = start
+        if end:
+            query += "    and timestamp <= @end_timestamp\n"
+            params["end_timestamp"] = end
+        query += f"    {_partition_range(start, end)}\n"
+        query += "    order by plate_number, timestamp;\n"
+        reads = execute_query(query, params, cache_ttl=_tool_cache_ttl("get_vehicle_journeys"))
+        plates = reads.values("plate_number")
+        toll_points = reads.values("toll_point_id")
+        timestamps = reads.numpy("timestamp_micros")
+
+    journeys = reconstruct_journeys(plates, toll_points, timestamps, gap_seconds, config.toll_point_positions_km)
+    seen = set(plates)
+    return {
+        "journeys": journeys,
+        "plates_without_reads": [plate for plate in sorted(set(plate_numbers)) if plate not in seen],
+    }
+
+
+def _count_vehicles(start_timestamp: str, end_timestamp: str, group_by: List[str],
+                    tool_name: str) -> List[Dict[str, Any]]:
+    """
+    Count vehicles in [start_timestamp, end_timestamp] grouped by `group_by` columns.
+
+    Counts come from the `tool_name` statement in tools.yaml. With rollups
+    enabled, whole buckets inside the window come from the rollup prefix sums
+    instead and only the partial buckets at either edge are counted from raw
+    rows, so results match the statement exactly.
+    """
+    start = parse_timestamp(start_timestamp)
+    end = parse_timestamp(end_timestamp)
+    columns = ", ".join(group_by)
+
+    rollups = get_rollup_store()
+    first_bucket, end_bucket = rollups.full_buckets(start, end) if rollups else (0, 0)
+    if first_bucket >= end_bucket:
+        return _statement(tool_name)(start_timestamp=start_timestamp, end_timestamp=end_timestamp)
+
+    counts: Dict[tuple, int] = {}
+    for (toll_point_id, vehicle_type), count in rollups.counts(first_bucket, end_bucket).items():
+        row = {"toll_point_id": toll_point_id, "vehicle_type": vehicle_type}
+        key = tuple(row[column] for column in group_by)
+        counts[key] = counts.get(key, 0) + count
+
+    edge_query = f"""
+    select
+      {columns},
+      count(record_id) as vehicle_count
+    from `{TOLL_RECORDS_TABLE}`
+    where (timestamp >= @start_timestamp and timestamp < @full_start)
+       or (timestamp >= @full_end and timestamp <= @end_timestamp)
+    {partition_range("@start_timestamp", "@end_timestamp")}
+    group by {columns};
+    """
+    edge_params = {
+        "start_timestamp": start,
+        "full_start": from_micros(rollups.bucket_start(first_bucket)),
+        "full_end": from_micros(rollups.bucket_start(end_bucket)),
+        "end_timestamp": end,
+    }
+    edges = execute_query(edge_query, edge_params, cache_ttl=_tool_cache_ttl(tool_name))
+    for key, count in zip(zip(*(edges.values(column) for column in group_by)), edges.values("vehicle_count")):
+        counts[key] = counts.get(key, 0) + count
+
+    return [dict(zip(group_by, key), vehicle_count=count) for key, count in counts.items()]
+
+
+@traced_tool
 def get_vehicle_count_by_type(start_timestamp: str, end_timestamp: str) -> List[Dict[str, Any]]:
     """
     Get the count of vehicles by type for a given time interval.
-    
+
     Args:
         start_timestamp (str): The start of the time interval (e.g., '2023-01-01 00:00:00 UTC').
         end_timestamp (str): The end of the time interval (e.g., '2023-01-31 23:59:59 UTC').
-    
+
     Returns:
         List[Dict[str, Any]]: A list of dictionaries, each with 'vehicle_type' and 'vehicle_count'.
     """
+    return _count_vehicles(start_timestamp, end_timestamp, ["vehicle_type"], "get_vehicle_count_by_type")
+
+
+@traced_tool
+def get_vehicle_count_by_toll_point(start_timestamp: str, end_timestamp: str) -> List[Dict[str, Any]]:
+    """
+    Get the count of vehicles by toll point and type for a given time interval.
+
+    Args:
+        start_timestamp (str): The start of the time interval (e.g., '2023-01-01 00:00:00 UTC').
+        end_timestamp (str): The end of the time interval (e.g., '2023-01-31 23:59:59 UTC').
+
+    Returns:
+        List[Dict[str, Any]]: A list of dictionaries, each with 'toll_point_id', 'vehicle_type' and 'vehicle_count'.
+    """
+    return _count_vehicles(
+        start_timestamp, end_timestamp, ["toll_point_id", "vehicle_type"], "get_vehicle_count_by_toll_point"
+    )
+
+
+def _sketch_edges(sketches: SketchStore, start: datetime, end: datetime, first_bucket: int, end_bucket: int,
+                  toll_point_ids: Optional[List[str]], cache_ttl: float) -> ResultSet:
+    """Reads in [start, end] outside the whole sketch buckets [first_bucket, end_bucket), which the sketches cover."""
+    toll_point_filter = "and toll_point_id in unnest(@toll_point_ids)" if toll_point_ids is not None else ""
+    query = f"""
+    select toll_point_id, plate_number
+    from `{TOLL_RECORDS_TABLE}`
+    where ((timestamp >= @start_timestamp and timestamp < @full_start)
+       or (timestamp >= @full_end and timestamp <= @end_timestamp))
+    {toll_point_filter}
+    {partition_range("@start_timestamp", "@end_timestamp")};
+    """
+    params = {
+        "start_timestamp": start,
+        "full_start": from_micros(sketches.bucket_start(first_bucket)),
+        "full_end": from_micros(sketches.bucket_start(end_bucket)),
+        "end_timestamp": end,
+    }
+    if toll_point_ids is not None:
+        params["toll_point_ids"] = sorted(set(toll_point_ids))
+    return execute_query(query, params, cache_ttl=cache_ttl)
+
+
+def _sketch_buckets(sketches: SketchStore, start: datetime, end: datetime) -> Optional[Tuple[int, int]]:
+    """
+    The whole sketch buckets inside [start, end], or None when the sketches cannot answer it.
+
+    Intervals without a whole bucket, or reaching buckets the sketches no longer keep, are answered exactly.
+    """
+    first_bucket, end_bucket = sketches.full_buckets(to_micros(start), to_micros(end))
+    if first_bucket >= end_bucket or not sketches.retains(first_bucket):
+        return None
+    return first_bucket, end_bucket
+
+
+@traced_tool
+def get_distinct_vehicle_count(start_timestamp: str, end_timestamp: str,
+                               toll_point_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Get how many distinct vehicles (plates) were read in a time interval, in total and per toll point.
+
+    With sketches enabled the counts are estimates, within relative_error
+    (about 1.6%): the whole sketch buckets (by default hours) inside the
+    interval come from the sketches, and the reads at either edge are folded
+    in from the table. Intervals shorter than a bucket, or older than the
+    sketches keep, are counted exactly.
+
+    Args:
+        start_timestamp (str): The start of the time interval (e.g., '2023-01-01 00:00:00 UTC').
+        end_timestamp (str): The end of the time interval (e.g., '2023-01-01 01:00:00 UTC').
+        toll_point_ids (List[str], optional): Only count reads at these toll points. Defaults to all.
+
+    Returns:
+        Dict[str, Any]: 'distinct_vehicles' across the selected toll points, 'reads', 'by_toll_point'
+        with each toll point's 'distinct_vehicles' and 'reads', 'approximate' and, for estimates,
+        'relative_error'.
+    """
+    start = parse_timestamp(start_timestamp)
+    end = parse_timestamp(end_timestamp)
+
+    cache_ttl = _tool_cache_ttl("get_distinct_vehicle_count")
+    sketches = get_sketch_store()
+    buckets = _sketch_buckets(sketches, start, end) if sketches is not None else None
+    if buckets is not None:
+        edges = _sketch_edges(sketches, start, end, *buckets, toll_point_ids, cache_ttl)
+        result = sketches.distinct_vehicles(*buckets, toll_point_ids, edges=edges)
+        return dict(result, approximate=True)
+
+    # `group by rollup` adds a row with a null toll_point_id holding the distinct count across all of them.
     query = f"""
     select
-      vehicle_type,
-      count(record_id) as vehicle_count
-    from `ajmalaziz-814-20250326021733.tolls.toll_records`
-    where timestamp between '{start_timestamp}' and '{end_timestamp}'
-    group by vehicle_type;
+      toll_point_id,
+      count(distinct plate_number) as distinct_vehicles,
+      count(record_id) as reads
+    from `{TOLL_RECORDS_TABLE}`
+    where timestamp between @start_timestamp and @end_timestamp
+    {partition_range("@start_timestamp", "@end_timestamp")}
+    """
+    params = {"start_timestamp": start, "end_timestamp": end}
+    if toll_point_ids is not None:
+        query += "    and toll_point_id in unnest(@toll_point_ids)\n"
+        params["toll_point_ids"] = sorted(set(toll_point_ids))
+    query += "    group by rollup(toll_point_id);\n"
+    rows = execute_query(query, params, cache_ttl=cache_ttl).to_pylist()
+    total = next((row for row in rows if row["toll_point_id"] is None), {"distinct_vehicles": 0, "reads": 0})
+    return {
+        "distinct_vehicles": total["distinct_vehicles"],
+        "reads": total["reads"],
+        "by_toll_point": sorted((row for row in rows if row["toll_point_id"] is not None),
+                                key=lambda row: row["toll_point_id"]),
+        "approximate": False,
+    }
+
+
+@traced_tool
+def get_frequent_plate_numbers(start_timestamp: str, end_timestamp: str, toll_point_ids: Optional[List[str]] = None,
+                               limit: int = 10) -> Dict[str, Any]:
+    """
+    Get the plate numbers read most often in a time interval, e.g. regular commuters or fleet vehicles.
+
+    With sketches enabled the read counts are estimates: the whole sketch
+    buckets (by default hours) inside the interval come from the sketches, and
+    the reads at either edge are folded in from the table. Estimates are never
+    below the true count and above it by at most max_overcount, so plates whose
+    counts differ by less than that may be ranked in either order. Intervals
+    shorter than a bucket, or older than the sketches keep, are counted exactly.
+
+    Args:
+        start_timestamp (str): The start of the time interval (e.g., '2023-01-01 00:00:00 UTC').
+        end_timestamp (str): The end of the time interval (e.g., '2023-01-31 23:59:59 UTC').
+        toll_point_ids (List[str], optional): Only count reads at these toll points. Defaults to all.
+        limit (int, optional): The number of plates to return. Defaults to 10.
+
+    Returns:
+        Dict[str, Any]: 'plates', each with 'plate_number' and 'reads', most reads first; 'reads' in
+        the interval, 'approximate' and, for estimates, 'max_overcount'.
+    """
+    start = parse_timestamp(start_timestamp)
+    end = parse_timestamp(end_timestamp)
+    limit = max(1, limit)
+
+    cache_ttl = _tool_cache_ttl("get_frequent_plate_numbers")
+    sketches = get_sketch_store()
+    buckets = _sketch_buckets(sketches, start, end) if sketches is not None else None
+    if buckets is not None:
+        edges = _sketch_edges(sketches, start, end, *buckets, toll_point_ids, cache_ttl)
+        result = sketches.top_plates(*buckets, toll_point_ids, limit, edges=edges)
+        return dict(result, approximate=True)
+
+    query = f"""
+    select plate_number, count(record_id) as reads, sum(count(record_id)) over () as total_reads
+    from `{TOLL_RECORDS_TABLE}`
+    where timestamp between @start_timestamp and @end_timestamp
+    {partition_range("@start_timestamp", "@end_timestamp")}
+    """
+    params = {"start_timestamp": start, "end_timestamp": end, "limit": limit}
+    if toll_point_ids is not None:
+        query += "    and toll_point_id in unnest(@toll_point_ids)\n"
+        params["toll_point_ids"] = sorted(set(toll_point_ids))
+    query += "    group by plate_number\n    order by reads desc, plate_number\n    limit @limit;\n"
+    rows = execute_query(query, params, cache_ttl=cache_ttl)
+    return {
+        "plates": rows.to_pylist(["plate_number", "reads"]),
+        "reads": int(rows.values("total_reads")[0]) if rows else 0,
+        "approximate": False,
+    }
+
+
+@traced_tool
+def get_anomaly_alerts(kind: Optional[str] = None, plate_number: Optional[str] = None,
+                       start_timestamp: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
+    """
+    Get the latest alerts raised by the streaming anomaly detector over toll reads.
+
+    The detector flags a plate whose consecutive reads imply an impossible speed
+    ('impossible_travel'), or a speed no vehicle could reach, suggesting a cloned
+    plate ('plate_clone'), and pairs of vehicles passing several different toll
+    points within seconds of each other ('convoy').
+
+    Args:
+        kind (str, optional): Only alerts of this kind: 'impossible_travel', 'plate_clone' or 'convoy'.
+        plate_number (str, optional): Only alerts involving this license plate.
+        start_timestamp (str, optional): Only alerts raised at or after this time (e.g., '2023-01-01 00:00:00 UTC').
+        limit (int, optional): The maximum number of alerts to return, most recent first. Defaults to 50.
+
+    Returns:
+        Dict[str, Any]: 'alerts', a list with kind, plate_numbers, toll_point_ids, timestamp and
+        kind-specific details (distance_km, seconds_apart and implied_speed_kmh, or
+        toll_points_together); and 'stats', with events processed and alert counts by kind.
     """
-    return execute_query(query)
+    if kind is not None and kind not in ALERT_KINDS:
+        raise ValueError(f"Unknown alert kind {kind!r}; choose from {list(ALERT_KINDS)}")
+    engine = get_anomaly_engine()
+    if engine is None:
+        raise ValueError("Anomaly detection is disabled; set TRAFFIC_ANOMALY_DETECTION=true to enable it")
+    since = to_micros(parse_timestamp(start_timestamp)) if start_timestamp else None
+    return {
+        "alerts": engine.alerts(kind, plate_number, since, limit),
+        "stats": engine.stats(),
+    }
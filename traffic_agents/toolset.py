@@ -0,0 +1,305 @@
+"""
+Tools compiled from the toolbox server's `tools.yaml`, shipped in this package.
+
+Each `bigquery-sql` entry becomes a `PreparedTool`: its statement is checked
+and normalized once, its parameters are bound by name with the declared types
+(never interpolated into the SQL), and it runs through `tools.execute_query`,
+so it uses the configured backend (BigQuery or local DuckDB), the query cache
+and single flight like the hand-written tools. `PreparedTool.as_function`
+turns it into a plain function with a typed signature and an Args docstring
+that ADK can declare to the model, so adding an entry to `tools.yaml` adds a
+tool without any Python code. An entry may set `cacheTtlSeconds`, how long
+its results are cached, unless `config.query_cache_ttls` names the tool.
+
+Tools that also have a Python implementation in `tools.py` (the index,
+rollup and paging paths) take their plain queries from here through
+`prepared_tool`, so each statement is defined once, in `tools.yaml`.
+"""
+from dataclasses import dataclass
+from typing import List, Dict, Any, Callable, Iterator, Optional
+import inspect
+import logging
+import os
+import re
+import threading
+from . import tools
+from .backends import partition_range
+from .cache import normalize_sql, referenced_tables
+from .config import config
+from .instrumentation import traced_tool
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_KINDS = ("bigquery-sql",)
+
+_SCALAR_TYPES = {"string": str, "integer": int, "float": float, "boolean": bool}
+_PARAMETER = re.compile(r"(?<![\w@])@(\w+)")
+# Comparisons against the partitioning column, whose parameters are bound as timestamps.
+_TIMESTAMP_BETWEEN = re.compile(r"\btimestamp\s+between\s+@(\w+)\s+and\s+@(\w+)", re.IGNORECASE)
+_TIMESTAMP_LOWER = re.compile(r"\btimestamp\s*>=?\s*@(\w+)", re.IGNORECASE)
+_TIMESTAMP_UPPER = re.compile(r"\btimestamp\s*<=?\s*@(\w+)", re.IGNORECASE)
+
+_REQUIRED = inspect.Parameter.empty
+
+
+@dataclass
+class ToolParameter:
+    name: str
+    type: str
+    description: str = ""
+    default: Any = _REQUIRED
+    # Element type of an array parameter.
+    items: Optional[str] = None
+
+    @classmethod
+    def from_spec(cls, tool_name: str, spec: Dict[str, Any]) -> "ToolParameter":
+        name, kind = spec.get("name"), spec.get("type")
+        if not name or kind not in (*_SCALAR_TYPES, "array"):
+            raise ValueError(f"Tool {tool_name!r}: parameter {name!r} has unsupported type {kind!r}")
+        items = None
+        if kind == "array":
+            items = (spec.get("items") or {}).get("type")
+            if items not in _SCALAR_TYPES:
+                raise ValueError(f"Tool {tool_name!r}: array parameter {name!r} has unsupported items type {items!r}")
+        default = spec.get("default", _REQUIRED)
+        if default is _REQUIRED and spec.get("required") is False:
+            default = None
+        return cls(name, kind, spec.get("description", ""), default, items)
+
+    @property
+    def annotation(self) -> Any:
+        annotation = List[_SCALAR_TYPES[self.items]] if self.type == "array" else _SCALAR_TYPES[self.type]
+        return Optional[annotation] if self.default is None else annotation
+
+    def bind(self, value: Any) -> Any:
+        """Check `value` against the declared type and convert it to the Python type bound to the query."""
+        if value is None:
+            if self.default is _REQUIRED:
+                raise ValueError(f"Parameter {self.name!r} is required")
+            return None
+        if self.type != "array":
+            return _bind_scalar(self.name, self.type, value)
+        if not isinstance(value, (list, tuple)):
+            raise ValueError(f"Parameter {self.name!r} must be a list of {self.items} values")
+        return [_bind_scalar(self.name, self.items, item) for item in value]
+
+
+def _bind_scalar(name: str, kind: str, value: Any) -> Any:
+    if kind == "boolean":
+        if isinstance(value, bool):
+            return value
+    elif kind == "integer":
+        # bool is a subclass of int, and floats are only accepted when whole.
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+    elif kind == "float":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return float(value)
+    elif isinstance(value, str):
+        return value
+    raise ValueError(f"Parameter {name!r} must be a {kind}, got {type(value).__name__}")
+
+
+class PreparedTool:
+    """One `tools.yaml` statement, checked once and then executed with bound parameters."""
+
+    def __init__(self, name: str, description: str, statement: str, parameters: List[ToolParameter],
+                 cache_ttl: Optional[float] = None):
+        self.name = name
+        self.description = description.strip()
+        self.parameters = parameters
+        # Declared by the entry's `cacheTtlSeconds`; `config.query_cache_ttls` overrides it.
+        self.cache_ttl = cache_ttl
+        self._parameters = {parameter.name: parameter for parameter in parameters}
+
+        referenced = set(_PARAMETER.findall(statement))
+        undeclared = referenced - set(self._parameters)
+        if undeclared:
+            raise ValueError(f"Tool {name!r}: statement uses undeclared parameters {sorted(undeclared)}")
+        unused = set(self._parameters) - referenced
+        if unused:
+            logger.warning(f"Tool {name!r}: parameters {sorted(unused)} are declared but not used")
+
+        # String parameters compared with `timestamp` are bound as timestamps, which lets
+        # the local backend prune date partitions and makes equal times share a cache key.
+        start = end = None
+        between = _TIMESTAMP_BETWEEN.search(statement)
+        if between:
+            start, end = between.groups()
+        else:
+            lower, upper = _TIMESTAMP_LOWER.search(statement), _TIMESTAMP_UPPER.search(statement)
+            start, end = lower and lower.group(1), upper and upper.group(1)
+        self.timestamp_parameters = {
+            parameter for parameter in (start, end) if parameter and self._parameters[parameter].type == "string"
+        }
+
+        statement = normalize_sql(statement)
+        if start or end:
+            statement += " " + partition_range(start and f"@{start}", end and f"@{end}")
+        self.statement = statement
+        self.tables = referenced_tables(statement)
+
+    @classmethod
+    def from_spec(cls, name: str, spec: Dict[str, Any]) -> "PreparedTool":
+        statement = spec.get("statement")
+        if not statement:
+            raise ValueError(f"Tool {name!r} has no statement")
+        parameters = [ToolParameter.from_spec(name, parameter) for parameter in spec.get("parameters") or []]
+        cache_ttl = spec.get("cacheTtlSeconds")
+        if cache_ttl is not None and (isinstance(cache_ttl, bool) or not isinstance(cache_ttl, (int, float))):
+            raise ValueError(f"Tool {name!r}: cacheTtlSeconds must be a number, got {cache_ttl!r}")
+        return cls(name, spec.get("description", ""), statement, parameters,
+                   None if cache_ttl is None else float(cache_ttl))
+
+    def bind(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Typed query parameters for `arguments`, with declared defaults filled in."""
+        unknown = set(arguments) - set(self._parameters)
+        if unknown:
+            raise ValueError(f"Unknown parameters {sorted(unknown)} for tool {self.name!r}")
+        params = {}
+        for parameter in self.parameters:
+            value = arguments.get(parameter.name, parameter.default)
+            value = parameter.bind(None if value is _REQUIRED else value)
+            if parameter.name in self.timestamp_parameters and value is not None:
+                value = tools.parse_timestamp(value)
+            params[parameter.name] = value
+        return params
+
+    def _cache_ttl(self) -> float:
+        cache_ttl = config.query_cache_ttls.get(self.name, self.cache_ttl)
+        return config.query_cache_default_ttl if cache_ttl is None else cache_ttl
+
+    def __call__(self, **arguments) -> List[Dict[str, Any]]:
+        return tools.execute_query(self.statement, self.bind(arguments), cache_ttl=self._cache_ttl()).to_pylist()
+
+    def iter_rows(self, **arguments) -> Iterator[Dict[str, Any]]:
+        """Like calling the tool, but yield rows lazily through `tools.iter_query`."""
+        return tools.iter_query(self.statement, self.bind(arguments), cache_ttl=self._cache_ttl())
+
+    def docstring(self) -> str:
+        lines = [self.description or self.name.replace("_", " ").capitalize() + ".", "", "Args:"]
+        for parameter in self.parameters:
+            type_name = f"List[{_SCALAR_TYPES[parameter.items].__name__}]" if parameter.type == "array" \
+                else _SCALAR_TYPES[parameter.type].__name__
+            optional = ", optional" if parameter.default is not _REQUIRED else ""
+            line = f"    {parameter.name} ({type_name}{optional}): {parameter.description}".rstrip()
+            if parameter.default not in (_REQUIRED, None):
+                line += f" Defaults to {parameter.default!r}."
+            lines.append(line)
+        if not self.parameters:
+            lines.pop()
+        lines += ["", "Returns:", "    List[Dict[str, Any]]: The rows the query returns."]
+        return "\n".join(lines)
+
+    def as_function(self) -> Callable[..., List[Dict[str, Any]]]:
+        """A named function with a typed keyword-only signature and docstring, for registering as an ADK tool."""
+        def run(**arguments) -> List[Dict[str, Any]]:
+            return self(**arguments)
+
+        run.__name__ = run.__qualname__ = self.name
+        run.__doc__ = self.docstring()
+        run.__signature__ = inspect.Signature(
+            [
+                inspect.Parameter(parameter.name, inspect.Parameter.KEYWORD_ONLY,
+                                  default=parameter.default, annotation=parameter.annotation)
+                for parameter in self.parameters
+            ],
+            return_annotation=List[Dict[str, Any]],
+        )
+        run.__annotations__ = {parameter.name: parameter.annotation for parameter in self.parameters}
+        run.__annotations__["return"] = List[Dict[str, Any]]
+        return traced_tool(run)
+
+
+def load_toolset(path: str, toolset: Optional[str] = None) -> Dict[str, PreparedTool]:
+    """
+    Compile the tools defined in a toolbox `tools.yaml`.
+
+    Args:
+        path (str): The tools.yaml file.
+        toolset (str, optional): Only compile the tools listed in this toolset. Defaults to every tool.
+
+    Returns:
+        Dict[str, PreparedTool]: Compiled tools by name, in file order. Entries of kinds other
+        than `SUPPORTED_KINDS` are skipped with a warning.
+    """
+    import yaml
+
+    with open(path) as f:
+        document = yaml.safe_load(f) or {}
+    definitions = document.get("tools") or {}
+    names = list(definitions)
+    if toolset is not None:
+        toolsets = document.get("toolsets") or {}
+        if toolset not in toolsets:
+            raise ValueError(f"Toolset {toolset!r} is not defined in {path}")
+        names = toolsets[toolset]
+
+    prepared = {}
+    for name in names:
+        spec = definitions.get(name)
+        if spec is None:
+            raise ValueError(f"Tool {name!r} is listed in a toolset but not defined in {path}")
+        if spec.get("kind") not in SUPPORTED_KINDS:
+            logger.warning(f"Skipping tool {name!r} of unsupported kind {spec.get('kind')!r}")
+            continue
+        prepared[name] = PreparedTool.from_spec(name, spec)
+    logger.info(f"Compiled {len(prepared)} tools from {path}")
+    return prepared
+
+
+_toolset: Optional[Dict[str, PreparedTool]] = None
+_statements: Optional[Dict[str, PreparedTool]] = None
+_toolset_lock = threading.Lock()
+
+
+def get_toolset() -> Dict[str, PreparedTool]:
+    """
+    The tools compiled from `config.toolset_path`, loaded once per process.
+
+    Empty when the path is set to "". A configured file that is missing
+    raises FileNotFoundError rather than silently leaving the agent without
+    its tools.
+    """
+    global _toolset
+    if _toolset is None:
+        with _toolset_lock:
+            if _toolset is None:
+                if not config.toolset_path:
+                    logger.info("No toolset file configured; no tools compiled.")
+                    _toolset = {}
+                elif not os.path.exists(config.toolset_path):
+                    raise FileNotFoundError(f"Toolset file {config.toolset_path!r} does not exist")
+                else:
+                    _toolset = load_toolset(config.toolset_path, config.toolset_name)
+    return _toolset
+
+
+def prepared_tool(name: str) -> PreparedTool:
+    """
+    The tool `name` compiled from `config.toolset_path`, whether or not `config.toolset_name` lists it.
+
+    Raises ValueError when the file does not define it, e.g. when the path is set to "".
+    """
+    global _statements
+    if _statements is None:
+        with _toolset_lock:
+            if _statements is None:
+                if not config.toolset_path or not os.path.exists(config.toolset_path):
+                    _statements = {}
+                else:
+                    _statements = load_toolset(config.toolset_path)
+    if name not in _statements:
+        raise ValueError(f"Tool {name!r} is not defined in the toolset file {config.toolset_path!r}")
+    return _statements[name]
+
+
+def toolset_functions(exclude: Optional[set] = None) -> List[Callable[..., List[Dict[str, Any]]]]:
+    """`get_toolset` tools as functions, skipping names in `exclude` (e.g. tools implemented in Python)."""
+    exclude = exclude or set()
+    skipped = [name for name in get_toolset() if name in exclude]
+    if skipped:
+        logger.info(f"Toolset tools {skipped} run through their Python implementations")
+    return [tool.as_function() for name, tool in get_toolset().items() if name not in exclude]